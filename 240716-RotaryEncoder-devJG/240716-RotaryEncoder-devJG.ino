@@ -1,49 +1,97 @@
 #include <Encoder.h>
 
+// Output format: 0 = ASCII lines, as before; 1 = binary packets (see PsychoPy/sipefield/protocol.py),
+// read with ENCODER_PROTOCOL = 'binary' in the experiment script
+#define BINARY_PROTOCOL 0
+
 // Define the encoder pins
 Encoder rotary(2, 3);
 
+// Binary packet constants, must match PsychoPy/sipefield/protocol.py
+const uint8_t SYNC_0 = 0xA5;
+const uint8_t SYNC_1 = 0x5A;
+const uint8_t PROTOCOL_VERSION = 1;
+const uint8_t PACKET_SIZE = 14;
+
+// Sampling rate; SAMPLE_WINDOW in the PsychoPy prepare_encoder block must be 1 / SAMPLE_RATE_HZ
+const unsigned long SAMPLE_RATE_HZ = 20;
+const unsigned long sampleWindowMicros = 1000000UL / SAMPLE_RATE_HZ;
+
 // Initialize variables
 long previousPosition = 0;
 long currentPosition;
-int positionChange;
-int startTime;
-const int sampleWindow = 50; // Sample window in milliseconds
-int currentTime = 0;
-int lastSampleTime = 0;
-float elapsedTime;
+long positionChange;
+unsigned long nextDeadline; // micros() time the next sample is due
+uint32_t sequence = 0; // Packet sequence number, +1 per sample window
+
+// CRC-8, polynomial 0x07, initial value 0
+uint8_t crc8(const uint8_t *data, uint8_t length) {
+  uint8_t crc = 0;
+  for (uint8_t i = 0; i < length; i++) {
+    crc ^= data[i];
+    for (uint8_t bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x80) ? (uint8_t)((crc << 1) ^ 0x07) : (uint8_t)(crc << 1);
+    }
+  }
+  return crc;
+}
+
+// Send one little-endian sample packet: sync, version, sequence, micros, delta, CRC
+void sendPacket(uint32_t seq, uint32_t deviceMicros, long delta) {
+  // Clamp the change to the int16 field
+  if (delta > 32767) delta = 32767;
+  if (delta < -32768) delta = -32768;
+  int16_t clicks = (int16_t)delta;
+
+  uint8_t packet[PACKET_SIZE];
+  packet[0] = SYNC_0;
+  packet[1] = SYNC_1;
+  packet[2] = PROTOCOL_VERSION;
+  for (uint8_t i = 0; i < 4; i++) {
+    packet[3 + i] = (seq >> (8 * i)) & 0xFF;
+    packet[7 + i] = (deviceMicros >> (8 * i)) & 0xFF;
+  }
+  packet[11] = clicks & 0xFF;
+  packet[12] = (clicks >> 8) & 0xFF;
+  packet[13] = crc8(packet + 2, PACKET_SIZE - 3);
+  Serial.write(packet, PACKET_SIZE);
+}
 
 void setup() {
-  // Initialize serial communication at a baud rate of 57600
+  // Initialize serial communication; binary packets need the faster link for high sample rates
+#if BINARY_PROTOCOL
+  Serial.begin(250000);
+#else
   Serial.begin(57600);
-  // Record the start time
-  startTime = millis();
+#endif
+  // Schedule the first sample one window from now
+  nextDeadline = micros() + sampleWindowMicros;
 }
 
 void loop() {
-  // Calculate the elapsed time since the start
-  currentTime = millis() - startTime;
-  
-  // Check if the current time is a multiple of the sample window and not equal to the last sample time
-  if (currentTime % sampleWindow == 0 && lastSampleTime != currentTime) {
-    // Calculate the elapsed time in seconds
-    elapsedTime = currentTime / 1000.0;
-    
+  // Sample once the deadline has passed (signed difference survives the micros() wrap).
+  // Deadlines advance by exactly one window, so a late loop() delays a sample
+  // but never skips its window: missed deadlines are caught up on the next passes.
+  if ((long)(micros() - nextDeadline) >= 0) {
+    nextDeadline += sampleWindowMicros;
+
     // Read the current position of the encoder
     currentPosition = rotary.read();
-    
+
     // Calculate the change in position
     positionChange = currentPosition - previousPosition;
-    
+
+#if BINARY_PROTOCOL
+    // Send the position change with its sequence number and device timestamp
+    sendPacket(sequence++, micros(), positionChange);
+#else
     // Print the position change to the serial monitor
     Serial.println(positionChange);
-    
-    // Update the last sample time
-    lastSampleTime = currentTime;
-    
+#endif
+
     // Reset the position change
     positionChange = 0;
-    
+
     // Update the previous position
     previousPosition = currentPosition;
   }
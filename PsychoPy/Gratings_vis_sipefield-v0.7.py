@@ -0,0 +1,1250 @@
+﻿#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Gratings experiment for the sipefield rig, run with PsychoPy and the sipefield package.
+
+This script started as the PsychoPy3 Experiment Builder (v2024.2.1post4) export of
+    Gratings_vis_stim_v0.7.psyexp, on November 08, 2024, at 15:41, and has been edited by
+    hand since. Most of its code is not in the .psyexp: edit this file, don't re-export it.
+If you publish work using this script the most relevant publication is:
+
+    Peirce J, Gray JR, Simpson S, MacAskill M, Höchenberger R, Sogo H, Kastman E, Lindeløv JK. (2019) 
+        PsychoPy2: Experiments in behavior made easy Behav Res 51: 195. 
+        https://doi.org/10.3758/s13428-018-01193-y
+
+"""
+
+# startup_profile: Before Experiment
+#=============================== Custom Codeblock jgronemeyer =====================================#
+import sys
+from sipefield.startup import StartupProfiler
+
+# --profile-startup: time every import and setup phase up to the first frame of the experiment;
+#   printed at the end and saved as <datafile>_startup.csv
+PROFILE_STARTUP = '--profile-startup' in sys.argv
+if PROFILE_STARTUP:
+    sys.argv.remove('--profile-startup')  # keep the positional arguments where they were
+# True skips what this experiment doesn't use: plugin discovery, the PTB audio backend (no sound
+#   components) and the dialog toolkit (no info dialog); False keeps Builder's imports
+LEAN_STARTUP = False
+startup = StartupProfiler(enabled=PROFILE_STARTUP)
+startup.start()
+#==================================================================================================#
+# --- Import packages ---
+from psychopy import locale_setup
+from psychopy import prefs
+if not LEAN_STARTUP:
+    from psychopy import plugins
+    plugins.activatePlugins()
+    prefs.hardware['audioLib'] = 'ptb'
+    prefs.hardware['audioLatencyMode'] = '3'
+    from psychopy import sound, gui
+from psychopy import visual, core, data, event, logging, clock, colors, layout, hardware
+from psychopy.tools import environmenttools
+from psychopy.constants import (NOT_STARTED, STARTED, PLAYING, PAUSED,
+                                STOPPED, FINISHED, PRESSED, RELEASED, FOREVER, priority)
+
+import numpy as np  # whole numpy lib is available, prepend 'np.'
+from numpy import (sin, cos, tan, log, log10, pi, average,
+                   sqrt, std, deg2rad, rad2deg, linspace, asarray)
+from numpy.random import random, randint, normal, shuffle, choice as randchoice
+import os  # handy system and path functions
+
+from psychopy.hardware import keyboard
+
+# Run 'Before Experiment' code from get_input_arguments
+#=============================== Custom Codeblock jgronemeyer =====================================#
+#add system argument functionality
+#Get command line arguments passed if present
+sysarg_protocol_id = None
+sysarg_subject_id = None
+sysarg_session_id = None
+sysarg_save_dir = None
+sysarg_nTrials = None # changed data.TrialHandler2 object value nReps value to call this variable
+# --serve: stay up and take sessions from a parent process instead (see sipefield/server.py)
+SERVE = len(sys.argv) > 1 and sys.argv[1] == '--serve'
+if len(sys.argv) > 1 and not SERVE:
+    sysarg_protocol_id = sys.argv[1]  # get the first argument from command line
+    sysarg_subject_id = sys.argv[2]  # get the second argument from command line
+    sysarg_session_id = sys.argv[3]  # get the third argument from command line
+    sysarg_save_dir = sys.argv[4]  # get the fourth argument from command line
+    nTrials = sys.argv[5] # get the fifth argument from the command line
+    
+#==================================================================================================#
+# Run 'Before Experiment' code from prepare_encoder
+#=============================== Custom Codeblock jgronemeyer =====================================
+import serial
+import time
+from datetime import datetime # for BIDS saving
+import threading
+import contextlib
+from sipefield.ring import SampleRing
+from sipefield.recorder import ColumnarRecorder, WHEEL_COLUMNS
+from sipefield.writer import StreamingWriter
+from sipefield.clocksync import ClockSync
+from sipefield.locomotion import LocomotionStream, WheelConfig
+from sipefield.reader import EncoderReader, POLL_TIMEOUT
+from sipefield.acquisition import EncoderProcess
+from sipefield.sequence import SequenceChecker
+
+# For BIDS file saving
+timestamp = datetime.now().strftime('%Y%m%d_%H%M%S') # get current timestamp (BIDS)
+
+# Constants
+WHEEL_DIAMETER = 0.2  # in meters, example value
+ENCODER_CPR = 1000    # encoder counts per revolution
+SAMPLE_WINDOW = 0.05  # sample window in seconds, 1 / SAMPLE_RATE_HZ in the Arduino sketch
+SPEED_SMOOTHING = 'none'  # 'none', 'moving_average' or 'savgol' (trailing window while streaming)
+SPEED_SMOOTHING_WINDOW = 5  # samples
+SAVE_DIR = r'C:/dev/devOutput/encoder'  # Directory to save data
+WHEEL_LOG_INTERVAL = 0.5  # seconds between appends to the crash-safe wheel log
+PORT = 'COM4'
+# 'ascii' lines (the original firmware, or the sketch built with BINARY_PROTOCOL 0), or
+#   'binary' packets, which needs the Arduino reflashed with BINARY_PROTOCOL 1
+ENCODER_PROTOCOL = 'ascii'
+BAUD_RATE = 250000 if ENCODER_PROTOCOL == 'binary' else 57600  # must match Serial.begin() in the sketch
+ENCODER_RING_CAPACITY = 65536  # samples kept for the frame loop; ~55 min at 20 Hz
+ENCODER_ACQUISITION = 'thread'  # 'thread', or 'process' to read the port in a child process (own GIL)
+
+# Initialize columnar store for encoder data (see sipefield.recorder.WHEEL_COLUMNS);
+#   it becomes a DataFrame only when saved in CustomSaving
+encoder_data = ColumnarRecorder(WHEEL_COLUMNS)
+
+# Ring buffer of (host_time, device_time, seq, delta) samples written by the reader
+# and drained once per frame by DisplayGratings; no lock is needed
+if ENCODER_ACQUISITION == 'process':
+    # The child process opens the port itself and writes into a shared-memory ring;
+    #   its perf_counter stamps are shifted onto core.getTime (see sipefield/acquisition.py)
+    with startup.phase('serial open'):
+        encoder_reader = EncoderProcess(PORT, BAUD_RATE, protocol=ENCODER_PROTOCOL,
+                                        capacity=ENCODER_RING_CAPACITY,
+                                        clock_offset=core.getTime() - time.perf_counter())
+    encoder_ring = encoder_reader.ring
+else:
+    # Set up the serial port connection to arduino
+    # (short timeout so the reader thread can be stopped promptly)
+    with startup.phase('serial open'):
+        arduino = serial.Serial(port=PORT, baudrate=BAUD_RATE, timeout=POLL_TIMEOUT)
+    encoder_ring = SampleRing(capacity=ENCODER_RING_CAPACITY)
+    # The reader thread drains the port in bulk and decodes whole chunks at once
+    encoder_reader = EncoderReader(arduino, encoder_ring, protocol=ENCODER_PROTOCOL, clock=core.getTime)
+encoder_cursor = encoder_ring.cursor()
+
+# Drops repeated samples and fills windows lost on the serial link, using the
+#   firmware's per-window sequence numbers (binary protocol only)
+encoder_sequence = SequenceChecker()
+
+# Maps the firmware's micros() onto the host clock so each sample is timed by when
+#   the Arduino measured it, not when the frame loop happened to poll it
+encoder_clock = ClockSync()
+
+# Speed, cumulative distance, direction and acceleration for each drained chunk
+#   of samples, computed with one set of NumPy calls per frame
+wheel_config = WheelConfig(wheel_diameter=WHEEL_DIAMETER, encoder_cpr=ENCODER_CPR,
+                           smoothing=SPEED_SMOOTHING, window=SPEED_SMOOTHING_WINDOW)
+locomotion = LocomotionStream(wheel_config)
+
+def new_encoder_session():
+    """Fresh wheel data and decoder state for the next server session; the reader keeps running."""
+    global encoder_data, encoder_cursor, encoder_sequence, encoder_clock, locomotion
+    encoder_data = ColumnarRecorder(WHEEL_COLUMNS)
+    encoder_cursor = encoder_ring.cursor()  # skips samples from between sessions
+    encoder_sequence = SequenceChecker()
+    encoder_clock = ClockSync()
+    locomotion = LocomotionStream(wheel_config)
+#==================================================================================================#
+# Run 'Before Experiment' code from generate_grating_angles
+#=============================== Custom Codeblock jgronemeyer =====================================#
+import random
+from sipefield.schedule import Epoch, GratingSchedule, STIM_GRAY, STIM_GRATING
+
+grating_angles_array = [0, 45, 90, 135, 180, 225, 270, 315]
+GRAY_DURATION = 3.0     # s of gray screen at the start of each trial
+GRATING_DURATION = 2.0  # s of drifting grating after it
+TEMPORAL_FREQUENCY = 1.0  # grating drift in cycles/s (0 for a static grating)
+# 'stim': draw stim_grayScreen over the window for the gray epoch, as Builder does;
+#   'clear': the window's clear colour is the gray, with no stimulus drawn. 'clear' needs both to be the same colour.
+GRAY_MODE = 'stim'
+#==================================================================================================#
+# frame_timing: Before Experiment
+#=============================== Custom Codeblock jgronemeyer =====================================#
+from sipefield.frametiming import FrameTimer
+#==================================================================================================#
+# grating_cache: Before Experiment
+#=============================== Custom Codeblock jgronemeyer =====================================#
+from sipefield.stimcache import StimulusCache
+#==================================================================================================#
+# telemetry: Before Experiment
+#=============================== Custom Codeblock jgronemeyer =====================================#
+from sipefield.telemetry import (Telemetry, TelemetryConsumer, ConsoleSink, FileSink, SocketSink,
+                                 TELEMETRY_WHEEL, TELEMETRY_TRIAL)
+
+TELEMETRY_SINKS = ('console',)  # any of 'console', 'file' (<datafile>_telemetry.log) and 'socket'; () for none
+TELEMETRY_INTERVAL = 0.25  # s between console updates
+TELEMETRY_PORT = 9999  # localhost UDP port of the 'socket' sink; listen with python -m sipefield.telemetry 9999
+
+# Status messages from the frame loop: pushing one is a fixed-size record in a ring,
+#   formatted and written by a background thread (see sipefield/telemetry.py)
+telemetry = Telemetry()
+#==================================================================================================#
+# routine_engine: Before Experiment
+#=============================== Custom Codeblock jgronemeyer =====================================#
+from sipefield.routines import RoutineEngine, Routine, VisualComponent, KeyboardComponent
+
+# A sipefield.profiling.FrameProfiler to time each frame's sections, or None;
+#   set by benchmarks/bench_run_loop.py
+FRAME_PROFILER = None
+#==================================================================================================#
+# draw_calls: Before Experiment
+#=============================== Custom Codeblock jgronemeyer =====================================#
+from sipefield.drawcalls import DrawProfiler
+
+# Count GL draw calls and state changes and time each stimulus' draw, every frame;
+#   saved as <datafile>_draws.csv and <datafile>_draw_summary.csv. Slows drawing a little.
+DRAW_PROFILE = False
+#==================================================================================================#
+# gc_control: Before Experiment
+#=============================== Custom Codeblock jgronemeyer =====================================#
+from sipefield.gccontrol import GCMonitor, GCControl
+
+# Automatic garbage collection during trials: 'auto' (Python decides), 'disable' (off from the
+#   first trial to the end, collected explicitly in each trial) or 'freeze' (as 'disable', with the setup heap frozen first)
+GC_MODE = 'auto'
+# explicit collection while the gray screen is up ('gray'), or right after each trial ('between'), when
+#   the trial's last (grating) frame is still on screen and stays there until the collection is done
+GC_COLLECT = 'gray'
+GC_GENERATION = 2  # oldest generation the explicit collection covers
+#==================================================================================================#
+# trial_timeline: Before Experiment
+#=============================== Custom Codeblock jgronemeyer =====================================#
+from sipefield.timeline import TrialTimeline, flip_on_clock
+
+# True: every trial starts at a deadline fixed from the first trial's onset on globalClock;
+#   False: Builder's non-slip chaining through routineTimer (onsets are still logged)
+ABSOLUTE_TIMELINE = False
+#==================================================================================================#
+# refresh_rate: Before Experiment
+#=============================== Custom Codeblock jgronemeyer =====================================#
+from sipefield.refreshrate import RefreshRateCache, cached_frame_rate
+
+# Measured refresh rate per monitor profile, screen and resolution; a launch only flips a short
+#   burst to confirm the cached rate, and measures in full when the burst disagrees
+REFRESH_RATE_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'refresh_rate_cache.json')
+REFRESH_RATE_BURST = 10  # frame intervals in the validation burst (13 flips with warm-up)
+REFRESH_RATE_TOLERANCE = 0.01  # relative burst/cache difference that still counts as a match
+frameRateCheck = {}  # how the rate was obtained; copied into expInfo by setupWindow
+#==================================================================================================#
+# keyboard_backend: Before Experiment
+#=============================== Custom Codeblock jgronemeyer =====================================#
+# 'iohub': start the ioHub server process and its .hdf5 datastore, as Builder does;
+#   'ptb': read the keyboards in this process through Psychtoolbox's key queues
+KEYBOARD_BACKEND = 'iohub'
+if KEYBOARD_BACKEND == 'ptb' and not keyboard.havePTB:
+    logging.warning("KEYBOARD_BACKEND 'ptb' needs psychtoolbox, which is not installed; using ioHub")
+    KEYBOARD_BACKEND = 'iohub'
+#==================================================================================================#
+# escape_polling: Before Experiment
+#=============================== Custom Codeblock jgronemeyer =====================================#
+from sipefield.escape import EscapeWatcher
+
+# How the frame loop checks for escape: 'frame' (ask defaultKeyboard every frame, as Builder),
+#   'throttled' (ask it every ESCAPE_INTERVAL s) or 'window' (a key-press handler on the window
+#   sets a flag during win.flip(); the stimulus window must have keyboard focus)
+ESCAPE_POLICY = 'throttled'
+ESCAPE_INTERVAL = 0.1  # s between keyboard checks with 'throttled'
+#==================================================================================================#
+# experiment_server: Before Experiment
+#=============================== Custom Codeblock jgronemeyer =====================================#
+from sipefield.server import ExperimentServer, SessionAborted, DEFAULT_ADDRESS, DEFAULT_AUTHKEY
+
+SERVER_ADDRESS = DEFAULT_ADDRESS  # where --serve listens for session requests
+SERVER_AUTHKEY = DEFAULT_AUTHKEY
+
+def serveSessions():
+    """
+    Open the window, ioHub and encoder once, then run sessions as parents request them.
+    
+    Each request carries the positional arguments of a normal launch; the reply lists
+    the session's output files. Returns on a 'shutdown' request.
+    """
+    expInfoTemplate = dict(expInfo)  # before setupData strips the |hid suffixes
+    # measures the frame rate once; later sessions reuse it from the window
+    with startup.phase('setupWindow'):
+        win = setupWindow(expInfo={})
+    
+    def runSession(request):
+        global expInfo, nTrials, timestamp
+        expInfo = dict(expInfoTemplate)
+        expInfo.update({
+            'Protocol ID': request['protocol'],
+            'Subject ID': request['subject'],
+            'Session ID': request['session'],
+            'Save Directory': request.get('save_dir'),
+            'date|hid': data.getDateStr(),
+        })
+        nTrials = int(request['n_trials'])
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        new_encoder_session()
+        thisExp = setupData(expInfo=expInfo)
+        setupLogging(filename=thisExp.dataFileName)
+        setupWindow(expInfo=expInfo, win=win)
+        if deviceManager.getDevice('defaultKeyboard') is None:
+            # keyboards (and ioHub, if used) start with the first session; ioHub's datastore is named after it
+            setupDevices(expInfo=expInfo, thisExp=thisExp, win=win)
+        try:
+            completed = run(expInfo=expInfo, thisExp=thisExp, win=win, globalClock='float')
+            saveData(thisExp=thisExp)
+        finally:
+            thisExp.abort()  # saved; don't save again at exit
+        files = {
+            'data': thisExp.dataFileName,
+            'csv': thisExp.dataFileName + '.csv',
+            'wheel': expInfo.get('wheelDataFile'),  # None if escape ended the session; the log is kept
+            'wheel_log': expInfo.get('wheelLogFile'),
+        }
+        if not completed:
+            raise SessionAborted(files)
+        return files
+    
+    server = ExperimentServer(runSession, address=SERVER_ADDRESS, authkey=SERVER_AUTHKEY,
+                              idle=win.flip)  # keep the window responsive between sessions
+    logging.warning(f"serving sessions on {SERVER_ADDRESS}")
+    try:
+        server.serve_forever()
+    finally:
+        encoder_reader.stop()
+        win.close()
+#==================================================================================================#
+# --- Setup global variables (available in all functions) ---
+# create a device manager to handle hardware (keyboards, mice, mirophones, speakers, etc.)
+deviceManager = hardware.DeviceManager()
+# ensure that relative paths start from the same directory as this script
+_thisDir = os.path.dirname(os.path.abspath(__file__))
+# store info about the experiment session
+psychopyVersion = '2024.2.1post4'
+expName = 'Gratings_vis_build-v0.7'  # the script's original name, kept so data file names don't change
+# information about this experiment
+expInfo = {
+    'Protocol ID': sysarg_protocol_id,
+    'Subject ID': sysarg_subject_id,
+    'Session ID': sysarg_session_id,
+    'Save Directory': sysarg_save_dir,
+    'date|hid': data.getDateStr(),
+    'expName|hid': expName,
+    'psychopyVersion|hid': psychopyVersion,
+}
+
+# --- Define some variables which will change depending on pilot mode ---
+'''
+To run in pilot mode, either use the run/pilot toggle in Builder, Coder and Runner, 
+or run the experiment with `--pilot` as an argument. To change what pilot 
+#mode does, check out the 'Pilot mode' tab in preferences.
+'''
+# work out from system args whether we are running in pilot mode
+PILOTING = core.setPilotModeFromArgs()
+# start off with values from experiment settings
+_fullScr = True
+_winSize = [1920, 1080]
+# if in pilot mode, apply overrides according to preferences
+if PILOTING:
+    # force windowed mode
+    if prefs.piloting['forceWindowed']:
+        _fullScr = False
+        # set window size
+        _winSize = prefs.piloting['forcedWindowSize']
+
+def showExpInfoDlg(expInfo):
+    """
+    Show participant info dialog.
+    Parameters
+    ==========
+    expInfo : dict
+        Information about this experiment.
+    
+    Returns
+    ==========
+    dict
+        Information about this experiment.
+    """
+    # show participant info dialog
+    from psychopy import gui  # not imported at the top with LEAN_STARTUP
+    dlg = gui.DlgFromDict(
+        dictionary=expInfo, sortKeys=False, title=expName, alwaysOnTop=True
+    )
+    if dlg.OK == False:
+        core.quit()  # user pressed cancel
+    # return expInfo
+    return expInfo
+
+
+def setupData(expInfo, dataDir=None):
+    """
+    Make an ExperimentHandler to handle trials and saving.
+    
+    Parameters
+    ==========
+    expInfo : dict
+        Information about this experiment, created by the `setupExpInfo` function.
+    dataDir : Path, str or None
+        Folder to save the data to, leave as None to create a folder in the current directory.    
+    Returns
+    ==========
+    psychopy.data.ExperimentHandler
+        Handler object for this experiment, contains the data to save and information about 
+        where to save it to.
+    """
+    # remove dialog-specific syntax from expInfo
+    for key, val in expInfo.copy().items():
+        newKey, _ = data.utils.parsePipeSyntax(key)
+        expInfo[newKey] = expInfo.pop(key)
+    
+    # data file name stem = absolute path + name; later add .psyexp, .csv, .log, etc
+    if dataDir is None:
+        dataDir = _thisDir
+    filename = u'data/%s/sub-%s/ses-%s/beh/sub-%s_ses-%s_%s' % (expInfo['Protocol ID'], expInfo['Subject ID'], expInfo['Session ID'], expInfo['Subject ID'], expInfo['Session ID'], timestamp)
+    # make sure filename is relative to dataDir
+    if os.path.isabs(filename):
+        dataDir = os.path.commonprefix([dataDir, filename])
+        filename = os.path.relpath(filename, dataDir)
+    
+    # an ExperimentHandler isn't essential but helps with data saving
+    thisExp = data.ExperimentHandler(
+        name=expName, version='',
+        extraInfo=expInfo, runtimeInfo=None,
+        originPath='C:\\sipefield\\sipefield-gratings\\PsychoPy\\Gratings_vis_sipefield-v0.7.py',
+        savePickle=True, saveWideText=True,
+        dataFileName=dataDir + os.sep + filename, sortColumns='time'
+    )
+    thisExp.setPriority('thisRow.t', priority.CRITICAL)
+    thisExp.setPriority('expName', priority.LOW)
+    # return experiment handler
+    return thisExp
+
+
+def setupLogging(filename):
+    """
+    Setup a log file and tell it what level to log at.
+    
+    Parameters
+    ==========
+    filename : str or pathlib.Path
+        Filename to save log file and data files as, doesn't need an extension.
+    
+    Returns
+    ==========
+    psychopy.logging.LogFile
+        Text stream to receive inputs from the logging system.
+    """
+    # set how much information should be printed to the console / app
+    if PILOTING:
+        logging.console.setLevel(
+            prefs.piloting['pilotConsoleLoggingLevel']
+        )
+    else:
+        logging.console.setLevel('warning')
+
+
+def setupWindow(expInfo=None, win=None):
+    """
+    Setup the Window
+    
+    Parameters
+    ==========
+    expInfo : dict
+        Information about this experiment, created by the `setupExpInfo` function.
+    win : psychopy.visual.Window
+        Window to setup - leave as None to create a new window.
+    
+    Returns
+    ==========
+    psychopy.visual.Window
+        Window in which to run this experiment.
+    """
+    if PILOTING:
+        logging.debug('Fullscreen settings ignored as running in pilot mode.')
+    
+    if win is None:
+        # if not given a window to setup, make one
+        win = visual.Window(
+            size=_winSize, fullscr=_fullScr, screen=2,
+            winType='pyglet', allowStencil=False,
+            monitor='wfieldMonitor', color=[0,0,0], colorSpace='rgb',
+            backgroundImage='', backgroundFit='none',
+            blendMode='avg', useFBO=True,
+            units='height', 
+            checkTiming=False  # we're going to do this ourselves in a moment
+        )
+    else:
+        # if we have a window, just set the attributes which are safe to set
+        win.color = [0,0,0]
+        win.colorSpace = 'rgb'
+        win.backgroundImage = ''
+        win.backgroundFit = 'none'
+        win.units = 'height'
+    if expInfo is not None:
+        # get/measure frame rate if not already in expInfo
+        if win._monitorFrameRate is None:
+            win._monitorFrameRate, check = cached_frame_rate(
+                RefreshRateCache(REFRESH_RATE_CACHE),
+                RefreshRateCache.key(win.monitor.name, win.screen, win.size),
+                flip=win.flip,
+                measure=lambda: win.getActualFrameRate(infoMsg='Attempting to measure frame rate of screen, please wait...'),
+                n_frames=REFRESH_RATE_BURST, tolerance=REFRESH_RATE_TOLERANCE)
+            frameRateCheck.update(check)
+        expInfo['frameRate'] = win._monitorFrameRate
+        # frameRateSource, frameRateCached, frameRateBurst and frameRateError
+        for key, value in frameRateCheck.items():
+            expInfo['frameRate' + key.capitalize()] = value
+    win.mouseVisible = True
+    win.hideMessage()
+    # show a visual indicator if we're in piloting mode
+    if PILOTING and prefs.piloting['showPilotingIndicator']:
+        win.showPilotingIndicator()
+    
+    return win
+
+
+def setupDevices(expInfo, thisExp, win):
+    """
+    Setup whatever devices are available (mouse, keyboard, speaker, eyetracker, etc.) and add them to 
+    the device manager (deviceManager)
+    
+    Parameters
+    ==========
+    expInfo : dict
+        Information about this experiment, created by the `setupExpInfo` function.
+    thisExp : psychopy.data.ExperimentHandler
+        Handler object for this experiment, contains the data to save and information about 
+        where to save it to.
+    win : psychopy.visual.Window
+        Window in which to run this experiment.
+    Returns
+    ==========
+    bool
+        True if completed successfully.
+    """
+    # --- Setup input devices ---
+    if KEYBOARD_BACKEND == 'iohub':
+        import psychopy.iohub as io
+        ioConfig = {}
+        
+        # Setup iohub keyboard
+        ioConfig['Keyboard'] = dict(use_keymap='psychopy')
+        
+        # Setup iohub experiment
+        ioConfig['Experiment'] = dict(filename=thisExp.dataFileName)
+        
+        # --- Setup iohub hdf5 datastore ---
+        ioSession = str(expInfo.get('session', '1'))
+        ioDataStoreConfig = {
+            'experiment_code': 'Gratings_vis_build-v0.7',
+            'session_code': ioSession,
+            'datastore_name': thisExp.dataFileName,
+        }
+        
+        # Start ioHub server
+        ioServer = io.launchHubServer(window=win, **ioDataStoreConfig, **ioConfig)
+        
+        # store ioServer object in the device manager
+        deviceManager.ioServer = ioServer
+    
+    # create a default keyboard (e.g. to check for escape); the first keyboard
+    #   fixes the backend of every later one, key_resp included
+    if deviceManager.getDevice('defaultKeyboard') is None:
+        deviceManager.addDevice(
+            deviceClass='keyboard', deviceName='defaultKeyboard', backend=KEYBOARD_BACKEND
+        )
+    if deviceManager.getDevice('key_resp') is None:
+        # initialise key_resp
+        key_resp = deviceManager.addDevice(
+            deviceClass='keyboard',
+            deviceName='key_resp',
+        )
+    # return True if completed successfully
+    return True
+
+def pauseExperiment(thisExp, win=None, timers=[], playbackComponents=[]):
+    """
+    Pause this experiment, preventing the flow from advancing to the next routine until resumed.
+    
+    Parameters
+    ==========
+    thisExp : psychopy.data.ExperimentHandler
+        Handler object for this experiment, contains the data to save and information about 
+        where to save it to.
+    win : psychopy.visual.Window
+        Window for this experiment.
+    timers : list, tuple
+        List of timers to reset once pausing is finished.
+    playbackComponents : list, tuple
+        List of any components with a `pause` method which need to be paused.
+    """
+    # if we are not paused, do nothing
+    if thisExp.status != PAUSED:
+        return
+    
+    # start a timer to figure out how long we're paused for
+    pauseTimer = core.Clock()
+    # pause any playback components
+    for comp in playbackComponents:
+        comp.pause()
+    # make sure we have a keyboard
+    defaultKeyboard = deviceManager.getDevice('defaultKeyboard')
+    if defaultKeyboard is None:
+        defaultKeyboard = deviceManager.addKeyboard(
+            deviceClass='keyboard',
+            deviceName='defaultKeyboard',
+            backend=KEYBOARD_BACKEND,
+        )
+    # run a while loop while we wait to unpause
+    while thisExp.status == PAUSED:
+        # check for quit (typically the Esc key)
+        if defaultKeyboard.getKeys(keyList=['escape']):
+            endExperiment(thisExp, win=win)
+        # sleep 1ms so other threads can execute
+        clock.time.sleep(0.001)
+    # if stop was requested while paused, quit
+    if thisExp.status == FINISHED:
+        endExperiment(thisExp, win=win)
+    # resume any playback components
+    for comp in playbackComponents:
+        comp.play()
+    # reset any timers
+    for timer in timers:
+        timer.addTime(-pauseTimer.getTime())
+
+
+def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
+    """
+    Run the experiment flow.
+    
+    Parameters
+    ==========
+    expInfo : dict
+        Information about this experiment, created by the `setupExpInfo` function.
+    thisExp : psychopy.data.ExperimentHandler
+        Handler object for this experiment, contains the data to save and information about 
+        where to save it to.
+    psychopy.visual.Window
+        Window in which to run this experiment.
+    globalClock : psychopy.core.clock.Clock or None
+        Clock to get global time from - supply None to make a new one.
+    thisSession : psychopy.session.Session or None
+        Handle of the Session object this experiment is being run from, if any.
+    
+    Returns
+    ==========
+    bool
+        True if the flow ran to the end, False if escape ended it.
+    """
+    # mark experiment as started
+    thisExp.status = STARTED
+    # make sure variables created by exec are available globally
+    exec = environmenttools.setExecEnvironment(globals())
+    # get device handles from dict of input devices
+    ioServer = deviceManager.ioServer
+    # get/create a default keyboard (e.g. to check for escape)
+    defaultKeyboard = deviceManager.getDevice('defaultKeyboard')
+    if defaultKeyboard is None:
+        deviceManager.addDevice(
+            deviceClass='keyboard', deviceName='defaultKeyboard', backend=KEYBOARD_BACKEND
+        )
+    eyetracker = deviceManager.getDevice('eyetracker')
+    # make sure we're running in the directory for this experiment
+    os.chdir(_thisDir)
+    # get filename from ExperimentHandler for convenience
+    filename = thisExp.dataFileName
+    frameTolerance = 0.001  # how close to onset before 'same' frame
+    endExpNow = False  # flag for 'escape' or other condition => quit the exp
+    # get frame duration from frame rate in expInfo
+    if 'frameRate' in expInfo and expInfo['frameRate'] is not None:
+        frameDur = 1.0 / round(expInfo['frameRate'])
+    else:
+        frameDur = 1.0 / 60.0  # could not measure, so guess
+    
+    # Whatever the session starts (threads, the acquisition child, gc callbacks, window
+    #   handlers, patched draw functions) registers its teardown here, so an escape
+    #   or an error stops it just as the normal end does
+    session_cleanup = contextlib.ExitStack()
+    try:
+        # Start Code - component code to be run after the window creation
+    
+        # --- Initialize components for Routine "STDINPUT" ---
+    
+        # --- Initialize components for Routine "CustomTrigger" ---
+        text_waiting_message = visual.TextStim(win=win, name='text_waiting_message',
+            text='Press the SPACEBAR to begin visual stim...',
+            font='Arial',
+            pos=(0, 0), draggable=False, height=0.05, wrapWidth=None, ori=0.0, 
+            color='white', colorSpace='rgb', opacity=None, 
+            languageStyle='LTR',
+            depth=0.0);
+        key_resp = keyboard.Keyboard(deviceName='key_resp')
+    
+        # --- Initialize components for Routine "DisplayGratings" ---
+        # Run 'Begin Experiment' code from generate_grating_angles
+        #=============================== Custom Codeblock jgronemeyer =====================================#
+        grating_index = 0
+    
+        # Frame-by-frame plan of a trial for each angle, compiled once for the measured refresh
+        #   rate: gray alone, then the grating (the gray screen stays on underneath it)
+        grating_schedule = GratingSchedule(
+            [Epoch('gray', GRAY_DURATION, STIM_GRAY),
+             Epoch('grating', GRATING_DURATION, STIM_GRAY | STIM_GRATING)],
+            frame_rate=expInfo.get('frameRate') or 1.0 / frameDur,
+            orientations=grating_angles_array,
+            temporal_frequency=TEMPORAL_FREQUENCY,
+        )
+        expInfo['temporalFrequency'] = TEMPORAL_FREQUENCY
+        #==================================================================================================#
+        stim_grayScreen = visual.ImageStim(
+            win=win,
+            name='stim_grayScreen', 
+            image=None, mask=None, anchor='center',
+            ori=0.0, pos=(0, 0), draggable=False, size=(1, 1),
+            color=[0.0000, 0.0000, 0.0000], colorSpace='rgb', opacity=None,
+            flipHoriz=False, flipVert=False,
+            texRes=128.0, interpolate=True, depth=-1.0)
+        # grating_cache: Begin Experiment
+        #=============================== Custom Codeblock jgronemeyer =====================================#
+        # One ready-to-draw grating per angle; each trial's stim_grating is one of these.
+        #   setOri itself is cheap (and the drifting phase flags the same update every
+        #   frame); the point is that each grating has been drawn once before trial 1
+        grating_settings = dict(
+            win=win, name='stim_grating',
+            tex='sin', mask=None, anchor='center',
+            pos=(0, 0), draggable=False, size=(2, 2), sf=4.0, phase=0.0,
+            color=[1,1,1], colorSpace='rgb',
+            opacity=2.0, contrast=1.0, blendmode='avg',
+            texRes=256.0, interpolate=True, depth=-2.0)
+        def make_grating(ori):
+            return visual.GratingStim(ori=ori, **grating_settings)
+        grating_cache = StimulusCache(make_grating, grating_angles_array)
+        # draw each one offscreen now, so texture upload and shader setup happen before trial 1
+        grating_cache.warm_up(win)
+        #==================================================================================================#
+        # Run 'Begin Experiment' code from read_encoder
+        #=============================== Custom Codeblock jgronemeyer =====================================#
+        # Start the encoder reader (thread or child process, see ENCODER_ACQUISITION)
+        if not encoder_reader.is_alive():  # already running from an earlier session in server mode
+            encoder_reader.start()
+        if not SERVE:  # with --serve it runs until the server stops
+            session_cleanup.callback(encoder_reader.stop)
+    
+        # Stream wheel data to the BIDS beh folder during the session so an escape,
+        #   crash or power loss still leaves a log behind (see sipefield/writer.py)
+        beh_dir = os.path.join(_thisDir, f"data/{expInfo['Protocol ID']}/sub-{expInfo['Subject ID']}/ses-{expInfo['Session ID']}/beh")
+        os.makedirs(beh_dir, exist_ok=True)
+        wheel_log_path = os.path.join(beh_dir, f"sub-{expInfo['Subject ID']}_ses-{expInfo['Session ID']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_wheel.bin")
+        wheel_writer = StreamingWriter(encoder_data, wheel_log_path, interval=WHEEL_LOG_INTERVAL)
+        wheel_writer.start()
+        session_cleanup.callback(wheel_writer.stop)
+        expInfo['wheelLogFile'] = wheel_log_path
+        #==================================================================================================#
+        # frame_timing: Begin Experiment
+        #=============================== Custom Codeblock jgronemeyer =====================================#
+        # Flip times of every DisplayGratings frame; intervals over 1.5 refresh periods
+        #   are counted as dropped frames while the trial runs
+        frame_timer = FrameTimer(expInfo.get('frameRate') or 1.0 / frameDur)
+        #==================================================================================================#
+        # telemetry: Begin Experiment
+        #=============================== Custom Codeblock jgronemeyer =====================================#
+        telemetry_sinks = []
+        if 'console' in TELEMETRY_SINKS:
+            telemetry_sinks.append(ConsoleSink())
+        if 'file' in TELEMETRY_SINKS:
+            telemetry_sinks.append(FileSink(thisExp.dataFileName + '_telemetry.log'))
+        if 'socket' in TELEMETRY_SINKS:
+            telemetry_sinks.append(SocketSink(TELEMETRY_PORT))
+        telemetry_consumer = TelemetryConsumer(telemetry, telemetry_sinks, interval=TELEMETRY_INTERVAL)
+        telemetry_consumer.start()
+        # writes out whatever is still queued and closes the log/socket
+        session_cleanup.callback(telemetry_consumer.stop)
+        #==================================================================================================#
+    
+        # --- Initialize components for Routine "CustomSaving" ---
+    
+        # create some handy timers
+    
+        # global clock to track the time since experiment started
+        if globalClock is None:
+            # create a clock if not given one
+            globalClock = core.Clock()
+        if isinstance(globalClock, str):
+            # if given a string, make a clock accoridng to it
+            if globalClock == 'float':
+                # get timestamps as a simple value
+                globalClock = core.Clock(format='float')
+            elif globalClock == 'iso':
+                # get timestamps in ISO format
+                globalClock = core.Clock(format='%Y-%m-%d_%H:%M:%S.%f%z')
+            else:
+                # get timestamps in a custom format
+                globalClock = core.Clock(format=globalClock)
+        if ioServer is not None:
+            ioServer.syncClock(globalClock)
+        logging.setDefaultClock(globalClock)
+        # routine timer to track time remaining of each (possibly non-slip) routine
+        routineTimer = core.Clock()
+        win.flip()  # flip window to reset last flip timer
+        # store the exact time the global clock started
+        expInfo['expStart'] = data.getDateStr(
+            format='%Y-%m-%d %Hh%M.%S.%f %z', fractionalSecondDigits=6
+        )
+    
+        # Run 'Each Frame' code from generate_grating_angles
+        #=============================== Custom Codeblock jgronemeyer =====================================#
+        def update_grating_phase(t, frameN, index):
+            nonlocal shown_phase
+            # phase comes from the precomputed drift table; assigning it directly skips
+            #   setPhase's logging path, and an unchanged phase (static grating, or a whole
+            #   number of cycles per frame) is not re-sent at all
+            if index is None:
+                return  # absolute timeline: the trial's first row isn't due yet
+            if trial_plan.visible[index] & STIM_GRATING:
+                phase = trial_plan.phases[index]
+                if phase != shown_phase:
+                    stim_grating.phase = phase
+                    shown_phase = phase
+        #==================================================================================================#
+        # Run 'Each Frame' code from read_encoder
+        #=============================== Custom Codeblock jgronemeyer =====================================#
+        def read_encoder_each_frame(t, frameN, index):
+            # Drain every sample the reader thread has written since the last frame;
+            #   each one covers one Arduino SAMPLE_WINDOW of wheel movement
+            if not encoder_cursor.pending:
+                return
+            # one row per sample window: repeats dropped, lost windows interpolated
+            samples, interpolated = encoder_sequence.check(encoder_cursor.drain())
+            if not len(samples):
+                return
+            measured = ~interpolated
+            encoder_clock.add(samples['device_time'][measured], samples['host_time'][measured])
+            # samples without a device time (ASCII firmware, or before the first
+            #   fit) fall back to their arrival time
+            sample_times = encoder_clock.to_host(samples['device_time'])
+            sample_times = np.where(np.isnan(sample_times), samples['host_time'], sample_times) + encoder_clock_offset
+            # speed, distance, direction and acceleration for the whole chunk at once
+            metrics = locomotion.update(samples['delta'], SAMPLE_WINDOW)
+            encoder_data.extend(samples['host_time'], metrics.speed, metrics.distance, metrics.direction,
+                                metrics.acceleration, samples['device_time'], sample_times,
+                                samples['seq'], interpolated)
+        
+            #comment out/in for debugging (formatted and printed by the telemetry thread)
+            telemetry.push(TELEMETRY_WHEEL, samples['host_time'][-1], metrics.direction[-1],
+                           metrics.speed[-1], locomotion.distance)
+        #==================================================================================================#
+        # gc_control: Begin Experiment
+        #=============================== Custom Codeblock jgronemeyer =====================================#
+        # Every collection is recorded with the trial and frame it landed on (saved as <datafile>_gc.csv)
+        gc_monitor = GCMonitor(clock=core.getTime)
+        gc_monitor.start()
+        session_cleanup.callback(gc_monitor.stop)
+        gc_control = GCControl(GC_MODE, collect=GC_COLLECT, generation=GC_GENERATION,
+                               gray_bits=STIM_GRAY, monitor=gc_monitor)
+        # undo GC_MODE, so the next session (or the rest of the process) starts clean
+        session_cleanup.callback(gc_control.finish)
+        #==================================================================================================#
+        # trial_timeline: Begin Experiment
+        #=============================== Custom Codeblock jgronemeyer =====================================#
+        # Planned gray/grating onsets of every trial on globalClock, logged against the actual flips
+        trial_timeline = TrialTimeline(grating_schedule.frame_rate)
+        #==================================================================================================#
+        # escape_polling: Begin Experiment
+        #=============================== Custom Codeblock jgronemeyer =====================================#
+        escape_watcher = EscapeWatcher(defaultKeyboard, policy=ESCAPE_POLICY, interval=ESCAPE_INTERVAL,
+                                       win=win, clock=core.getTime)
+        session_cleanup.callback(escape_watcher.close)
+        #==================================================================================================#
+        # routine_engine: Begin Experiment
+        #=============================== Custom Codeblock jgronemeyer =====================================#
+        # Routines are declared once and run by sipefield.routines.RoutineEngine instead of
+        #   Builder's generated frame loops; the data file gets the same columns
+        routine_engine = RoutineEngine(
+            win, thisExp, globalClock=globalClock, routineTimer=routineTimer,
+            keyboard=defaultKeyboard, default_clock=logging.defaultClock,
+            pause=lambda: pauseExperiment(thisExp=thisExp, win=win, timers=[routineTimer], playbackComponents=[]),
+            profiler=FRAME_PROFILER, escape=escape_watcher,
+        )
+        # the gray screen matches the background, so in 'clear' mode the window's own clear
+        #   gives the gray epoch; stim_grayScreen keeps its timing and data but isn't drawn
+        gray_by_clear = GRAY_MODE == 'clear'
+        if gray_by_clear and not (stim_grayScreen.colorSpace == win.colorSpace
+                                  and np.allclose(stim_grayScreen.color, win.color)):
+            logging.warning("GRAY_MODE 'clear': stim_grayScreen isn't the window colour, drawing it instead")
+            gray_by_clear = False
+        expInfo['grayMode'] = 'clear' if gray_by_clear else 'stim'
+        STDINPUT = Routine('STDINPUT')
+        CustomTrigger = Routine('CustomTrigger', [
+            VisualComponent(text_waiting_message),
+            KeyboardComponent(key_resp, 'key_resp', key_list=['space'], force_end=True),
+        ])
+        # one DisplayGratings routine per angle, with its prebuilt grating and its trial plan;
+        #   the plan starts and stops the gray screen and the grating (see sipefield/schedule.py)
+        DisplayGratingsRoutines = [
+            Routine('DisplayGratings',
+                    [VisualComponent(stim_grayScreen, bit=STIM_GRAY, draw=not gray_by_clear),
+                     VisualComponent(grating_cache[plan.orientation], bit=STIM_GRATING)],
+                    plan=plan,
+                    each_frame=(('other', gc_control.each_frame),  # first, so collections get this frame's number
+                                ('stimulus', update_grating_phase), ('encoder', read_encoder_each_frame)),
+                    on_flip=frame_timer.record)  # flip time kept by frame_timing
+            for plan in grating_schedule.plans
+        ]
+        CustomSaving = Routine('CustomSaving')
+        shown_phase = None
+        #==================================================================================================#
+        # draw_calls: Begin Experiment
+        #=============================== Custom Codeblock jgronemeyer =====================================#
+        draw_profiler = None
+        if DRAW_PROFILE:
+            draw_profiler = DrawProfiler(win, [text_waiting_message, stim_grayScreen, *grating_cache.stimuli.values()])
+            draw_profiler.start()
+            session_cleanup.callback(draw_profiler.stop)
+        #==================================================================================================#
+        # startup_profile: Begin Experiment
+        #=============================== Custom Codeblock jgronemeyer =====================================#
+        # the experiment's first flip ends the startup profile
+        if PROFILE_STARTUP and not startup.stopped:
+            win.callOnFlip(startup.stop, 'first_frame')
+            session_cleanup.callback(startup.stop)  # escape before the first frame
+        #==================================================================================================#
+        # keyboard_backend: Begin Experiment
+        #=============================== Custom Codeblock jgronemeyer =====================================#
+        expInfo['keyboardBackend'] = KEYBOARD_BACKEND
+        #==================================================================================================#
+    
+        # --- Run Routine "STDINPUT" ---
+        if not routine_engine.run(STDINPUT):
+            endExperiment(thisExp, win=win)
+            return False
+    
+        # --- Ending Routine "STDINPUT" ---
+        thisExp.nextEntry()
+    
+        # --- Run Routine "CustomTrigger" ---
+        if not routine_engine.run(CustomTrigger):
+            endExperiment(thisExp, win=win)
+            return False
+    
+        # --- Ending Routine "CustomTrigger" ---
+        thisExp.nextEntry()
+    
+        # set up handler to look after randomisation of conditions etc
+        trials = data.TrialHandler2(
+            name='trials',
+            nReps=nTrials, 
+            method='sequential', 
+            extraInfo=expInfo, 
+            originPath=-1, 
+            trialList=[None], 
+            seed=None, 
+        )
+        thisExp.addLoop(trials)  # add the loop to the experiment
+        thisTrial = trials.trialList[0]  # so we can initialise stimuli with some values
+        # abbreviate parameter names if possible (e.g. rgb = thisTrial.rgb)
+        if thisTrial != None:
+            for paramName in thisTrial:
+                globals()[paramName] = thisTrial[paramName]
+        if thisSession is not None:
+            # if running in a Session with a Liaison client, send data up to now
+            thisSession.sendExperimentData()
+        # the wheel is recorded from the first trial on; without this, trial 1's first frame
+        #   would drain everything read since the session started (instructions, the wait for space)
+        encoder_cursor.skip()
+    
+        for thisTrial in trials:
+            currentLoop = trials
+            thisExp.timestampOnFlip(win, 'thisRow.t', format=globalClock.format)
+            if thisSession is not None:
+                # if running in a Session with a Liaison client, send data up to now
+                thisSession.sendExperimentData()
+            # abbreviate parameter names if possible (e.g. rgb = thisTrial.rgb)
+            if thisTrial != None:
+                for paramName in thisTrial:
+                    globals()[paramName] = thisTrial[paramName]
+        
+            # --- Prepare to start Routine "DisplayGratings" ---
+            # Run 'Begin Routine' code from generate_grating_angles
+            #=============================== Custom Codeblock jgronemeyer =====================================#
+            #grating_angle = random.choice(grating_angles_array)
+        
+            trial_plan = grating_schedule.trial(grating_index)
+            grating_angle = trial_plan.orientation
+            # the routine for this angle, with its prebuilt grating (see grating_cache)
+            DisplayGratings = DisplayGratingsRoutines[grating_index]
+            stim_grating = grating_cache[grating_angle]
+            telemetry.push(TELEMETRY_TRIAL, core.getTime(), grating_index, grating_angle, trials.thisN)
+            grating_index += 1
+            
+            if grating_index == len(grating_angles_array):
+                grating_index = 0
+            # nothing on screen yet; the plan decides what each frame shows
+            shown_phase = None
+            #==================================================================================================#
+            # Run 'Begin Routine' code from read_encoder
+            #=============================== Custom Codeblock jgronemeyer =====================================#
+            # Offset from core.getTime(), which stamps encoder samples, to globalClock
+            encoder_clock_offset = globalClock.getTime(format='float') - core.getTime()
+            #==================================================================================================#
+            # frame_timing: Begin Routine
+            #=============================== Custom Codeblock jgronemeyer =====================================#
+            # win.flip() returns its time on logging.defaultClock; the offset puts the saved flips on globalClock
+            frame_timer.start_trial(trials.thisN, clock_offset=globalClock.getTime(format='float') - logging.defaultClock.getTime())
+            #==================================================================================================#
+            # gc_control: Begin Routine
+            #=============================== Custom Codeblock jgronemeyer =====================================#
+            # no automatic collection until the trial ends (unless GC_MODE is 'auto')
+            gc_control.begin_trial(trials.thisN, DisplayGratings.plan)
+            #==================================================================================================#
+            # trial_timeline: Begin Routine
+            #=============================== Custom Codeblock jgronemeyer =====================================#
+            trial_onset = trial_timeline.start_trial(trials.thisN, DisplayGratings.plan,
+                                                     win.getFutureFlipTime(clock=globalClock),
+                                                     paused=routine_engine.paused)
+            #==================================================================================================#
+        
+            # --- Run Routine "DisplayGratings" ---
+            # if trial has changed, skip the Routine
+            if isinstance(trials, data.TrialHandler2) and thisTrial.thisN != trials.thisTrial.thisN:
+                routineTimer.reset()
+            elif not routine_engine.run(DisplayGratings, start=trial_onset if ABSOLUTE_TIMELINE else None):
+                endExperiment(thisExp, win=win)
+                return False
+        
+            # --- Ending Routine "DisplayGratings" ---
+            # frame_timing: End Routine
+            #=============================== Custom Codeblock jgronemeyer =====================================#
+            # Dropped frames, longest flip interval and how long each stimulus was really shown
+            frame_summary = frame_timer.end_trial(
+                gray=(getattr(stim_grayScreen, 'frameNStart', None), getattr(stim_grayScreen, 'frameNStop', None)),
+                grating=(getattr(stim_grating, 'frameNStart', None), getattr(stim_grating, 'frameNStop', None)),
+            )
+            for key in ('dropped', 'max_interval', 'gray_duration', 'grating_duration'):
+                thisExp.addData(f'frames.{key}', frame_summary[key])
+            #==================================================================================================#
+            # gc_control: End Routine
+            #=============================== Custom Codeblock jgronemeyer =====================================#
+            gc_control.end_trial()
+            gc_summary = gc_monitor.trial_summary(trials.thisN, STIM_GRATING)
+            for key in ('collections', 'on_stimulus', 'max_pause'):
+                thisExp.addData(f'gc.{key}', gc_summary[key])
+            #==================================================================================================#
+            # trial_timeline: End Routine
+            #=============================== Custom Codeblock jgronemeyer =====================================#
+            # planned onsets vs the flips they landed on, all on globalClock
+            timeline_record = trial_timeline.end_trial({
+                'gray': flip_on_clock(getattr(stim_grayScreen, 'tStartRefresh', None), logging.defaultClock, globalClock),
+                'grating': flip_on_clock(getattr(stim_grating, 'tStartRefresh', None), logging.defaultClock, globalClock),
+            })
+            for key, value in timeline_record.items():
+                if key != 'trial':
+                    thisExp.addData(f'timeline.{key}', value)
+            #==================================================================================================#
+            # Run 'End Routine' code from read_encoder
+            #save the dataframe trial by trial
+            #thisExp.addData('encoder_data', encoder_data)
+        
+            #TODO: instantiate new dataframe at beginning of each
+            #routine. Currently, this just incrementally appends
+            #resulting in duplicate data. 
+        
+            #For now, data is exported separately on End Experiment
+            #in a .csv
+            thisExp.nextEntry()
+        
+        # completed nTrials repeats of 'trials'
+    
+        if thisSession is not None:
+            # if running in a Session with a Liaison client, send data up to now
+            thisSession.sendExperimentData()
+        # get names of stimulus parameters
+        if trials.trialList in ([], [None], None):
+            params = []
+        else:
+            params = trials.trialList[0].keys()
+        # save data for this loop
+        trials.saveAsExcel(filename + '.xlsx', sheetName='trials',
+            stimOut=params,
+            dataOut=['n','all_mean','all_std', 'all_raw'])
+        trials.saveAsText(filename + 'trials.csv', delim=',',
+            stimOut=params,
+            dataOut=['n','all_mean','all_std', 'all_raw'])
+    
+        # --- Run Routine "CustomSaving" ---
+        if not routine_engine.run(CustomSaving):
+            endExperiment(thisExp, win=win)
+            return False
+    
+        # --- Ending Routine "CustomSaving" ---
+        thisExp.nextEntry()
+        # Run 'End Experiment' code from save_encoder_data
+        #=============================== Custom Codeblock jgronemeyer =====================================#
+        # Sipelab standard BIDS protocol file naming for 
+        #   future batch analysis and data wrangling
+        protocol_id = expInfo['Protocol ID']
+        subject_id = expInfo['Subject ID']
+        session_id = expInfo['Session ID']
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S') # get current timestamp (BIDS)
+    
+        #save_to = u'data/%s/sub-%s/ses-%s/beh' % (expInfo['Protocol ID'], expInfo['Subject ID'], expInfo['Session ID'])
+        save_to = f'data/{protocol_id}/sub-{subject_id}/ses-{session_id}/beh'
+        new_dir = os.path.join(_thisDir, save_to)
+    
+        # Create the path if it does not exist
+        if not os.path.exists(new_dir):
+            os.makedirs(new_dir)
+    
+    
+        filename = os.path.join(new_dir, f"sub-{subject_id}_ses-{session_id}_{timestamp}_wheeldf.csv")
+    
+        expInfo['wheelDataFile'] = filename
+        # record the device-to-host clock fit alongside the session info
+        expInfo['encoderClockSlope'] = encoder_clock.slope
+        expInfo['encoderClockResidualStd'] = encoder_clock.residual_std
+        # and how many sample windows were lost or repeated on the serial link
+        expInfo['encoderMissingSamples'] = encoder_sequence.missing
+        expInfo['encoderDuplicateSamples'] = encoder_sequence.duplicates
+        if encoder_sequence.missing:
+            logging.warning(f"encoder: {encoder_sequence.missing} sample windows missing in "
+                            f"{len(encoder_sequence.gaps)} gaps, {encoder_sequence.filled} interpolated")
+        encoder_data.to_dataframe().to_csv(filename, index=False)
+        #==================================================================================================#
+        # frame_timing: End Experiment
+        #=============================== Custom Codeblock jgronemeyer =====================================#
+        # Every flip and the per-trial summaries, next to the trial CSV
+        frame_timer.save(thisExp.dataFileName)
+        #==================================================================================================#
+        # draw_calls: End Experiment
+        #=============================== Custom Codeblock jgronemeyer =====================================#
+        if draw_profiler is not None:
+            draw_profiler.save(thisExp.dataFileName)
+        #==================================================================================================#
+        # trial_timeline: End Experiment
+        #=============================== Custom Codeblock jgronemeyer =====================================#
+        trial_timeline.save(thisExp.dataFileName)
+        expInfo['timelineMaxError'] = trial_timeline.max_error()
+        if trial_timeline.max_error() > 1.0 / trial_timeline.frame_rate:
+            logging.warning(f"timeline: an onset was {trial_timeline.max_error() * 1000:.1f} ms off its deadline")
+        #==================================================================================================#
+        # gc_control: End Experiment
+        #=============================== Custom Codeblock jgronemeyer =====================================#
+        gc_monitor.save(thisExp.dataFileName)
+        gc_on_stimulus = int(np.count_nonzero(gc_monitor.events['visible'] & STIM_GRATING))
+        if gc_on_stimulus:
+            logging.warning(f"gc: {gc_on_stimulus} collections landed on grating frames")
+        #==================================================================================================#
+        # startup_profile: End Experiment
+        #=============================== Custom Codeblock jgronemeyer =====================================#
+        if PROFILE_STARTUP and not startup.saved:  # with --serve, only the first session
+            startup.save(thisExp.dataFileName)
+            print(startup.report())
+        #==================================================================================================#
+        # escape_polling: End Experiment
+        #=============================== Custom Codeblock jgronemeyer =====================================#
+        escape_summary = escape_watcher.summary()
+        expInfo['escapePolicy'] = escape_summary['policy']
+        expInfo['escapeChecks'] = escape_summary['checks']
+        expInfo['escapeCheckMean'] = escape_summary['check_mean']
+        expInfo['escapeSavedPerFrame'] = escape_summary['saved_per_frame']
+        logging.info(f"escape: {escape_summary['checks']} keyboard checks in {escape_summary['frames']} frames, "
+                     f"{escape_summary['check_mean'] * 1e6:.0f} us each; "
+                     f"{escape_summary['saved_per_frame'] * 1e6:.1f} us saved per frame")
+        #==================================================================================================#
+    
+        # mark experiment as finished
+        endExperiment(thisExp, win=win)
+        return True
+    finally:
+        session_cleanup.close()
+
+
+def saveData(thisExp):
+    """
+    Save data from this experiment
+    
+    Parameters
+    ==========
+    thisExp : psychopy.data.ExperimentHandler
+        Handler object for this experiment, contains the data to save and information about 
+        where to save it to.
+    """
+    filename = thisExp.dataFileName
+    # these shouldn't be strictly necessary (should auto-save)
+    thisExp.saveAsWideText(filename + '.csv', delim='comma')
+    thisExp.saveAsPickle(filename)
+
+
+def endExperiment(thisExp, win=None):
+    """
+    End this experiment, performing final shut down operations.
+    
+    This function does NOT close the window or end the Python process - use `quit` for this.
+    
+    Parameters
+    ==========
+    thisExp : psychopy.data.ExperimentHandler
+        Handler object for this experiment, contains the data to save and information about 
+        where to save it to.
+    win : psychopy.visual.Window
+        Window for this experiment.
+    """
+    if win is not None:
+        # remove autodraw from all current components
+        win.clearAutoDraw()
+        # Flip one final time so any remaining win.callOnFlip() 
+        # and win.timeOnFlip() tasks get executed
+        win.flip()
+    # return console logger level to WARNING
+    logging.console.setLevel(logging.WARNING)
+    # mark experiment handler as finished
+    thisExp.status = FINISHED
+
+
+def quit(thisExp, win=None, thisSession=None):
+    """
+    Fully quit, closing the window and ending the Python process.
+    
+    Parameters
+    ==========
+    win : psychopy.visual.Window
+        Window to close.
+    thisSession : psychopy.session.Session or None
+        Handle of the Session object this experiment is being run from, if any.
+    """
+    thisExp.abort()  # or data files will save again on exit
+    # make sure everything is closed down
+    if win is not None:
+        # Flip one final time so any remaining win.callOnFlip() 
+        # and win.timeOnFlip() tasks get executed before quitting
+        win.flip()
+        win.close()
+    if thisSession is not None:
+        thisSession.stop()
+    # terminate Python process
+    core.quit()
+
+
+# if running this experiment as a script...
+if __name__ == '__main__' and SERVE:
+    serveSessions()
+    core.quit()
+elif __name__ == '__main__':
+    startup.mark('top level')  # imports and Before Experiment code done
+    # call all functions in order
+    with startup.phase('setupData'):
+        thisExp = setupData(expInfo=expInfo)
+    with startup.phase('setupLogging'):
+        logFile = setupLogging(filename=thisExp.dataFileName)
+    with startup.phase('setupWindow'):
+        win = setupWindow(expInfo=expInfo)
+    with startup.phase('setupDevices'):
+        setupDevices(expInfo=expInfo, thisExp=thisExp, win=win)
+    run(
+        expInfo=expInfo, 
+        thisExp=thisExp, 
+        win=win,
+        globalClock='float'
+    )
+    saveData(thisExp=thisExp)
+    quit(thisExp=thisExp, win=win)
@@ -0,0 +1,153 @@
+"""Frame-interval jitter with the encoder reader in a thread vs a child process.
+
+A stand-in for DisplayGratings runs a 60 Hz frame loop in the main thread.
+Each frame does some pure-Python work, standing in for stimulus updates and
+draw calls, and drains the encoder ring. Then it sleeps until the next
+simulated vsync, the way ``win.flip()`` blocks. Meanwhile the firmware emulator
+floods a pseudo-terminal (pty) at a high sample rate. The reader is either an
+`EncoderReader` thread in the same interpreter, competing for the GIL, or an
+`EncoderProcess` writing to a shared-memory ring.
+
+For each mode the benchmark reports the spread of frame intervals and the
+number of frames that ran late, i.e. whose interval exceeded 1.5 times the
+refresh period (a dropped frame on a real display).
+
+Usage (Linux/macOS, needs a pty)::
+
+    python benchmarks/bench_acquisition.py --seconds 10 --rate 5000 --out acquisition.json
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import tty
+
+import numpy as np
+import serial
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from sipefield.acquisition import EncoderProcess  # noqa: E402
+from sipefield.emulator import EncoderEmulator  # noqa: E402
+from sipefield.reader import POLL_TIMEOUT, EncoderReader  # noqa: E402
+from sipefield.ring import SampleRing  # noqa: E402
+
+REFRESH_RATE = 60.0  # Hz
+
+
+def busy_python(seconds):
+    """Spin in interpreted code (holding the GIL) for roughly ``seconds``."""
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        for i in range(200):
+            total += i * i
+    return total
+
+
+def feed_pty(fd, emulator, rate, stop_event):
+    """Write emulator output at ``rate`` samples/s until ``stop_event`` is set."""
+    sent = 0
+    start = time.perf_counter()
+    while not stop_event.is_set():
+        due = int((time.perf_counter() - start) * rate) - sent
+        if due > 0:
+            os.write(fd, emulator.encode([1] * due))
+            sent += due
+        time.sleep(0.001)
+
+
+def frame_loop(cursor, seconds, work):
+    """Run the simulated frame loop; returns frame start times and samples drained."""
+    period = 1.0 / REFRESH_RATE
+    n_frames = int(seconds * REFRESH_RATE)
+    starts = np.empty(n_frames)
+    drained = 0
+    next_flip = time.perf_counter() + period
+    for frame in range(n_frames):
+        starts[frame] = time.perf_counter()
+        busy_python(work)
+        if cursor.pending:
+            drained += len(cursor.drain())
+        # wait for the next vsync, skipping any we have already missed
+        now = time.perf_counter()
+        while next_flip <= now:
+            next_flip += period
+        time.sleep(next_flip - now)
+    return starts, drained
+
+
+def run_case(mode, rate, seconds, work, protocol):
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    port_name = os.ttyname(slave)
+    baudrate = 250000
+    port = None
+    if mode == 'process':
+        reader = EncoderProcess(port_name, baudrate, protocol=protocol, capacity=1 << 20)
+        ring = reader.ring
+    else:
+        port = serial.Serial(port_name, baudrate=baudrate, timeout=POLL_TIMEOUT)
+        ring = SampleRing(capacity=1 << 20)
+        reader = EncoderReader(port, ring, protocol=protocol, clock=time.perf_counter)
+    reader.start()
+    cursor = ring.cursor()
+
+    stop_feed = threading.Event()
+    feeder = threading.Thread(target=feed_pty, daemon=True,
+                              args=(master, EncoderEmulator(1.0 / max(rate, 1), protocol=protocol),
+                                    rate, stop_feed))
+    if rate:
+        feeder.start()
+    starts, drained = frame_loop(cursor, seconds, work)
+    stop_feed.set()
+    reader.stop()
+    if port is not None:
+        port.close()
+    os.close(master)
+    os.close(slave)
+
+    intervals = np.diff(starts) * 1e3
+    period_ms = 1e3 / REFRESH_RATE
+    return {
+        'mode': mode,
+        'rate_hz': rate,
+        'protocol': protocol,
+        'seconds': seconds,
+        'frames': len(starts),
+        'samples_drained': drained,
+        'interval_mean_ms': float(intervals.mean()),
+        'interval_std_ms': float(intervals.std()),
+        'interval_p99_ms': float(np.percentile(intervals, 99)),
+        'interval_max_ms': float(intervals.max()),
+        'late_frames': int(np.count_nonzero(intervals > 1.5 * period_ms)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--rate', type=int, default=5000, help='encoder samples per second')
+    parser.add_argument('--protocol', default='ascii', choices=('ascii', 'binary'))
+    parser.add_argument('--work', type=float, default=0.012,
+                        help='seconds of Python work per frame (period is 16.7 ms)')
+    parser.add_argument('--out', help='write results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    results = []
+    for rate in (0, args.rate):
+        for mode in ('thread', 'process'):
+            result = run_case(mode, rate, args.seconds, args.work, args.protocol)
+            results.append(result)
+            print("{mode:8s} {rate_hz:6d} Hz  drained {samples_drained:7d}  "
+                  "interval {interval_mean_ms:6.2f} +/- {interval_std_ms:5.2f} ms  "
+                  "p99 {interval_p99_ms:6.2f}  max {interval_max_ms:6.2f}  "
+                  "late {late_frames}/{frames}".format(**result))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""Per-frame cost and reaction time of each escape polling policy.
+
+Runs DisplayGratings trials through `RoutineEngine` on the simulated window,
+clocks and stimuli of ``bench_routine_engine.py``. The escape check goes
+through an `EscapeWatcher` under each policy. The default keyboard is a
+stand-in whose ``getKeys`` busy-waits ``--cost`` microseconds, the price of
+a poll: a round trip to the ioHub process is typically 100-300 us, and a
+Psychtoolbox queue check is a few tens. Time is simulated, one refresh per
+flip, so only the Python work per frame is measured.
+
+For each policy the benchmark reports:
+
+- the time per frame (best of ``--repeats`` interleaved runs), and how much
+  less it is than checking every frame;
+- the watcher's own estimate of the time saved per frame (`EscapeWatcher.summary`),
+  which the script records in ``expInfo``; the two should agree;
+- how many frames pass between an escape press (``--press`` s into the
+  session) and the routine stopping.
+
+The 'window' policy needs pyglet for its key symbols and is skipped without it.
+
+Usage::
+
+    python benchmarks/bench_escape.py --trials 40 --cost 150 --out escape.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests'))
+from sipefield.escape import ESCAPE_POLICIES, EscapeWatcher  # noqa: E402
+from sipefield.routines import Routine, RoutineEngine, VisualComponent  # noqa: E402
+from sipefield.schedule import STIM_GRATING, STIM_GRAY, Epoch, GratingSchedule  # noqa: E402
+from fakes import (ANGLES, FRAME_RATE, SimClock, SimExperiment,  # noqa: E402
+                   SimStim, SimTime, SimWindow)
+
+try:
+    from pyglet.window import key
+except ImportError:
+    key = None
+
+
+class SlowKeyboard:
+    """Default keyboard whose every poll costs ``cost`` seconds; escape is down from ``press`` on."""
+
+    def __init__(self, sim, cost, press=None):
+        self.sim = sim
+        self.cost = cost
+        self.press = press
+
+    def getKeys(self, keyList=None, ignoreKeys=None, waitRelease=True):
+        end = time.perf_counter() + self.cost
+        while time.perf_counter() < end:
+            pass
+        if self.press is not None and self.sim.now >= self.press:
+            self.press = None
+            return ['escape']
+        return []
+
+
+class SimHandle:
+    """The pyglet window's handler stack, as far as `EscapeWatcher` uses it."""
+
+    def __init__(self):
+        self.handlers = []
+
+    def push_handlers(self, on_key_press):
+        self.handlers.append(on_key_press)
+
+    def remove_handlers(self, on_key_press):
+        self.handlers.remove(on_key_press)
+
+
+class KeyWindow(SimWindow):
+    """`SimWindow` that dispatches an escape press to its handlers on the first flip after ``press``."""
+
+    def __init__(self, sim, default_clock, press=None):
+        super().__init__(sim, default_clock)
+        self.winHandle = SimHandle()
+        self.press = press
+
+    def flip(self):
+        now = super().flip()
+        if self.press is not None and now >= self.press:
+            self.press = None
+            for handler in self.winHandle.handlers:
+                handler(key.ESCAPE, 0)
+        return now
+
+
+def run_session(policy, n_trials, cost, interval, press=None):
+    sim = SimTime()
+    default_clock = SimClock(sim)
+    win = KeyWindow(sim, default_clock, press)
+    thisExp = SimExperiment(win)
+    keyboard = SlowKeyboard(sim, cost, press)
+    schedule = GratingSchedule([Epoch('gray', 3.0, STIM_GRAY),
+                                Epoch('grating', 2.0, STIM_GRAY | STIM_GRATING)],
+                               FRAME_RATE, ANGLES)
+    gray = SimStim('stim_grayScreen')
+    gratings = {angle: SimStim('stim_grating') for angle in ANGLES}
+    routines = [Routine('DisplayGratings',
+                        [VisualComponent(gray, bit=STIM_GRAY),
+                         VisualComponent(gratings[plan.orientation], bit=STIM_GRATING)],
+                        plan=plan)
+                for plan in schedule.plans]
+    watcher = EscapeWatcher(keyboard, policy=policy, interval=interval, win=win, clock=default_clock.getTime)
+    engine = RoutineEngine(win, thisExp, SimClock(sim), SimClock(sim), keyboard, default_clock, escape=watcher)
+    start = time.perf_counter()
+    for trial in range(n_trials):
+        if not engine.run(routines[trial % len(routines)]):
+            break
+    elapsed = time.perf_counter() - start
+    watcher.close()
+    return elapsed, win.flips, sim.now, watcher.summary()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trials', type=int, default=40)
+    parser.add_argument('--cost', type=float, default=150.0, help='time per keyboard poll (us)')
+    parser.add_argument('--interval', type=float, default=0.1, help="s between checks with 'throttled'")
+    parser.add_argument('--press', type=float, default=7.3, help='escape press for the reaction run (s)')
+    parser.add_argument('--repeats', type=int, default=3, help='best of this many runs')
+    parser.add_argument('--out', help='write results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    policies = [policy for policy in ESCAPE_POLICIES if policy != 'window' or key is not None]
+    cost = args.cost * 1e-6
+    best = dict.fromkeys(policies, float('inf'))
+    results = {}
+    # interleave the policies so drifting clock speeds affect them alike
+    for _ in range(args.repeats):
+        for policy in policies:
+            elapsed, frames, _, summary = run_session(policy, args.trials, cost, args.interval)
+            best[policy] = min(best[policy], elapsed)
+            results[policy] = {'frames': frames, 'summary': summary}
+    baseline = 1e6 * best['frame'] / results['frame']['frames']
+    for policy in policies:
+        r = results[policy]
+        r['per_frame_us'] = 1e6 * best[policy] / r['frames']
+        r['saved_us'] = baseline - r['per_frame_us']
+        r['estimated_saved_us'] = 1e6 * r['summary']['saved_per_frame']
+        _, _, stopped, _ = run_session(policy, args.trials, cost, args.interval, press=args.press)
+        r['reaction_frames'] = round((stopped - args.press) * FRAME_RATE)
+        print(f"{policy:9s} {r['per_frame_us']:7.2f} us/frame, {r['saved_us']:6.2f} us saved "
+              f"(watcher's estimate {r['estimated_saved_us']:6.2f}), {r['summary']['checks']} checks "
+              f"in {r['frames']} frames, escape stops it {r['reaction_frames']} frames after the press")
+    if key is None:
+        print("window    skipped: pyglet is not installed")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""Skipped sample windows: the old modulo schedule vs the deadline schedule.
+
+Part one replays simulated ``loop()`` passes through the emulator's copies of
+the sketch's two scheduling rules, `ModuloSchedule` and `DeadlineSchedule`.
+A pass normally takes ``--loop-us`` microseconds, with some jitter, and now
+and then the loop stalls for a few milliseconds (a serial write blocking,
+interrupt load). The part reports how many sample windows each rule emitted,
+how many it skipped, and how late the deadline rule's samples were.
+
+Part two checks the host side end to end. A `PtyEncoder` drops bytes on its
+way to an `EncoderReader`, and a `SequenceChecker` must report exactly the
+windows that never arrived and fill them back in.
+
+Usage::
+
+    python benchmarks/bench_firmware_schedule.py --seconds 120 --out schedule.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from sipefield.emulator import DeadlineSchedule, FaultInjector, ModuloSchedule, PtyEncoder  # noqa: E402
+
+
+def loop_pass_times(seconds, loop_us, stall_probability, seed):
+    """``micros()`` at the start of each simulated ``loop()`` pass."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * 1e6 / loop_us * 1.1)
+    durations = loop_us * rng.uniform(0.5, 1.5, n)
+    stalls = rng.random(n) < stall_probability
+    durations[stalls] += rng.uniform(500, 5000, np.count_nonzero(stalls))
+    times = np.cumsum(durations).astype(np.int64)
+    return times[times < seconds * 1e6]
+
+
+def replay(schedule, times):
+    """Times of the passes on which ``schedule`` takes a sample."""
+    poll = schedule.poll
+    return np.array([t for t in times.tolist() if poll(t)], dtype=np.int64)
+
+
+def schedule_case(rate, seconds, loop_us, stall_probability, seed):
+    window_us = 1_000_000 // rate
+    times = loop_pass_times(seconds, loop_us, stall_probability, seed)
+    expected = int(times[-1] // window_us)
+    modulo = replay(ModuloSchedule(window_us // 1000), times)
+    deadline = replay(DeadlineSchedule(window_us), times)
+    lateness = deadline[:expected] - window_us * np.arange(1, min(expected, len(deadline)) + 1)
+    return {
+        'rate_hz': rate,
+        'seconds': seconds,
+        'loop_passes': len(times),
+        'windows': expected,
+        'modulo_emitted': len(modulo),
+        'modulo_skipped': expected - len(modulo),
+        'deadline_emitted': len(deadline),
+        'deadline_skipped': expected - len(deadline),
+        'deadline_late_p99_us': float(np.percentile(lateness, 99)),
+        'deadline_late_max_us': float(lateness.max()),
+    }
+
+
+def host_case(seconds, window, drop_rate, seed):
+    import serial
+
+    from sipefield.reader import POLL_TIMEOUT, EncoderReader
+    from sipefield.ring import SampleRing
+    from sipefield.sequence import SequenceChecker
+
+    encoder = PtyEncoder(window, 'binary', faults=FaultInjector(drop_rate=drop_rate, seed=seed), seed=seed)
+    port = serial.Serial(encoder.port, baudrate=encoder.baudrate, timeout=POLL_TIMEOUT)
+    ring = SampleRing(capacity=1 << 20)
+    reader = EncoderReader(port, ring)
+    reader.start()
+    encoder.start()
+    cursor = ring.cursor()
+    checker = SequenceChecker()
+    checked = []
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        samples, _ = checker.check(cursor.drain())
+        checked.append(samples['seq'])
+        time.sleep(1 / 60)
+    encoder.stop()
+    time.sleep(0.25)
+    reader.stop()
+    samples, _ = checker.check(cursor.drain())
+    checked.append(samples['seq'])
+    port.close()
+    encoder.close()
+
+    received = ring.copy_range(0, ring.head)['seq']
+    checked = np.concatenate(checked)
+    truly_missing = int(received[-1] - received[0] + 1 - len(np.unique(received)))
+    return {
+        'rate_hz': 1.0 / window,
+        'sent': encoder.samples,
+        'received': len(received),
+        'truly_missing': truly_missing,
+        'reported_missing': checker.missing,
+        'filled': checker.filled,
+        'gap_free': bool(np.array_equal(checked, np.arange(checked[0], checked[-1] + 1))),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=120.0, help='simulated firmware run time')
+    parser.add_argument('--loop-us', type=float, default=300.0, help='typical loop() pass (us)')
+    parser.add_argument('--stalls', type=float, default=1e-3, help='probability a pass stalls')
+    parser.add_argument('--host-seconds', type=float, default=5.0, help='pty run time (s)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='write results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    results = {'schedule': [], 'host': []}
+    for rate in (20, 100, 500):
+        result = schedule_case(rate, args.seconds, args.loop_us, args.stalls, args.seed)
+        results['schedule'].append(result)
+        print("{rate_hz:4d} Hz  windows {windows}  modulo skipped {modulo_skipped}  "
+              "deadline skipped {deadline_skipped} (late p99 {deadline_late_p99_us:.0f} us, "
+              "max {deadline_late_max_us:.0f} us)".format(**result))
+    if os.name == 'posix':
+        result = host_case(args.host_seconds, 0.001, 1e-4, args.seed)
+        results['host'].append(result)
+        print("host  {rate_hz:.0f} Hz  received {received}/{sent}  missing {truly_missing}, "
+              "reported {reported_missing}, filled {filled}  gap-free {gap_free}".format(**result))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Per-frame cost of the DisplayGratings flip timing recorder.
+
+Simulates trials of 300 flips at 60 Hz, with an occasional long interval, and
+times `FrameTimer.record` per flip and `FrameTimer.end_trial` per trial. The
+budget is well under 50 us per frame.
+
+Usage::
+
+    python benchmarks/bench_frame_timer.py --trials 200 --out frame_timer.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from sipefield.frametiming import FrameTimer  # noqa: E402
+
+FRAMES_PER_TRIAL = 300
+FRAME_RATE = 60.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trials', type=int, default=200)
+    parser.add_argument('--out', help='write results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    period = 1.0 / FRAME_RATE
+    intervals = np.where(rng.random((args.trials, FRAMES_PER_TRIAL)) < 0.01, 2 * period, period)
+    flips = np.cumsum(intervals).reshape(args.trials, FRAMES_PER_TRIAL).tolist()
+
+    timer = FrameTimer(FRAME_RATE)
+    record_time = 0.0
+    end_time = 0.0
+    for trial, trial_flips in enumerate(flips):
+        timer.start_trial(trial)
+        start = time.perf_counter()
+        for frame, flip in enumerate(trial_flips):
+            timer.record(flip, frame)
+        record_time += time.perf_counter() - start
+        start = time.perf_counter()
+        timer.end_trial(grating=(180, FRAMES_PER_TRIAL))
+        end_time += time.perf_counter() - start
+
+    frames = args.trials * FRAMES_PER_TRIAL
+    result = {
+        'frames': frames,
+        'record_us': 1e6 * record_time / frames,
+        'end_trial_us': 1e6 * end_time / args.trials,
+        'per_frame_us': 1e6 * (record_time + end_time) / frames,
+        'dropped_detected': int(sum(summary['dropped'] for summary in timer.summaries)),
+        'dropped_injected': int(np.count_nonzero(intervals > 1.5 * period)),
+    }
+    print("record {record_us:.2f} us/flip  end_trial {end_trial_us:.1f} us/trial  "
+          "total {per_frame_us:.2f} us/frame  dropped {dropped_detected}/{dropped_injected}".format(**result))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
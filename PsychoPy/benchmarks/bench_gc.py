@@ -0,0 +1,123 @@
+"""Garbage collections on stimulus frames under each GC_MODE.
+
+Simulates DisplayGratings trials (3 s gray, 2 s grating at 60 Hz) without
+waiting for real flips. A long-lived heap stands in for the stimuli, PsychoPy
+and pandas. Each frame makes the sort of garbage a real frame loop makes: a
+data row, a formatted message, a small reference cycle and now and then a
+pandas concat. A `GCMonitor` records every collection. For each mode the
+benchmark reports how many collections landed on grating frames, the longest
+one there, and how long the explicit collections took.
+
+Usage::
+
+    python benchmarks/bench_gc.py --trials 40 --out gc.json
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from sipefield.gccontrol import GCMonitor, GCControl  # noqa: E402
+from sipefield.schedule import Epoch, GratingSchedule, STIM_GRAY, STIM_GRATING  # noqa: E402
+
+FRAME_RATE = 60.0
+
+
+class Node:
+    """A container object the collector has to track."""
+
+    def __init__(self, value):
+        self.value = value
+        self.parent = None
+
+
+def long_lived_heap(n):
+    """``n`` tracked objects that live for the whole session."""
+    return [{'index': i, 'node': Node(i), 'tags': [i, str(i)]} for i in range(n)]
+
+
+def frame_garbage(frame, rows, chunks):
+    rows.append({'frame': frame, 'message': f"frame {frame}: phase {frame * 0.016:.3f}"})
+    parent = Node(frame)
+    child = Node(frame)
+    parent.value, child.parent = child, parent  # a cycle only the collector can free
+    if frame % 3 == 0:
+        chunks.append(pd.DataFrame({'speed': np.zeros(3), 'distance': np.zeros(3)}))
+        if len(chunks) > 20:
+            pd.concat(chunks)
+            chunks.clear()
+
+
+def run_trials(mode, collect, generation, n_trials, heap_size):
+    heap = long_lived_heap(heap_size)  # noqa: F841  kept alive for the whole run
+    schedule = GratingSchedule([Epoch('gray', 3.0, STIM_GRAY),
+                                Epoch('grating', 2.0, STIM_GRAY | STIM_GRATING)],
+                               FRAME_RATE, [0, 45, 90, 135])
+    monitor = GCMonitor()
+    control = GCControl(mode, collect=collect, generation=generation, gray_bits=STIM_GRAY, monitor=monitor)
+    rows = []
+    chunks = []
+    gc.collect()
+    monitor.start()
+    try:
+        for trial in range(n_trials):
+            plan = schedule.trial(trial)
+            control.begin_trial(trial, plan)
+            for frameN in range(plan.n_frames):
+                control.each_frame(frameN / FRAME_RATE, frameN, frameN)
+                frame_garbage(frameN, rows, chunks)
+            control.end_trial()
+            rows.clear()
+    finally:
+        monitor.stop()
+        control.finish()
+    events = monitor.events
+    during = events[events['frame'] >= 0]
+    # tagged with the frame on screen, so this includes a 'between' collection held on a trial's last grating frame
+    on_stimulus = events[(events['visible'] & STIM_GRATING) != 0]
+    # the between-trial collections carry their trial's number; the freeze's has none
+    between = events[(events['frame'] < 0) & (events['trial'] >= 0)]
+    explicit = between if collect == 'between' else during[during['visible'] == STIM_GRAY]
+    return {
+        'collections': int(len(events)),
+        'during_trials': int(len(during)),
+        'on_stimulus': int(len(on_stimulus)),
+        'max_stimulus_pause_ms': 1e3 * float(on_stimulus['duration'].max()) if len(on_stimulus) else 0.0,
+        'gen2_on_stimulus': int(np.count_nonzero(on_stimulus['generation'] == 2)),
+        'explicit_mean_ms': 1e3 * float(explicit['duration'].mean()) if mode != 'auto' and len(explicit) else None,
+        'explicit_max_ms': 1e3 * float(explicit['duration'].max()) if mode != 'auto' and len(explicit) else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trials', type=int, default=40)
+    parser.add_argument('--heap', type=int, default=200000, help='long-lived tracked objects')
+    parser.add_argument('--collect', choices=('gray', 'between'), default='gray')
+    parser.add_argument('--generation', type=int, default=2)
+    parser.add_argument('--out', help='write results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for mode in ('auto', 'disable', 'freeze'):
+        start = time.perf_counter()
+        results[mode] = run_trials(mode, args.collect, args.generation, args.trials, args.heap)
+        results[mode]['run_s'] = time.perf_counter() - start
+        r = results[mode]
+        explicit = '' if r['explicit_mean_ms'] is None else \
+            f"  explicit collect mean {r['explicit_mean_ms']:.2f} ms, max {r['explicit_max_ms']:.2f} ms"
+        print(f"{mode:8s} {r['collections']:5d} collections, {r['on_stimulus']:4d} on grating frames "
+              f"(max {r['max_stimulus_pause_ms']:.2f} ms, {r['gen2_on_stimulus']} full){explicit}")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Startup time and per-frame getKeys cost of the 'ptb' and 'iohub' keyboard backends.
+
+Each run is a fresh Python process, because PsychoPy fixes the keyboard
+backend once per process and ioHub runs in a process of its own. A run sets
+up the keyboards as the script's ``setupDevices`` does for that
+``KEYBOARD_BACKEND``. For 'iohub' it launches the server with the psychopy
+keymap, a datastore in a temporary directory, and a clock sync. It adds
+``defaultKeyboard`` and ``key_resp``, then times ``--frames`` frame-loop
+polls: the escape check on ``defaultKeyboard`` plus ``key_resp``'s poll
+(space, ignoring escape), as `sipefield.routines.RoutineEngine` makes them.
+Runs alternate between the backends (``--repeats`` each), so load on the
+machine hits both alike.
+
+Reported per backend, as the median over repeats: import time, setup time
+(server launch, keyboards, clock sync), and the cost of both polls per frame
+(mean, p50, p99 and max in microseconds).
+
+Needs PsychoPy with psychtoolbox. No window is opened, but ioHub still needs a
+desktop session to hook the keyboard.
+
+Usage::
+
+    python benchmarks/bench_keyboard.py --frames 3000 --out keyboard.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKENDS = ('ptb', 'iohub')
+
+
+def child(backend, frames, interval):
+    """One run in this process; prints its results as a JSON line."""
+    import numpy as np
+
+    start = time.perf_counter()
+    from psychopy import core
+    from psychopy.hardware import DeviceManager, keyboard
+    if backend == 'iohub':
+        import psychopy.iohub as io
+    import_s = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as folder:
+        start = time.perf_counter()
+        manager = DeviceManager()
+        server = None
+        if backend == 'iohub':
+            server = io.launchHubServer(Keyboard=dict(use_keymap='psychopy'),
+                                        experiment_code='bench_keyboard', session_code='1',
+                                        datastore_name=os.path.join(folder, 'bench_keyboard'))
+            manager.ioServer = server
+        manager.addDevice(deviceClass='keyboard', deviceName='defaultKeyboard', backend=backend)
+        manager.addDevice(deviceClass='keyboard', deviceName='key_resp')
+        default_keyboard = manager.getDevice('defaultKeyboard')
+        key_resp = keyboard.Keyboard(deviceName='key_resp')
+        if server is not None:
+            server.syncClock(core.Clock())
+        setup_s = time.perf_counter() - start
+
+        polls = np.empty(frames)
+        for frame in range(frames):
+            start = time.perf_counter()
+            default_keyboard.getKeys(keyList=['escape'])
+            key_resp.getKeys(keyList=['space'], ignoreKeys=['escape'], waitRelease=False)
+            polls[frame] = time.perf_counter() - start
+            if interval:
+                time.sleep(interval)
+        if server is not None:
+            server.quit()
+
+    polls *= 1e6
+    print(json.dumps({
+        'import_s': import_s,
+        'setup_s': setup_s,
+        'poll_us': {
+            'mean': float(polls.mean()),
+            'p50': float(np.percentile(polls, 50)),
+            'p99': float(np.percentile(polls, 99)),
+            'max': float(polls.max()),
+        },
+    }))
+
+
+def run(backend, frames, interval):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', backend,
+                             '--frames', str(frames), '--interval', str(interval)],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument('--frames', type=int, default=3000, help='frame-loop polls to time per run')
+    parser.add_argument('--interval', type=float, default=0.0, help='sleep between polls (s), e.g. 0.0167')
+    parser.add_argument('--repeats', type=int, default=3, help='runs per backend, interleaved')
+    parser.add_argument('--child', choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument('--out', help='write results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child(args.child, args.frames, args.interval)
+        return
+
+    runs = {backend: [] for backend in args.backends}
+    for _ in range(args.repeats):
+        for backend in args.backends:
+            runs[backend].append(run(backend, args.frames, args.interval))
+
+    results = {}
+    for backend, backend_runs in runs.items():
+        results[backend] = {
+            'import_s': statistics.median(r['import_s'] for r in backend_runs),
+            'setup_s': statistics.median(r['setup_s'] for r in backend_runs),
+            'poll_us': {stat: statistics.median(r['poll_us'][stat] for r in backend_runs)
+                        for stat in ('mean', 'p50', 'p99', 'max')},
+            'runs': backend_runs,
+        }
+        r = results[backend]
+        p = r['poll_us']
+        print(f"{backend:6s} import {r['import_s']:.3f} s, setup {r['setup_s']:.3f} s; "
+              f"both polls per frame: mean {p['mean']:.1f} us, p50 {p['p50']:.1f}, "
+              f"p99 {p['p99']:.1f}, max {p['max']:.1f}")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
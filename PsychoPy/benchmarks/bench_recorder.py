@@ -0,0 +1,78 @@
+"""Per-append cost of the wheel data store as the session grows.
+
+Compares `ColumnarRecorder.append` with the original ``save_data``, which built
+a one-row DataFrame and ``pd.concat``-ed it onto the session frame. The
+original is quadratic, so it is only run up to ``--legacy-max`` rows.
+
+Usage::
+
+    python benchmarks/bench_recorder.py --out recorder.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from sipefield.recorder import WHEEL_COLUMNS, ColumnarRecorder  # noqa: E402
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+# the columns the script's pd.concat loop recorded
+LEGACY_COLUMNS = ['timestamp', 'speed', 'distance', 'direction']
+
+
+def legacy_append_cost(rows, probe=200):
+    """Mean seconds per append for the last ``probe`` rows of a pd.concat session."""
+    frame = pd.DataFrame(columns=LEGACY_COLUMNS)
+    start = None
+    for i in range(rows):
+        if i == rows - probe:
+            start = time.perf_counter()
+        new = pd.DataFrame([[i * 0.05, 0.1, i * 0.001, 1]], columns=LEGACY_COLUMNS)
+        frame = pd.concat([frame, new], ignore_index=True)
+    return (time.perf_counter() - start) / probe
+
+
+def recorder_append_cost(rows, probe=1000):
+    """Mean seconds per append for the last ``probe`` rows (resizes included)."""
+    recorder = ColumnarRecorder(WHEEL_COLUMNS)
+    start = None
+    for i in range(rows):
+        if i == rows - probe:
+            start = time.perf_counter()
+        recorder.append(i * 0.05, 0.1, i * 0.001, 1, 0.0, i * 0.05, i * 0.05, i, False)
+    per_append = (time.perf_counter() - start) / probe
+    # overall amortised cost, which includes every resize copy
+    total_start = time.perf_counter()
+    recorder = ColumnarRecorder(WHEEL_COLUMNS)
+    for i in range(rows):
+        recorder.append(i * 0.05, 0.1, i * 0.001, 1, 0.0, i * 0.05, i * 0.05, i, False)
+    return per_append, (time.perf_counter() - total_start) / rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--legacy-max', type=int, default=10_000)
+    parser.add_argument('--out', help='write results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    results = []
+    for rows in SIZES:
+        tail, amortised = recorder_append_cost(rows)
+        result = {'rows': rows, 'recorder_us': 1e6 * tail, 'recorder_amortised_us': 1e6 * amortised}
+        if rows <= args.legacy_max:
+            result['legacy_us'] = 1e6 * legacy_append_cost(rows)
+        results.append(result)
+        legacy = f"{result['legacy_us']:9.1f}" if 'legacy_us' in result else '      n/a'
+        print(f"{rows:>9,d} rows  recorder {result['recorder_us']:6.2f} us "
+              f"(amortised {result['recorder_amortised_us']:5.2f})  pd.concat {legacy} us")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
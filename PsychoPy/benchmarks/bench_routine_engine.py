@@ -0,0 +1,226 @@
+"""Per-frame overhead: Builder's generated DisplayGratings loop vs `RoutineEngine`.
+
+Both run the same trials (gray, then a drifting grating from a `GratingSchedule`)
+against the light stand-ins for the window, clocks, keyboard and ExperimentHandler
+in ``tests/fakes.py``.
+Time is simulated and moves on by one refresh per flip, so the frames are the
+same for both and only the Python work per frame is measured; every clock
+read still reads ``time.perf_counter`` to cost what a real one does. The generated
+loop is the one v0.7 ran before the engine: it reads the routine timer, calls
+``getFutureFlipTime`` twice and scans components with ``hasattr`` each frame.
+
+A third run does only what any frame loop must (one flip-time query, the
+escape poll, the flip). Its time per frame is the floor, and what each loop
+takes above it is reported as its overhead. The benchmark also checks that both
+write the same data: the same columns, in the same order, on the same frames.
+
+Usage::
+
+    python benchmarks/bench_routine_engine.py --trials 200 --out routine_engine.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests'))
+from sipefield.routines import (FINISHED, NOT_STARTED, PAUSED, STARTED,  # noqa: E402
+                                Routine, RoutineEngine, VisualComponent)
+from sipefield.schedule import STIM_GRATING, STIM_GRAY, Epoch, GratingSchedule  # noqa: E402
+from fakes import (ANGLES, FRAME_RATE, SimClock, SimExperiment, SimKeyboard,  # noqa: E402
+                   SimStim, SimTime, SimWindow)
+
+
+class SimRoutine:
+    """Stand-in for psychopy.data.Routine."""
+
+    def __init__(self, name, components):
+        self.name = name
+        self.components = components
+        self.maxDurationReached = False
+
+
+def generated_trials(schedule, gray, gratings, n_trials, win, thisExp, globalClock, routineTimer, defaultKeyboard):
+    """The v0.7 DisplayGratings loop as exported before the routine engine (encoder code left out)."""
+    frameTolerance = 0.001
+    endExpNow = False
+    for trial in range(n_trials):
+        DisplayGratings = SimRoutine(name='DisplayGratings', components=[gray, gratings[trial % len(gratings)]])
+        DisplayGratings.status = NOT_STARTED
+        continueRoutine = True
+        trial_plan = schedule.trial(trial)
+        stim_grayScreen = gray
+        stim_grating = gratings[trial % len(gratings)]
+        plannedComponents = ((stim_grayScreen, STIM_GRAY), (stim_grating, STIM_GRATING))
+        DisplayGratings.tStartRefresh = win.getFutureFlipTime(clock=globalClock)
+        DisplayGratings.tStart = globalClock.getTime(format='float')
+        DisplayGratings.status = STARTED
+        thisExp.addData('DisplayGratings.started', DisplayGratings.tStart)
+        DisplayGratings.maxDuration = None
+        for thisComponent in DisplayGratings.components:
+            thisComponent.tStart = None
+            thisComponent.tStop = None
+            thisComponent.tStartRefresh = None
+            thisComponent.tStopRefresh = None
+            if hasattr(thisComponent, 'status'):
+                thisComponent.status = NOT_STARTED
+        t = 0
+        _timeToFirstFrame = win.getFutureFlipTime(clock="now")
+        frameN = -1
+        shown_stimuli = 0
+        shown_phase = None
+        DisplayGratings.forceEnded = routineForceEnded = not continueRoutine
+        while continueRoutine and routineTimer.getTime() < trial_plan.duration:
+            t = routineTimer.getTime()
+            tThisFlip = win.getFutureFlipTime(clock=routineTimer)
+            tThisFlipGlobal = win.getFutureFlipTime(clock=None)
+            frameN = frameN + 1
+            frame_index = trial_plan.index(tThisFlip)
+            if frame_index < trial_plan.n_frames:
+                visible = trial_plan.visible[frame_index]
+            else:
+                visible = 0
+            if visible != shown_stimuli:
+                for thisComponent, stimBit in plannedComponents:
+                    if visible & stimBit and thisComponent.status == NOT_STARTED:
+                        thisComponent.frameNStart = frameN
+                        thisComponent.tStart = t
+                        thisComponent.tStartRefresh = tThisFlipGlobal
+                        win.timeOnFlip(thisComponent, 'tStartRefresh')
+                        thisExp.timestampOnFlip(win, f'{thisComponent.name}.started')
+                        thisComponent.status = STARTED
+                        thisComponent.setAutoDraw(True)
+                    elif not visible & stimBit and thisComponent.status == STARTED:
+                        thisComponent.tStop = t
+                        thisComponent.tStopRefresh = tThisFlipGlobal
+                        thisComponent.frameNStop = frameN
+                        thisExp.timestampOnFlip(win, f'{thisComponent.name}.stopped')
+                        thisComponent.status = FINISHED
+                        thisComponent.setAutoDraw(False)
+                shown_stimuli = visible
+            if visible & STIM_GRATING:
+                phase = trial_plan.phases[frame_index]
+                if phase != shown_phase:
+                    stim_grating.phase = phase
+                    shown_phase = phase
+            if defaultKeyboard.getKeys(keyList=["escape"]):
+                thisExp.status = FINISHED
+            if thisExp.status == FINISHED or endExpNow:
+                return
+            if thisExp.status == PAUSED:
+                continue
+            if not continueRoutine:
+                DisplayGratings.forceEnded = routineForceEnded = True
+                break
+            continueRoutine = False
+            for thisComponent in DisplayGratings.components:
+                if hasattr(thisComponent, "status") and thisComponent.status != FINISHED:
+                    continueRoutine = True
+                    break
+            if continueRoutine:
+                win.flip()
+        for thisComponent in DisplayGratings.components:
+            if hasattr(thisComponent, "setAutoDraw"):
+                thisComponent.setAutoDraw(False)
+        DisplayGratings.tStop = globalClock.getTime(format='float')
+        DisplayGratings.tStopRefresh = tThisFlipGlobal
+        thisExp.addData('DisplayGratings.stopped', DisplayGratings.tStop)
+        if DisplayGratings.maxDurationReached:
+            routineTimer.addTime(-DisplayGratings.maxDuration)
+        elif DisplayGratings.forceEnded:
+            routineTimer.reset()
+        else:
+            routineTimer.addTime(-trial_plan.duration)
+
+
+def engine_trials(schedule, gray, gratings, n_trials, win, thisExp, globalClock, routineTimer, defaultKeyboard):
+    """The same trials declared once as `Routine` objects and run by `RoutineEngine`."""
+    shown_phase = None
+    trial_plan = stim_grating = None
+
+    def update_grating_phase(t, frameN, index):
+        nonlocal shown_phase
+        if trial_plan.visible[index] & STIM_GRATING:
+            phase = trial_plan.phases[index]
+            if phase != shown_phase:
+                stim_grating.phase = phase
+                shown_phase = phase
+
+    engine = RoutineEngine(win, thisExp, globalClock, routineTimer, defaultKeyboard,
+                           default_clock=win.default_clock)
+    routines = [Routine('DisplayGratings',
+                        [VisualComponent(gray, bit=STIM_GRAY), VisualComponent(grating, bit=STIM_GRATING)],
+                        plan=plan, each_frame=(('stimulus', update_grating_phase),))
+                for plan, grating in zip(schedule.plans, gratings)]
+    for trial in range(n_trials):
+        trial_plan = schedule.trial(trial)
+        stim_grating = gratings[trial % len(gratings)]
+        shown_phase = None
+        if not engine.run(routines[trial % len(routines)]):
+            return
+
+
+def floor_trials(schedule, gray, gratings, n_trials, win, thisExp, globalClock, routineTimer, defaultKeyboard):
+    """Only what every frame needs: one flip-time query, the escape poll and the flip."""
+    for trial in range(n_trials):
+        for frame in range(schedule.trial(trial).n_frames - 1):
+            win.getFutureFlipTime()
+            defaultKeyboard.getKeys(keyList=['escape'])
+            win.flip()
+
+
+def measure(runner, n_trials, gray_s, grating_s):
+    sim = SimTime()
+    default_clock = SimClock(sim)
+    win = SimWindow(sim, default_clock)
+    thisExp = SimExperiment(win)
+    schedule = GratingSchedule([Epoch('gray', gray_s, STIM_GRAY),
+                                Epoch('grating', grating_s, STIM_GRAY | STIM_GRATING)],
+                               FRAME_RATE, ANGLES)
+    gray = SimStim('stim_grayScreen')
+    gratings = [SimStim('stim_grating') for _ in ANGLES]
+    start = time.perf_counter()
+    runner(schedule, gray, gratings, n_trials, win, thisExp, SimClock(sim), SimClock(sim), SimKeyboard())
+    elapsed = time.perf_counter() - start
+    return elapsed, win.flips, thisExp.rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trials', type=int, default=200)
+    parser.add_argument('--gray', type=float, default=3.0, help='gray epoch (s)')
+    parser.add_argument('--grating', type=float, default=2.0, help='grating epoch (s)')
+    parser.add_argument('--repeats', type=int, default=3, help='best of this many runs')
+    parser.add_argument('--out', help='write results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    runners = {'floor': floor_trials, 'generated': generated_trials, 'engine': engine_trials}
+    best = dict.fromkeys(runners, float('inf'))
+    frames = {}
+    rows = {}
+    # interleave the runners so drifting clock speeds affect them alike
+    for _ in range(args.repeats):
+        for name, runner in runners.items():
+            elapsed, frames[name], rows[name] = measure(runner, args.trials, args.gray, args.grating)
+            best[name] = min(best[name], elapsed)
+    results = {name: {'frames': frames[name], 'per_frame_us': 1e6 * best[name] / frames[name]}
+               for name in runners}
+    floor = results['floor']['per_frame_us']
+    for name in ('generated', 'engine'):
+        # loop overhead: time per frame beyond the stand-ins' own flip, query and poll
+        results[name]['overhead_us'] = results[name]['per_frame_us'] - floor
+        print(f"{name:9s} {results[name]['frames']} frames  {results[name]['per_frame_us']:.2f} us/frame, "
+              f"{results[name]['overhead_us']:.2f} us over the {floor:.2f} us floor")
+    results['overhead_ratio'] = results['generated']['overhead_us'] / results['engine']['overhead_us']
+    results['same_data'] = rows['generated'] == rows['engine']
+    print(f"loop overhead {results['overhead_ratio']:.2f}x lower  "
+          f"same data columns and frames: {results['same_data']}")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,372 @@
+"""Per-frame CPU time of an experiment script's run() loop, split by section.
+
+Runs the whole STDINPUT -> CustomTrigger -> trials -> CustomSaving flow of the
+experiment script (v0.7 by default), or of a Builder export such as v0.6,
+without the lab rig:
+
+- The window is a small pyglet window, hidden after it opens. With
+  ``--window headless``, pyglet renders through EGL with no display at all.
+  PsychoPy 2025.2's pyglet backend still treats the window as an X11 one
+  (it passes ``x_screen`` to the display and reads ``winHandle._window``), so
+  that needs pyglet's headless display and window patched to accept both.
+  The refresh rate is fixed with ``--frame-rate`` rather than measured.
+- The encoder is a `PtyEncoder` on a pseudo-terminal (POSIX only) that streams
+  the protocol the script expects. On Windows pass ``--port`` with one end of
+  a virtual null-modem pair, fed by ``python -m sipefield.emulator``.
+- Keyboards use PsychoPy's 'event' backend (use ``--iohub`` to run the
+  script's ``setupDevices``, which sets up its ``KEYBOARD_BACKEND``). A space
+  press is injected on frame ``--press-frame`` of CustomTrigger.
+- Data files go to a temporary directory.
+
+The script is not modified on disk. Its source is instrumented on load: each
+Builder comment that opens a section of a frame loop (``# get current time``,
+``# update/draw components on each frame``, ``# Run 'Each Frame' code from
+read_encoder``, ``# check for quit``, ``# refresh the screen`` ...) gets a
+`FrameProfiler` call on the same line, so line numbers in tracebacks still
+match the file. Any export that keeps Builder's comments can be measured the
+same way, which is what makes v0.6 and v0.7 comparable. Scripts whose routines
+are run by `sipefield.routines.RoutineEngine` have a ``FRAME_PROFILER`` global,
+which the harness sets instead.
+
+``--draws`` also turns on the script's ``DRAW_PROFILE``. The GL draw calls,
+state changes and draw time per stimulus then go into the JSON, e.g. to
+compare the default ``GRAY_MODE`` with ``--set "GRAY_MODE='clear'"``.
+
+The JSON written to ``--out`` holds CPU and wall time per section for every
+routine. Pass an earlier result as ``--baseline`` to compare against it; the
+exit status is 1 if a section's median or p95 CPU time per frame grew by more
+than ``--tolerance``.
+
+Usage::
+
+    python benchmarks/bench_run_loop.py --trials 4 --out run_loop_v07.json
+    python benchmarks/bench_run_loop.py --script Gratings_vis_devJG_v0.6.py --baseline run_loop_v07.json
+"""
+import argparse
+import ast
+import contextlib
+import json
+import os
+import re
+import sys
+import tempfile
+import types
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+from sipefield.profiling import FrameProfiler  # noqa: E402
+
+DEFAULT_SCRIPT = os.path.join(HERE, '..', 'Gratings_vis_sipefield-v0.7.py')
+PROFILER_NAME = '__frame_profiler__'
+
+ROUTINE_START = re.compile(r'^\s*# --- Run Routine "(\w+)" ---')
+ROUTINE_END = re.compile(r'^\s*# --- Ending Routine "(\w+)" ---')
+COMPONENT_UPDATES = re.compile(r'^\s*# \*(\w+)\* ')
+EACH_FRAME_CODE = re.compile(r"^\s*# Run 'Each Frame' code from (\w+)")
+# Builder comments that open a section, and the section they open
+SECTION_COMMENTS = (
+    ('# update/draw components on each frame', 'stimulus'),
+    ('# check for quit (typically the Esc key)', 'keyboard'),
+    ('# pause experiment here if requested', 'other'),
+    ('# refresh the screen', 'flip'),
+)
+
+
+def _next_code_indent(lines, i):
+    """Indentation of the first line after ``i`` that isn't blank or a comment."""
+    for line in lines[i + 1:]:
+        stripped = line.lstrip()
+        if stripped and not stripped.startswith('#'):
+            return len(line) - len(stripped)
+    return None
+
+
+def instrument(source, keyboard_components=('key_resp',), encoder_code=('read_encoder',)):
+    """
+    Add `FrameProfiler` calls to the frame loops of a Builder script.
+
+    A call is put in front of a section comment only if the next line of code
+    has the comment's indentation, so the call runs exactly where that code
+    would.
+
+    Returns
+    ==========
+    (str, dict)
+        The instrumented source, and routine name to the number of calls added.
+    """
+    lines = source.splitlines(keepends=True)
+    routine = None
+    added = {}
+    for i, line in enumerate(lines):
+        match = ROUTINE_START.match(line)
+        if match:
+            routine = match.group(1)
+            added[routine] = 0
+            continue
+        if routine is None:
+            continue
+        stripped = line.lstrip()
+        indent = len(line) - len(stripped)
+        call = None
+        if ROUTINE_END.match(line):
+            call = f'{PROFILER_NAME}.stop()'
+            ending = routine
+            routine = None
+        elif stripped.startswith('# get current time'):
+            call = f'{PROFILER_NAME}.frame({routine!r})'
+        elif COMPONENT_UPDATES.match(line):
+            name = COMPONENT_UPDATES.match(line).group(1)
+            call = f"{PROFILER_NAME}.section({'keyboard' if name in keyboard_components else 'stimulus'!r})"
+        elif EACH_FRAME_CODE.match(line):
+            name = EACH_FRAME_CODE.match(line).group(1)
+            call = f"{PROFILER_NAME}.section({'encoder' if name in encoder_code else 'stimulus'!r})"
+        else:
+            for comment, section in SECTION_COMMENTS:
+                if stripped.startswith(comment):
+                    call = f'{PROFILER_NAME}.section({section!r})'
+                    break
+        if call is None or _next_code_indent(lines, i) != indent:
+            continue
+        lines[i] = line[:indent] + call + '  ' + stripped
+        added[routine if routine is not None else ending] += 1
+    return ''.join(lines), added
+
+
+def override_constants(source, overrides):
+    """Replace top-level ``NAME = ...`` lines with ``NAME = <value>`` for each override."""
+    for name, value in overrides.items():
+        pattern = re.compile(rf'^{re.escape(name)} = .*$', re.MULTILINE)
+        source, count = pattern.subn(lambda _: f'{name} = {value!r}', source, count=1)
+        if not count:
+            raise ValueError(f'{name} is not assigned at the top level of the script')
+    return source
+
+
+def script_constant(source, name, default):
+    """Value of a top-level ``NAME = <literal>`` in the script, or ``default``."""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return default
+    for node in tree.body:
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name) and node.targets[0].id == name):
+            try:
+                return ast.literal_eval(node.value)
+            except ValueError:
+                return default
+    return default
+
+
+class ScriptedFrames:
+    """
+    The object the instrumented script calls: times frames and presses keys.
+
+    A key press is injected between frames, outside the timed rows, on the
+    given frame of the given routine.
+    """
+
+    def __init__(self, profiler, presses, device_manager):
+        self.profiler = profiler
+        self.presses = dict(presses)  # (routine, frame) -> key name
+        self.device_manager = device_manager
+        self.counts = {}
+        self.section = profiler.section
+        self.stop = profiler.stop
+
+    def frame(self, routine):
+        n = self.counts.get(routine, 0)
+        self.counts[routine] = n + 1
+        key = self.presses.pop((routine, n), None)
+        if key is not None:
+            self.profiler.stop()
+            self.press(key)
+        self.profiler.frame(routine)
+
+    def press(self, key):
+        from psychopy import core
+        from psychopy.hardware import keyboard
+
+        device = self.device_manager.getDevice('defaultKeyboard')
+        device = getattr(device, 'device', device)
+        press = keyboard.KeyPress(code=None, tDown=core.getTime(), name=key)
+        press.rt = device.clock.getTime()
+        device.responses.append(press)
+
+
+def load_script(path, data_dir, overrides, argv):
+    """Instrument and execute the script's top level as a module; ``run()`` is not called."""
+    with open(path, encoding='utf-8-sig') as f:
+        source = f.read()
+    source, added = instrument(override_constants(source, overrides))
+    module = types.ModuleType(os.path.splitext(os.path.basename(path))[0].replace('-', '_').replace('.', '_'))
+    # _thisDir follows __file__, so data and logs land in data_dir
+    module.__file__ = os.path.join(data_dir, os.path.basename(path))
+    sys.path.insert(0, os.path.dirname(os.path.abspath(path)))
+    saved_argv = sys.argv
+    sys.argv = [path] + argv
+    try:
+        exec(compile(source, path, 'exec'), module.__dict__)
+    finally:
+        sys.argv = saved_argv
+    return module, added
+
+
+def make_window(kind, size, frame_rate, vsync):
+    from psychopy import visual
+
+    win = visual.Window(
+        size=size, fullscr=False, screen=0,
+        winType='pyglet', allowStencil=False,
+        color=[0, 0, 0], colorSpace='rgb',
+        blendMode='avg', useFBO=True,
+        units='height', waitBlanking=vsync,
+        checkTiming=False,
+    )
+    if kind == 'hidden':
+        win.winHandle.set_visible(False)
+    win._monitorFrameRate = frame_rate  # so setupWindow doesn't measure it
+    return win
+
+
+def compare(result, baseline, tolerance, floor_us=5.0):
+    """Sections whose median or p95 CPU time grew by more than ``tolerance`` (and ``floor_us``)."""
+    regressions = []
+    for routine, stats in result['routines'].items():
+        before = baseline.get('routines', {}).get(routine)
+        if before is None:
+            continue
+        for section, now in stats['cpu_us'].items():
+            then = before['cpu_us'].get(section)
+            if then is None:
+                continue
+            for stat in ('p50', 'p95'):
+                grown = now[stat] - then[stat]
+                if grown > floor_us and now[stat] > then[stat] * (1 + tolerance):
+                    regressions.append((routine, section, stat, then[stat], now[stat]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--script', default=DEFAULT_SCRIPT, help='experiment script to run')
+    parser.add_argument('--trials', type=int, default=2, help='repeats of the trials loop')
+    parser.add_argument('--frame-rate', type=float, default=60.0, help='refresh rate given to the script (Hz)')
+    parser.add_argument('--window', choices=('hidden', 'visible', 'headless'), default='hidden')
+    parser.add_argument('--size', type=int, nargs=2, default=(640, 360), help='window size (pixels)')
+    parser.add_argument('--no-vsync', action='store_true', help="don't wait for the vertical blank on flip")
+    parser.add_argument('--port', help='serial port of an external emulator (default: a pty emulator)')
+    parser.add_argument('--iohub', action='store_true', help="run the script's setupDevices (ioHub or PTB keyboards, per KEYBOARD_BACKEND)")
+    parser.add_argument('--press-frame', type=int, default=30, help='CustomTrigger frame on which space is pressed')
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                        help='override a top-level constant, e.g. --set "ENCODER_ACQUISITION=\'process\'"')
+    parser.add_argument('--show-output', action='store_true', help="keep the script's prints")
+    parser.add_argument('--frames', help='write every frame as CSV to this file')
+    parser.add_argument('--draws', action='store_true', help='report GL draw calls per stimulus (DRAW_PROFILE)')
+    parser.add_argument('--baseline', help='earlier --out file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative growth vs --baseline')
+    parser.add_argument('--out', help='write results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    if args.window == 'headless':
+        import pyglet
+        pyglet.options['headless'] = True
+
+    overrides = {}
+    for item in args.set:
+        name, _, value = item.partition('=')
+        overrides[name] = ast.literal_eval(value)
+    if args.draws:
+        overrides['DRAW_PROFILE'] = True
+    with open(args.script, encoding='utf-8-sig') as f:
+        source = override_constants(f.read(), overrides)
+    encoder = None
+    if args.port is None:
+        from sipefield.emulator import PtyEncoder
+
+        protocol = script_constant(source, 'ENCODER_PROTOCOL', 'ascii')
+        encoder = PtyEncoder(script_constant(source, 'SAMPLE_WINDOW', 0.05), protocol,
+                             baudrate=250000 if protocol == 'binary' else 57600, seed=0)
+        encoder.start()
+    overrides['PORT'] = args.port or encoder.port
+
+    data_dir = tempfile.mkdtemp(prefix='bench_run_loop_')
+    profiler = FrameProfiler()
+    with contextlib.ExitStack() as output:
+        if not args.show_output:
+            output.enter_context(contextlib.redirect_stdout(output.enter_context(open(os.devnull, 'w'))))
+        module, added = load_script(args.script, data_dir, overrides,
+                                    ['bench', 'bench', '1', data_dir, str(args.trials)])
+        module.nTrials = args.trials
+        frames = ScriptedFrames(profiler, {('CustomTrigger', args.press_frame): 'space'}, module.deviceManager)
+        module.__dict__[PROFILER_NAME] = frames
+        if hasattr(module, 'FRAME_PROFILER'):
+            # scripts run by sipefield.routines.RoutineEngine report their sections themselves
+            module.FRAME_PROFILER = frames
+        expInfo = module.expInfo
+        thisExp = module.setupData(expInfo=expInfo)
+        module.setupLogging(filename=thisExp.dataFileName)
+        win = module.setupWindow(expInfo=expInfo, win=make_window(
+            args.window, args.size, args.frame_rate, not args.no_vsync))
+        if args.iohub:
+            module.setupDevices(expInfo=expInfo, thisExp=thisExp, win=win)
+        else:
+            for name in ('defaultKeyboard', 'key_resp'):
+                module.deviceManager.addDevice(deviceClass='keyboard', deviceName=name, backend='event')
+        try:
+            module.run(expInfo=expInfo, thisExp=thisExp, win=win, globalClock='float')
+        finally:
+            profiler.stop()
+            thisExp.abort()
+            win.close()
+            if encoder is not None:
+                encoder.stop()
+                encoder.close()
+
+    import psychopy
+    result = {
+        'script': os.path.basename(args.script),
+        'python': sys.version.split()[0],
+        'psychopy': psychopy.__version__,
+        'window': args.window,
+        'vsync': not args.no_vsync,
+        'frame_rate': args.frame_rate,
+        'trials': args.trials,
+        'overrides': {name: value for name, value in overrides.items() if name != 'PORT'},
+        'sections': list(profiler.sections),
+        'instrumented': added,
+        'routines': profiler.summary(),
+    }
+    if args.draws:
+        import pandas as pd
+
+        draws = pd.read_csv(thisExp.dataFileName + '_draw_summary.csv').set_index('target')
+        # 'window' has no draw times
+        result['draws'] = draws.astype(object).where(draws.notna(), None).to_dict(orient='index')
+    for routine, stats in result['routines'].items():
+        cpu = stats['cpu_us']
+        print(f"{routine:16s} {stats['frames']:6d} frames  cpu/frame p50 {cpu['total']['p50']:7.1f} us  "
+              f"p95 {cpu['total']['p95']:7.1f} us  | " +
+              '  '.join(f"{section} {cpu[section]['p50']:.1f}" for section in profiler.sections))
+    for target, stats in result.get('draws', {}).items():
+        print(f"{target:20s} {stats['frames']:6d} frames  per frame: {stats['draws']:.1f} draws  "
+              f"{stats['gl_draws']:.1f} GL draws  {stats['gl_state']:.1f} GL state changes"
+              + (f"  {stats['time_us_mean']:.1f} us" if stats['time_us_mean'] is not None else ''))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(result, f, indent=2)
+    if args.frames:
+        profiler.to_dataframe().to_csv(args.frames, index=False)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.tolerance)
+        print(f"vs {baseline.get('script')}: {len(regressions)} regressions over {args.tolerance:.0%}")
+        for routine, section, stat, then, now in regressions:
+            print(f"  {routine}.{section} {stat}: {then:.1f} -> {now:.1f} us")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
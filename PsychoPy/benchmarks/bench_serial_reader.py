@@ -0,0 +1,139 @@
+"""Throughput benchmark for the encoder serial reader.
+
+The firmware emulator writes to one end of a pseudo-terminal (pty) and a
+reader consumes the other end through pyserial, exactly as it would read the
+Arduino on COM4. Each reader runs at several multiples of the rig's 20 Hz
+sample rate. For each run the benchmark reports samples received, reader CPU
+use and how long `stop` takes.
+
+Readers compared:
+
+- ``legacy``: the original loop, one ``readline()`` and ``int()`` per sample
+- ``bulk-ascii``: `EncoderReader` on the ASCII output
+- ``bulk-binary``: `EncoderReader` on binary packets
+
+Usage (Linux/macOS, needs a pty)::
+
+    python benchmarks/bench_serial_reader.py --seconds 5 --out reader.json
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import tty
+
+import serial
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from sipefield.emulator import EncoderEmulator  # noqa: E402
+from sipefield.reader import POLL_TIMEOUT, EncoderReader  # noqa: E402
+from sipefield.ring import SampleRing  # noqa: E402
+
+BASE_RATE = 20  # Hz, today's 50 ms sample window
+RATE_MULTIPLIERS = (1, 10, 50, 250)
+
+
+class LegacyReader(threading.Thread):
+    """The pre-bulk reader: blocking readline with a 1 s timeout, one sample at a time."""
+
+    def __init__(self, port, ring):
+        super().__init__(daemon=True)
+        self.port = port
+        self.ring = ring
+        self.samples = 0
+        self.cpu_time = 0.0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        cpu_start = time.thread_time()
+        seq = 0
+        while not self._stop_event.is_set():
+            try:
+                data = self.port.readline().decode('utf-8').strip()
+                if data:
+                    self.ring.push(time.perf_counter(), float('nan'), seq, int(data))
+                    seq += 1
+            except ValueError:
+                pass
+        self.samples = seq
+        self.cpu_time = time.thread_time() - cpu_start
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        self.join(timeout)
+
+
+def feed_pty(fd, emulator, rate, seconds):
+    """Write emulator output at ``rate`` samples/s for ``seconds``; returns samples sent."""
+    sent = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while True:
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+        due = int((now - start) * rate) - sent
+        if due > 0:
+            os.write(fd, emulator.encode([1] * due))
+            sent += due
+        time.sleep(0.001)
+    return sent
+
+
+def run_case(mode, rate, seconds):
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    protocol = 'binary' if mode == 'bulk-binary' else 'ascii'
+    timeout = 1 if mode == 'legacy' else POLL_TIMEOUT
+    port = serial.Serial(os.ttyname(slave), baudrate=250000, timeout=timeout)
+    ring = SampleRing(capacity=1 << 20)
+    if mode == 'legacy':
+        reader = LegacyReader(port, ring)
+    else:
+        reader = EncoderReader(port, ring, protocol=protocol)
+    reader.start()
+    sent = feed_pty(master, EncoderEmulator(sample_window=1.0 / rate, protocol=protocol),
+                    rate, seconds)
+    # let the reader catch up before stopping it
+    settle = time.perf_counter() + 1.0
+    while ring.head < sent and time.perf_counter() < settle:
+        time.sleep(0.005)
+    stop_start = time.perf_counter()
+    reader.stop()
+    stop_latency = time.perf_counter() - stop_start
+    port.close()
+    os.close(master)
+    os.close(slave)
+    return {
+        'mode': mode,
+        'rate_hz': rate,
+        'seconds': seconds,
+        'sent': sent,
+        'received': ring.head,
+        'cpu_percent': 100.0 * reader.cpu_time / seconds,
+        'stop_latency_ms': 1e3 * stop_latency,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--out', help='write results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    results = []
+    for multiplier in RATE_MULTIPLIERS:
+        for mode in ('legacy', 'bulk-ascii', 'bulk-binary'):
+            result = run_case(mode, BASE_RATE * multiplier, args.seconds)
+            results.append(result)
+            print("{mode:12s} {rate_hz:6d} Hz  received {received}/{sent}  "
+                  "cpu {cpu_percent:5.1f}%  stop {stop_latency_ms:7.1f} ms".format(**result))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Onset drift over a long session: non-slip chaining vs a `TrialTimeline`.
+
+Runs DisplayGratings trials through `RoutineEngine` on the simulated window,
+clocks and stimuli of ``bench_routine_engine.py``, with the disturbances of a
+long session:
+
+- a late flip (one refresh longer) with probability ``--late``;
+- work between trials (``--between`` seconds, the saving and data code);
+- now and then (``--reset``) the routine timer reset, as Builder does for a
+  skipped trial or a routine that ended early.
+
+For each run it compares every gray and grating onset with its deadline on
+the global clock (anchor + planned frames / rate) and reports the largest
+error and the error at the end.
+
+Usage::
+
+    python benchmarks/bench_timeline.py --trials 2000 --out timeline.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests'))
+from sipefield.routines import Routine, RoutineEngine, VisualComponent  # noqa: E402
+from sipefield.schedule import STIM_GRATING, STIM_GRAY, Epoch, GratingSchedule  # noqa: E402
+from sipefield.timeline import TrialTimeline, flip_on_clock  # noqa: E402
+from fakes import (ANGLES, FRAME_RATE, SimClock, SimExperiment,  # noqa: E402
+                   SimKeyboard, SimStim, SimTime, SimWindow)
+
+
+class JitteryWindow(SimWindow):
+    """`SimWindow` whose flips are sometimes a refresh late, and which stamps real flip times."""
+
+    def __init__(self, sim, default_clock, late, rng):
+        super().__init__(sim, default_clock)
+        self.late = late
+        self.rng = rng
+
+    def timeOnFlip(self, obj, attrib):
+        self._to_call.append((lambda: setattr(obj, attrib, self.sim.now - self.default_clock.getLastResetTime()),
+                              (), {}))
+
+    def flip(self):
+        if self.rng.random() < self.late:
+            self.last_flip += self.period
+        return super().flip()
+
+
+def run_session(absolute, n_trials, late, between, reset, seed=0):
+    rng = random.Random(seed)
+    sim = SimTime()
+    default_clock = SimClock(sim)
+    globalClock = SimClock(sim)
+    routineTimer = SimClock(sim)
+    win = JitteryWindow(sim, default_clock, late, rng)
+    thisExp = SimExperiment(win)
+    schedule = GratingSchedule([Epoch('gray', 3.0, STIM_GRAY),
+                                Epoch('grating', 2.0, STIM_GRAY | STIM_GRATING)],
+                               FRAME_RATE, ANGLES)
+    gray = SimStim('stim_grayScreen')
+    gratings = {angle: SimStim('stim_grating') for angle in ANGLES}
+    routines = [Routine('DisplayGratings',
+                        [VisualComponent(gray, bit=STIM_GRAY),
+                         VisualComponent(gratings[plan.orientation], bit=STIM_GRATING)],
+                        plan=plan)
+                for plan in schedule.plans]
+    engine = RoutineEngine(win, thisExp, globalClock, routineTimer, SimKeyboard(), default_clock)
+    timeline = TrialTimeline(FRAME_RATE)
+    routineTimer.reset()
+    errors = []
+    for trial in range(n_trials):
+        routine = routines[trial % len(routines)]
+        onset = timeline.start_trial(trial, routine.plan, win.getFutureFlipTime(clock=globalClock),
+                                     paused=engine.paused)
+        if trial == 0:
+            # both runs start on the anchor
+            routineTimer.reset()
+            routineTimer.addTime(globalClock.getTime() - onset)
+        engine.run(routine, start=onset if absolute else None)
+        grating = gratings[routine.plan.orientation]
+        record = timeline.end_trial({
+            'gray': flip_on_clock(gray.tStartRefresh, default_clock, globalClock),
+            'grating': flip_on_clock(grating.tStartRefresh, default_clock, globalClock),
+        })
+        errors.append(max(abs(record['gray_error']), abs(record['grating_error'])))
+        sim.now += between
+        if rng.random() < reset:
+            routineTimer.reset()
+    period = 1.0 / FRAME_RATE
+    return {
+        'max_error_frames': max(errors) / period,
+        'final_error_frames': errors[-1] / period,
+        'trials_over_one_frame': sum(error > 1.001 * period for error in errors),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trials', type=int, default=2000)
+    parser.add_argument('--late', type=float, default=0.002, help='probability of a late flip')
+    parser.add_argument('--between', type=float, default=0.004, help='work between trials (s)')
+    parser.add_argument('--reset', type=float, default=0.01, help='probability of a routine timer reset per trial')
+    parser.add_argument('--out', help='write results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, absolute in (('non_slip', False), ('timeline', True)):
+        results[name] = run_session(absolute, args.trials, args.late, args.between, args.reset)
+        r = results[name]
+        print(f"{name:9s} {args.trials} trials  onset error max {r['max_error_frames']:.2f} frames, "
+              f"at the end {r['final_error_frames']:.2f} frames, {r['trials_over_one_frame']} trials over one frame")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,6 @@
+"""Support code for the sipefield gratings experiment.
+
+The experiment script ``Gratings_vis_sipefield-v0.7.py`` imports these modules from its
+custom codeblocks. PsychoPy puts the script's folder on ``sys.path`` at runtime,
+so nothing needs to be installed.
+"""
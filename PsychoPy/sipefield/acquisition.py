@@ -0,0 +1,227 @@
+"""Encoder acquisition in a separate process, publishing through shared memory.
+
+In thread mode, `EncoderReader` shares the interpreter, and so the GIL, with
+PsychoPy's draw/flip loop. `EncoderProcess` runs the same reader in a child
+interpreter instead. The child writes samples into a `SampleRing` placed in a
+``multiprocessing.shared_memory`` block, and the experiment drains it with an
+ordinary `RingCursor`. No lock is shared: the child writes each record before
+it advances the ring's head counter, and the parent only reads records below
+the head.
+
+The child is started with ``python -m sipefield.acquisition``, not with
+``multiprocessing.Process``. Spawning a Process would re-import the Builder
+script in the child, and the script opens the serial port and sets up PsychoPy
+at import time.
+
+Host times in the child come from ``time.perf_counter``, which is system-wide
+(QueryPerformanceCounter on Windows, CLOCK_MONOTONIC on Linux). The parent
+passes its own clock's offset from it, so samples arrive already on the
+parent's clock.
+
+The child also watches its stdin, a pipe from the parent. The pipe reaches
+end of file when the parent closes it or dies, however it dies, and the child
+then stops as if asked to. A crashed experiment so never leaves the port held
+open by an orphaned reader. The parent also stops the child at interpreter
+exit (``atexit``) if nothing else has.
+"""
+import argparse
+import atexit
+import os
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+
+from sipefield.reader import EncoderReader
+from sipefield.ring import SAMPLE_DTYPE, SampleRing, ring_nbytes
+
+# header slots used on top of the ring's head (slot 0)
+STOP_SLOT = 1    # parent sets 1 to ask the child to exit
+STATE_SLOT = 2   # child sets READY once reading, EXITED when done
+READY = 1
+EXITED = 2
+
+_PACKAGE_PARENT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class SharedStopFlag:
+    """Stop event backed by a header slot, so another process can set it."""
+
+    def __init__(self, header, poll=0.002):
+        self._header = header
+        self._poll = poll
+
+    def is_set(self):
+        return bool(self._header[STOP_SLOT])
+
+    def set(self):
+        self._header[STOP_SLOT] = 1
+
+    def wait(self, timeout):
+        end = time.perf_counter() + timeout
+        while not self.is_set():
+            remaining = end - time.perf_counter()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self._poll, remaining))
+        return True
+
+
+class OffsetClock:
+    """``time.perf_counter`` shifted onto another clock."""
+
+    def __init__(self, offset):
+        self.offset = offset
+
+    def __call__(self):
+        return time.perf_counter() + self.offset
+
+
+class EncoderProcess:
+    """
+    Encoder reader running in a child process, with the same start/stop as `EncoderReader`.
+
+    Parameters
+    ==========
+    port : str
+        Serial port name; the child opens it, so the parent must not.
+    baudrate : int
+        Serial baud rate.
+    protocol : str
+        'binary' or 'ascii'.
+    capacity : int
+        Ring capacity in samples (power of two).
+    clock_offset : float
+        Added to ``time.perf_counter()`` in the child to give host times on the
+        parent's clock, e.g. ``core.getTime() - time.perf_counter()``.
+
+    An instance runs once: `stop` releases the shared memory, so a stopped
+    reader can't be started again. Create a new one, and new cursors on its
+    ring, instead.
+    """
+
+    def __init__(self, port, baudrate, protocol='binary', capacity=65536, clock_offset=0.0):
+        self.port = port
+        self.baudrate = baudrate
+        self.protocol = protocol
+        self.capacity = capacity
+        self.clock_offset = clock_offset
+        self._shm = shared_memory.SharedMemory(create=True, size=ring_nbytes(capacity, SAMPLE_DTYPE))
+        self.ring = SampleRing(capacity, SAMPLE_DTYPE, buffer=self._shm.buf)
+        self.ring.header[:] = 0
+        self._process = None
+
+    def start(self, timeout=10.0):
+        """Launch the child and wait until it has opened the port."""
+        if self._shm is None:
+            raise RuntimeError("EncoderProcess was stopped and can't be restarted; create a new one")
+        if self._process is not None:
+            raise RuntimeError("EncoderProcess was already started")
+        command = [sys.executable, '-m', 'sipefield.acquisition',
+                   '--name', self._shm.name, '--capacity', str(self.capacity),
+                   '--port', self.port, '--baudrate', str(self.baudrate),
+                   '--protocol', self.protocol, '--clock-offset', repr(self.clock_offset)]
+        # stdin is only held open: the child exits when it closes
+        self._process = subprocess.Popen(command, cwd=_PACKAGE_PARENT, stdin=subprocess.PIPE)
+        atexit.register(self.stop)
+        deadline = time.perf_counter() + timeout
+        while self.ring.header[STATE_SLOT] != READY:
+            if self._process.poll() is not None or time.perf_counter() > deadline:
+                self.stop()
+                raise RuntimeError(f"encoder acquisition process failed to start on {self.port}")
+            time.sleep(0.01)
+
+    def is_alive(self):
+        return self._process is not None and self._process.poll() is None
+
+    def stop(self, timeout=2.0):
+        """Ask the child to exit, wait for it and release the shared memory."""
+        if self._shm is None:
+            return
+        atexit.unregister(self.stop)
+        self.ring.header[STOP_SLOT] = 1
+        if self._process is not None:
+            try:
+                self._process.stdin.close()
+            except OSError:
+                pass
+            try:
+                self._process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+        # keep a private copy so cursors made before stop() can still drain
+        data = bytearray(self._shm.buf)
+        self.ring = _rebind(self.ring, data)
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+
+def _rebind(ring, buffer):
+    # move a ring (and the cursors pointing at it) onto another buffer
+    fresh = SampleRing(ring.capacity, ring.dtype, buffer=buffer)
+    ring.header = fresh.header
+    ring._head = fresh._head
+    ring._data = fresh._data
+    return ring
+
+
+def _attach(name):
+    shm = shared_memory.SharedMemory(name=name)
+    if os.name == 'posix':
+        # the parent owns the block; stop this process's resource tracker
+        # from unlinking it when the child exits
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Encoder acquisition child process")
+    parser.add_argument('--name', required=True)
+    parser.add_argument('--capacity', type=int, required=True)
+    parser.add_argument('--port', required=True)
+    parser.add_argument('--baudrate', type=int, required=True)
+    parser.add_argument('--protocol', default='binary')
+    parser.add_argument('--clock-offset', type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    shm = _attach(args.name)
+    try:
+        _acquire(SampleRing(args.capacity, SAMPLE_DTYPE, buffer=shm.buf), args)
+    finally:
+        shm.close()
+
+
+def _watch_parent(stop):
+    # blocks until the parent closes our stdin or dies
+    try:
+        sys.stdin.buffer.read()
+    except (OSError, ValueError):
+        pass
+    stop.set()
+
+
+def _acquire(ring, args):
+    import serial
+    from sipefield.reader import POLL_TIMEOUT
+
+    stop = SharedStopFlag(ring.header)
+    threading.Thread(target=_watch_parent, args=(stop,), name='ParentWatch', daemon=True).start()
+    try:
+        port = serial.Serial(port=args.port, baudrate=args.baudrate, timeout=POLL_TIMEOUT)
+        try:
+            reader = EncoderReader(port, ring, protocol=args.protocol,
+                                   clock=OffsetClock(args.clock_offset), stop_event=stop)
+            ring.header[STATE_SLOT] = READY
+            reader.run()  # in this process's main thread until stopped
+        finally:
+            port.close()
+    finally:
+        ring.header[STATE_SLOT] = EXITED
+
+
+if __name__ == '__main__':
+    main()
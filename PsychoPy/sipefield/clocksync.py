@@ -0,0 +1,113 @@
+"""Online mapping from the encoder's clock to the host clock.
+
+The firmware stamps every sample with its own ``micros()``. The host stamps the
+chunk the sample arrived in. Host stamps are late by serial latency plus the
+reader's batching, and the two clocks run at slightly different rates. A
+`ClockSync` keeps a sliding window of (device, host) pairs and fits
+
+    host = offset + slope * device
+
+by least squares, after rejecting pairs whose residual is far outside the
+window's median absolute deviation. A sample's true host time is when the
+firmware measured it, which is earlier than its arrival. So after the fit, the
+intercept is moved down to a low quantile of the residuals, where the
+least-delayed arrivals sit.
+"""
+import numpy as np
+
+
+class ClockSync:
+    """
+    Running robust linear fit of host time against device time.
+
+    Parameters
+    ==========
+    window : int
+        Number of most recent pairs the fit uses.
+    refit_every : int
+        Refit after this many new pairs.
+    min_pairs : int
+        Pairs needed before `ready` becomes True.
+    reject : float
+        Residuals further than ``reject`` robust standard deviations (1.4826 * MAD)
+        from the median are left out of the fit.
+    latency_quantile : float
+        Residual quantile the intercept is moved to, see the module docstring.
+    """
+
+    def __init__(self, window=2048, refit_every=256, min_pairs=32, reject=3.0,
+                 latency_quantile=0.05):
+        self.window = window
+        self.refit_every = refit_every
+        self.min_pairs = min_pairs
+        self.reject = reject
+        self.latency_quantile = latency_quantile
+        self._device = np.empty(window)
+        self._host = np.empty(window)
+        self._count = 0  # pairs ever added
+        self._since_fit = 0
+        self._origin = None  # first device time; fitting relative to it keeps precision
+        self.slope = 1.0
+        self.offset = 0.0  # host time of device time == _origin
+        self.residual_std = np.nan
+        self.rejected = 0
+        self.ready = False
+
+    def add(self, device_times, host_times):
+        """Add matching device/host timestamps; NaN device times are ignored."""
+        keep = ~np.isnan(device_times)
+        if not keep.all():
+            device_times = device_times[keep]
+            host_times = host_times[keep]
+        n = len(device_times)
+        if n == 0:
+            return
+        if self._origin is None:
+            self._origin = float(device_times[0])
+        if n > self.window:
+            device_times = device_times[-self.window:]
+            host_times = host_times[-self.window:]
+            self._count += n - self.window
+            n = self.window
+        index = (self._count + np.arange(n)) % self.window
+        self._device[index] = device_times - self._origin
+        self._host[index] = host_times
+        self._count += n
+        self._since_fit += n
+        if self._count >= self.min_pairs and (not self.ready or self._since_fit >= self.refit_every):
+            self.fit()
+
+    def fit(self):
+        """Refit slope and offset on the current window."""
+        n = min(self._count, self.window)
+        device = self._device[:n]
+        host = self._host[:n]
+        slope, offset = _least_squares(device, host)
+        residuals = host - (offset + slope * device)
+        median = np.median(residuals)
+        spread = 1.4826 * np.median(np.abs(residuals - median))
+        inliers = np.abs(residuals - median) <= self.reject * max(spread, 1e-6)
+        self.rejected = int(n - np.count_nonzero(inliers))
+        if np.count_nonzero(inliers) >= 2:
+            slope, offset = _least_squares(device[inliers], host[inliers])
+            residuals = host[inliers] - (offset + slope * device[inliers])
+        self.residual_std = float(np.std(residuals))
+        self.slope = float(slope)
+        self.offset = float(offset + np.quantile(residuals, self.latency_quantile))
+        self._since_fit = 0
+        self.ready = True
+
+    def to_host(self, device_times):
+        """Map device times to host times; NaN until enough pairs have been seen."""
+        if not self.ready:
+            return np.full(np.shape(device_times), np.nan)
+        return self.offset + self.slope * (np.asarray(device_times) - self._origin)
+
+
+def _least_squares(x, y):
+    x_mean = x.mean()
+    y_mean = y.mean()
+    dx = x - x_mean
+    denominator = np.dot(dx, dx)
+    slope = np.dot(dx, y - y_mean) / denominator if denominator > 0 else 1.0
+    return slope, y_mean - slope * x_mean
@@ -0,0 +1,196 @@
+"""GL draw calls, GL state changes and CPU time per stimulus, for every frame.
+
+A `DrawProfiler` replaces, while it runs:
+
+- ``draw`` on each given stimulus, with a wrapper that times the call and
+  marks the stimulus as the one issuing GL calls. Autodrawn stimuli are drawn
+  through the same attribute inside ``win.flip()``, so they are seen too.
+- ``win.flip``, so every flip closes a row.
+- The `GL_DRAW_CALLS` and `GL_STATE_CALLS` functions on ``pyglet.gl``. PsychoPy
+  reaches GL through that module (``GL = pyglet.gl``), so the wrappers count
+  every call it makes. GL calls made outside a profiled ``draw``, such as the
+  clear, the framebuffer blit and the swap in ``win.flip()``, are charged to
+  ``'window'``.
+
+Stimuli sharing a name, e.g. the prebuilt gratings, share a row. Times are the
+CPU time spent issuing the calls; the GPU runs them later, so a cheap call can
+still be expensive to render. Wrapping every GL call costs a few hundred
+nanoseconds a call, so only profile when measuring.
+"""
+import time
+
+import numpy as np
+
+# pyglet.gl functions that put pixels in the framebuffer (glEnd closes an immediate-mode draw)
+GL_DRAW_CALLS = (
+    'glDrawArrays', 'glDrawElements', 'glDrawArraysInstanced', 'glDrawElementsInstanced',
+    'glCallList', 'glEnd', 'glClear', 'glBlitFramebuffer',
+)
+# pyglet.gl functions that change the pipeline state a draw depends on
+GL_STATE_CALLS = (
+    'glUseProgram', 'glBindTexture', 'glActiveTexture', 'glBindBuffer', 'glBindFramebuffer',
+    'glEnable', 'glDisable', 'glBlendFunc', 'glBlendFuncSeparate', 'glColor4f', 'glClearColor',
+    'glUniform1i', 'glUniform1f', 'glUniform4f', 'glUniformMatrix4fv', 'glViewport', 'glScissor',
+)
+
+WINDOW = 'window'  # row for GL calls made outside a profiled stimulus
+
+# columns of DrawProfiler.counts
+DRAWS = 0     # calls to the stimulus' draw()
+GL_DRAWS = 1  # GL_DRAW_CALLS
+GL_STATE = 2  # GL_STATE_CALLS
+
+
+class DrawProfiler:
+    """
+    Per-frame draw counts and draw times of a window's stimuli.
+
+    Parameters
+    ==========
+    win : psychopy.visual.Window
+        Window whose flips separate the frames.
+    stimuli : iterable
+        Stimuli to profile; each is reported under its ``name``.
+    capacity : int
+        Frames to preallocate; grows by doubling if exceeded.
+    """
+
+    def __init__(self, win, stimuli, capacity=1 << 16):
+        self.win = win
+        self.stimuli = list(stimuli)
+        self.targets = [WINDOW]  # row names, indexed by the second axis of counts/time
+        self._target_of = {}
+        for stim in self.stimuli:
+            if stim.name not in self.targets:
+                self.targets.append(stim.name)
+            self._target_of[id(stim)] = self.targets.index(stim.name)
+        self.counts = np.zeros((capacity, len(self.targets), 3), dtype=np.int32)
+        self.time = np.zeros((capacity, len(self.targets)))
+        self.n = 0
+        self._target = 0  # row charged by GL calls; WINDOW between stimulus draws
+        self._gl_originals = {}
+        self.running = False
+
+    def start(self):
+        """Put the wrappers in place."""
+        if self.running:
+            return
+        from pyglet import gl
+
+        for names, column in ((GL_DRAW_CALLS, GL_DRAWS), (GL_STATE_CALLS, GL_STATE)):
+            for name in names:
+                original = getattr(gl, name, None)
+                if original is not None:
+                    self._gl_originals[name] = original
+                    setattr(gl, name, self._counted(original, column))
+        for stim in self.stimuli:
+            stim.draw = self._timed(stim.draw, self._target_of[id(stim)])
+        flip = self.win.flip
+
+        def flip_and_count(*args, **kwargs):
+            result = flip(*args, **kwargs)
+            self._next_frame()
+            return result
+
+        self.win.flip = flip_and_count
+        self.running = True
+
+    def stop(self):
+        """Restore the original functions; the recorded frames are kept."""
+        if not self.running:
+            return
+        from pyglet import gl
+
+        for name, original in self._gl_originals.items():
+            setattr(gl, name, original)
+        self._gl_originals.clear()
+        for stim in self.stimuli:
+            del stim.draw  # back to the class' method
+        del self.win.flip
+        self.running = False
+
+    def _counted(self, function, column):
+        def counted(*args):
+            self.counts[self.n, self._target, column] += 1
+            return function(*args)
+
+        return counted
+
+    def _timed(self, draw, target):
+        def timed(*args, **kwargs):
+            outer = self._target
+            self._target = target
+            start = time.perf_counter()
+            try:
+                return draw(*args, **kwargs)
+            finally:
+                n = self.n
+                self.time[n, target] += time.perf_counter() - start
+                self.counts[n, target, DRAWS] += 1
+                self._target = outer
+
+        return timed
+
+    def _next_frame(self):
+        self.n += 1
+        if self.n == len(self.counts):
+            self.counts = np.concatenate((self.counts, np.zeros_like(self.counts)))
+            self.time = np.concatenate((self.time, np.zeros_like(self.time)))
+
+    def summary(self):
+        """
+        Per-frame means of each row, over the frames it issued anything in.
+
+        Returns
+        ==========
+        dict
+            Row name to ``{'frames': n, 'draws': ..., 'gl_draws': ..., 'gl_state': ...,
+            'time_us': {'mean', 'p50', 'p95', 'max'}}``. ``'window'`` has no times.
+        """
+        result = {}
+        for i, name in enumerate(self.targets):
+            counts = self.counts[:self.n, i]
+            rows = counts.any(axis=1)
+            if not rows.any():
+                continue
+            counts = counts[rows]
+            times = 1e6 * self.time[:self.n, i][rows]
+            result[name] = {
+                'frames': int(np.count_nonzero(rows)),
+                'draws': float(counts[:, DRAWS].mean()),
+                'gl_draws': float(counts[:, GL_DRAWS].mean()),
+                'gl_state': float(counts[:, GL_STATE].mean()),
+                'time_us': None if name == WINDOW else {
+                    'mean': float(times.mean()),
+                    'p50': float(np.percentile(times, 50)),
+                    'p95': float(np.percentile(times, 95)),
+                    'max': float(times.max()),
+                },
+            }
+        return result
+
+    def to_dataframe(self):
+        """One row per frame and stimulus drawn in it: frame, target, draws, gl_draws, gl_state, time (s)."""
+        import pandas as pd
+
+        frame, target = np.nonzero(self.counts[:self.n].any(axis=2))
+        counts = self.counts[frame, target]
+        return pd.DataFrame({
+            'frame': frame,
+            'target': np.array(self.targets, dtype=object)[target],
+            'draws': counts[:, DRAWS],
+            'gl_draws': counts[:, GL_DRAWS],
+            'gl_state': counts[:, GL_STATE],
+            'time': self.time[frame, target],
+        })
+
+    def save(self, prefix):
+        """Write ``<prefix>_draws.csv`` (every frame) and ``<prefix>_draw_summary.csv``."""
+        import pandas as pd
+
+        self.to_dataframe().to_csv(prefix + '_draws.csv', index=False)
+        rows = []
+        for name, stats in self.summary().items():
+            times = stats.pop('time_us') or {}
+            rows.append(dict(target=name, **stats, **{f'time_us_{key}': value for key, value in times.items()}))
+        pd.DataFrame(rows).to_csv(prefix + '_draw_summary.csv', index=False)
@@ -0,0 +1,383 @@
+"""Python stand-in for the rotary encoder firmware.
+
+`encode_packet` is the reference implementation of the packet format in
+`sipefield.protocol`. It is written byte by byte, the same way the Arduino
+sketch builds a packet, so it does not share code with the NumPy decoder it
+checks.
+
+`PtyEncoder` serves that byte stream on a pseudo-terminal (Linux/macOS) in real
+time, so the experiment and the benchmarks can open it like the Arduino's COM
+port. The wheel moves as a `WheelTrajectory` of running bouts, rests and
+backward steps; a `FaultInjector` can damage the stream the way a flaky USB
+link does. Run it from the command line with::
+
+    python -m sipefield.emulator --window 0.001 --drop 0.0001 --garbage 0.01
+"""
+import argparse
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from sipefield.protocol import CRC8_POLY, PROTOCOL_VERSION, SYNC
+
+
+def crc8(data):
+    """Bitwise CRC-8 (poly 0x07, init 0), as computed on the Arduino."""
+    crc = 0
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ CRC8_POLY) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+
+def encode_packet(seq, device_us, delta, version=PROTOCOL_VERSION):
+    """Build one binary packet; ``delta`` is clamped to the int16 range like the firmware."""
+    delta = max(-32768, min(32767, int(delta)))
+    body = struct.pack('<BIIh', version, seq & 0xFFFFFFFF, device_us & 0xFFFFFFFF, delta)
+    return SYNC + body + bytes([crc8(body)])
+
+
+def encode_ascii(delta):
+    """One sample as printed by the legacy sketch with ``Serial.println``."""
+    return b'%d\r\n' % delta
+
+
+class EncoderEmulator:
+    """
+    Produce the byte stream the firmware would send for a sequence of deltas.
+
+    Parameters
+    ==========
+    sample_window : float
+        Seconds between samples, matching the sketch's sample window.
+    protocol : str
+        'binary' for packets, 'ascii' for the legacy println output.
+    """
+
+    def __init__(self, sample_window=0.05, protocol='binary'):
+        if protocol not in ('binary', 'ascii'):
+            raise ValueError(f"unknown protocol {protocol!r}")
+        self.sample_window = sample_window
+        self.protocol = protocol
+        self.seq = 0
+        self.device_us = 0
+
+    def encode(self, deltas):
+        """Return the bytes for the next samples, advancing sequence and device time."""
+        chunks = []
+        for delta in deltas:
+            self.device_us += int(round(self.sample_window * 1e6))
+            if self.protocol == 'binary':
+                chunks.append(encode_packet(self.seq, self.device_us, delta))
+            else:
+                chunks.append(encode_ascii(delta))
+            self.seq += 1
+        return b''.join(chunks)
+
+
+def _signed(value, bits):
+    # reinterpret an unsigned C integer as signed, as a cast on the Arduino does
+    value &= (1 << bits) - 1
+    return value - (1 << bits) if value >> (bits - 1) else value
+
+
+class DeadlineSchedule:
+    """
+    The sketch's sampling schedule, pass by pass of ``loop()``.
+
+    A sample is due once ``micros()`` reaches the deadline, and the deadline
+    then moves on by exactly one window. A late pass delays a sample but never
+    skips a window. Arithmetic wraps at 32 bits like ``micros()``.
+    """
+
+    def __init__(self, window_us, start_us=0):
+        self.window_us = int(window_us)
+        self.deadline = (int(start_us) + self.window_us) & 0xFFFFFFFF
+
+    def poll(self, now_us):
+        """One pass of ``loop()`` at ``now_us``; True if it takes a sample."""
+        if _signed(int(now_us) - self.deadline, 32) >= 0:
+            self.deadline = (self.deadline + self.window_us) & 0xFFFFFFFF
+            return True
+        return False
+
+
+class ModuloSchedule:
+    """
+    The sketch's earlier schedule, kept to compare against `DeadlineSchedule`.
+
+    A sample is taken when the milliseconds since start are a multiple of the
+    window and differ from the last sample's. Times are 16-bit ``int`` as on
+    an AVR board, and ``%`` truncates like C. A window is skipped whenever no
+    pass of ``loop()`` falls inside its millisecond.
+    """
+
+    def __init__(self, window_ms, start_us=0):
+        self.window_ms = int(window_ms)
+        self.start_ms = _signed(int(start_us) // 1000, 16)
+        self.last = 0
+
+    def poll(self, now_us):
+        """One pass of ``loop()`` at ``now_us``; True if it takes a sample."""
+        current = _signed(int(now_us) // 1000 - self.start_ms, 16)
+        remainder = abs(current) % self.window_ms
+        if remainder == 0 and current != self.last:
+            self.last = current
+            return True
+        return False
+
+
+class WheelTrajectory:
+    """
+    Random but reproducible wheel movement, as encoder clicks per sample window.
+
+    The wheel alternates between rests and running bouts with exponentially
+    distributed durations. Each running bout has its own speed, with a little
+    stride-to-stride variation, and may be followed by a short backward step.
+    Fractional clicks are carried over between samples, as on a real encoder.
+
+    Parameters
+    ==========
+    sample_window : float
+        Seconds per sample.
+    wheel_diameter, encoder_cpr : float, int
+        Wheel geometry, as in `sipefield.locomotion.WheelConfig`.
+    run_speed : float
+        Median running speed in m/s.
+    run_bout, rest_bout, backstep_bout : float
+        Mean durations in seconds.
+    backstep_probability : float
+        Chance that a running bout ends with a backward step.
+    seed : int or None
+        Seed for the random generator; the same seed gives the same clicks.
+    """
+
+    def __init__(self, sample_window=0.05, wheel_diameter=0.2, encoder_cpr=1000,
+                 run_speed=0.25, run_bout=4.0, rest_bout=3.0, backstep_bout=0.3,
+                 backstep_probability=0.2, seed=None):
+        self.sample_window = sample_window
+        self.clicks_per_metre = encoder_cpr / (np.pi * wheel_diameter)
+        self.run_speed = run_speed
+        self.run_bout = run_bout
+        self.rest_bout = rest_bout
+        self.backstep_bout = backstep_bout
+        self.backstep_probability = backstep_probability
+        self.rng = np.random.default_rng(seed)
+        self.state = 'rest'
+        self._bout_left = self._bout_samples(rest_bout)
+        self._bout_speed = 0.0
+        self._position = 0.0  # clicks, fractional
+
+    def _bout_samples(self, mean_seconds):
+        return max(1, int(self.rng.exponential(mean_seconds) / self.sample_window))
+
+    def _next_bout(self):
+        if self.state == 'run' and self.rng.random() < self.backstep_probability:
+            self.state = 'back'
+            self._bout_speed = -0.2 * self.run_speed
+            self._bout_left = self._bout_samples(self.backstep_bout)
+        elif self.state == 'rest':
+            self.state = 'run'
+            self._bout_speed = self.run_speed * self.rng.lognormal(0.0, 0.4)
+            self._bout_left = self._bout_samples(self.run_bout)
+        else:
+            self.state = 'rest'
+            self._bout_speed = 0.0
+            self._bout_left = self._bout_samples(self.rest_bout)
+
+    def next(self, n):
+        """Clicks for the next ``n`` sample windows, as an int array."""
+        out = np.empty(n, dtype=np.int64)
+        done = 0
+        while done < n:
+            if self._bout_left == 0:
+                self._next_bout()
+            count = min(self._bout_left, n - done)
+            speed = np.full(count, self._bout_speed)
+            if self.state != 'rest':
+                speed *= 1.0 + 0.15 * self.rng.standard_normal(count)
+            positions = self._position + np.cumsum(speed * self.sample_window * self.clicks_per_metre)
+            clicks = np.diff(np.floor(positions), prepend=np.floor(self._position))
+            out[done:done + count] = clicks
+            self._position = positions[-1]
+            self._bout_left -= count
+            done += count
+        return out
+
+
+class FaultInjector:
+    """
+    Damage an encoder byte stream the way a flaky serial link does.
+
+    Parameters
+    ==========
+    drop_rate : float
+        Probability that any one byte is lost.
+    garbage_rate : float
+        Probability per written chunk of inserting a line of junk
+        (e.g. a reset banner or line noise).
+    burst_rate : float
+        Probability per written chunk of stalling the link, after which
+        everything held back arrives in one burst.
+    burst_length : float
+        Seconds a stall lasts.
+    seed : int or None
+        Seed for the random generator.
+    """
+
+    def __init__(self, drop_rate=0.0, garbage_rate=0.0, burst_rate=0.0, burst_length=0.1,
+                 seed=None):
+        self.drop_rate = drop_rate
+        self.garbage_rate = garbage_rate
+        self.burst_rate = burst_rate
+        self.burst_length = burst_length
+        self.rng = np.random.default_rng(seed)
+        self.dropped_bytes = 0
+        self.garbage_lines = 0
+        self.bursts = 0
+
+    def damage(self, data):
+        """Return ``data`` with bytes dropped and junk inserted."""
+        if self.drop_rate and data:
+            keep = self.rng.random(len(data)) >= self.drop_rate
+            if not keep.all():
+                self.dropped_bytes += int(len(data) - np.count_nonzero(keep))
+                data = np.frombuffer(data, dtype=np.uint8)[keep].tobytes()
+        if self.garbage_rate and self.rng.random() < self.garbage_rate:
+            junk = self.rng.integers(0, 256, self.rng.integers(1, 40), dtype=np.uint8).tobytes()
+            data = data[:len(data) // 2] + junk + b'\r\n' + data[len(data) // 2:]
+            self.garbage_lines += 1
+        return data
+
+    def stall(self):
+        """Seconds to hold the link back before the next write, usually 0."""
+        if self.burst_rate and self.rng.random() < self.burst_rate:
+            self.bursts += 1
+            return self.burst_length
+        return 0.0
+
+
+class PtyEncoder:
+    """
+    Emulated encoder on a pseudo-terminal, written in real time by a thread.
+
+    Samples are generated on the firmware's `DeadlineSchedule`, one per
+    ``sample_window``, and written no faster than ``baudrate`` allows (10 bits per byte). Open
+    `port` with pyserial like any serial device.
+
+    Parameters
+    ==========
+    sample_window : float
+        Seconds between samples.
+    protocol : str
+        'binary' or 'ascii', see `EncoderEmulator`.
+    baudrate : int
+        Line rate to emulate; output backs up if samples outpace it.
+    trajectory : WheelTrajectory or None
+        Source of clicks, by default a `WheelTrajectory` with ``seed``.
+    faults : FaultInjector or None
+        Damage to apply to the stream, none by default.
+    seed : int or None
+        Seed for the default trajectory.
+    """
+
+    def __init__(self, sample_window=0.05, protocol='binary', baudrate=250000,
+                 trajectory=None, faults=None, seed=None):
+        import tty
+
+        self.emulator = EncoderEmulator(sample_window, protocol)
+        self.baudrate = baudrate
+        self.trajectory = trajectory or WheelTrajectory(sample_window, seed=seed)
+        self.faults = faults
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self.sent = []  # click arrays in the order they were generated
+        self.bytes_written = 0
+        self.start_time = None
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='PtyEncoder', daemon=True)
+
+    @property
+    def samples(self):
+        """Number of samples generated so far."""
+        return self.emulator.seq
+
+    def due_time(self, seq):
+        """``time.perf_counter`` time at which sample ``seq`` was measured."""
+        return self.start_time + (np.asarray(seq) + 1) * self.emulator.sample_window
+
+    def sent_clicks(self):
+        """Every click value generated so far, indexed by sequence number."""
+        return np.concatenate(self.sent) if self.sent else np.empty(0, dtype=np.int64)
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def close(self):
+        self.stop()
+        os.close(self._master)
+        os.close(self._slave)
+
+    def _run(self):
+        schedule = DeadlineSchedule(round(self.emulator.sample_window * 1e6))
+        bytes_per_second = self.baudrate / 10.0
+        pending = b''
+        while not self._stop_event.is_set():
+            now = time.perf_counter()
+            now_us = int((now - self.start_time) * 1e6)
+            due = 0
+            while schedule.poll(now_us):
+                due += 1
+            if due > 0:
+                clicks = self.trajectory.next(due)
+                self.sent.append(clicks)
+                data = self.emulator.encode(clicks)
+                pending += self.faults.damage(data) if self.faults else data
+            allowed = int((now - self.start_time) * bytes_per_second) - self.bytes_written
+            if pending and allowed > 0:
+                chunk, pending = pending[:allowed], pending[allowed:]
+                self.bytes_written += os.write(self._master, chunk)
+            stall = self.faults.stall() if self.faults else 0.0
+            self._stop_event.wait(max(stall, 0.001))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve an emulated rotary encoder on a pty")
+    parser.add_argument('--window', type=float, default=0.05, help='sample window (s)')
+    parser.add_argument('--protocol', default='binary', choices=('binary', 'ascii'))
+    parser.add_argument('--baudrate', type=int, default=250000)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--drop', type=float, default=0.0, help='per-byte drop probability')
+    parser.add_argument('--garbage', type=float, default=0.0, help='per-write junk line probability')
+    parser.add_argument('--bursts', type=float, default=0.0, help='per-write stall probability')
+    parser.add_argument('--burst-length', type=float, default=0.1, help='stall length (s)')
+    parser.add_argument('--seconds', type=float, help='stop after this long (default: until Ctrl-C)')
+    args = parser.parse_args(argv)
+
+    faults = None
+    if args.drop or args.garbage or args.bursts:
+        faults = FaultInjector(args.drop, args.garbage, args.bursts, args.burst_length, seed=args.seed)
+    encoder = PtyEncoder(args.window, args.protocol, args.baudrate, faults=faults, seed=args.seed)
+    encoder.start()
+    print(f"emulated encoder on {encoder.port} ({args.protocol}, {1 / args.window:g} Hz)", flush=True)
+    try:
+        encoder._stop_event.wait(args.seconds)
+    except KeyboardInterrupt:
+        pass
+    encoder.close()
+    print(f"sent {encoder.samples} samples, {encoder.bytes_written} bytes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""How often the frame loop asks the keyboard for escape, and what that costs.
+
+Builder checks ``defaultKeyboard.getKeys(keyList=['escape'])`` on every
+frame. With ioHub that is a round trip to another process, 60 or more times
+a second, for a key pressed at most once a session. An `EscapeWatcher` is
+called once per frame instead and applies one of three policies:
+
+- ``'frame'``: ask the keyboard every frame, as Builder does.
+- ``'throttled'``: ask it at most once every ``interval`` seconds; on the
+  frames in between only a time comparison is made. Escape then takes up to
+  ``interval`` longer to stop the experiment.
+- ``'window'``: never ask the keyboard. A key-press handler on the pyglet
+  window sets a flag, and the frame loop only tests it. PsychoPy dispatches
+  the window's events inside ``win.flip()``, so the handler runs on the
+  frame loop's own thread. The window must have keyboard focus; ioHub and
+  Psychtoolbox read the keyboard whatever has focus.
+
+The keyboard is not polled from a background thread. Neither ioHub's client
+connection nor PsychoPy's key buffers can be used from two threads at once,
+and the frame loop polls ``key_resp`` on the same keyboard.
+
+The watcher times each keyboard check it makes with ``time.perf_counter``.
+`EscapeWatcher.summary` compares that with checking every frame.
+"""
+import time
+
+ESCAPE_POLICIES = ('frame', 'throttled', 'window')
+
+
+class EscapeWatcher:
+    """
+    Escape check for the frame loop; call once per frame.
+
+    The first check is made when the watcher is created, whatever the
+    policy, so an escape pressed during setup still ends the experiment.
+
+    Parameters
+    ==========
+    keyboard : psychopy.hardware.keyboard.Keyboard
+        Default keyboard, asked with ``getKeys(keyList=['escape'])``.
+    policy : str
+        ``'frame'``, ``'throttled'`` or ``'window'``, see the module docstring.
+    interval : float
+        Seconds between keyboard checks with ``'throttled'``.
+    win : psychopy.visual.Window or None
+        Window whose key presses are watched with ``'window'``; it needs a pyglet backend.
+    clock : callable
+        Returns the time in seconds, for ``interval``.
+    """
+
+    def __init__(self, keyboard, policy='throttled', interval=0.1, win=None, clock=time.perf_counter):
+        if policy not in ESCAPE_POLICIES:
+            raise ValueError(f"unknown escape policy {policy!r}")
+        self.keyboard = keyboard
+        self.policy = policy
+        self.interval = interval
+        self.clock = clock
+        self.pressed = False
+        self.frames = 0
+        self.checks = 0
+        self.check_time = 0.0  # s spent in keyboard checks
+        self.max_check = 0.0
+        self._next = 0.0
+        self._handler = None
+        if policy == 'window':
+            handle = getattr(win, 'winHandle', None)
+            if not hasattr(handle, 'push_handlers'):
+                raise ValueError("escape policy 'window' needs a pyglet window")
+            from pyglet.window import key
+
+            def on_key_press(symbol, modifiers):
+                if symbol == key.ESCAPE:
+                    self.pressed = True
+                # returning None lets PsychoPy's own handler see the key too
+
+            self._handler = (handle, on_key_press)
+            handle.push_handlers(on_key_press=on_key_press)
+        self._check()
+
+    def __call__(self):
+        """True once escape has been pressed."""
+        self.frames += 1
+        if self.pressed:
+            return True
+        policy = self.policy
+        if policy == 'window':
+            return False
+        if policy == 'throttled' and self.clock() < self._next:
+            return False
+        return self._check()
+
+    def _check(self):
+        start = time.perf_counter()
+        if self.keyboard.getKeys(keyList=['escape']):
+            self.pressed = True
+        elapsed = time.perf_counter() - start
+        self.checks += 1
+        self.check_time += elapsed
+        if elapsed > self.max_check:
+            self.max_check = elapsed
+        if self.policy == 'throttled':
+            self._next = self.clock() + self.interval
+        return self.pressed
+
+    def close(self):
+        """Remove the window's key-press handler, if any."""
+        if self._handler is not None:
+            handle, on_key_press = self._handler
+            handle.remove_handlers(on_key_press=on_key_press)
+            self._handler = None
+
+    def summary(self):
+        """
+        What escape checking cost, per frame, compared with checking every frame.
+
+        Returns
+        ==========
+        dict
+            ``policy``, ``frames``, ``checks``, ``check_mean`` and ``check_max``
+            (s per keyboard check), ``per_frame`` (s of checks per frame) and
+            ``saved_per_frame`` (s per frame a check on every frame would have
+            cost on top, estimated from the mean check).
+        """
+        frames = max(self.frames, 1)
+        check_mean = self.check_time / self.checks if self.checks else 0.0
+        return {
+            'policy': self.policy,
+            'frames': self.frames,
+            'checks': self.checks,
+            'check_mean': check_mean,
+            'check_max': self.max_check,
+            'per_frame': self.check_time / frames,
+            'saved_per_frame': check_mean * max(self.frames - self.checks, 0) / frames,
+        }
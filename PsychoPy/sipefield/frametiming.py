@@ -0,0 +1,144 @@
+"""Flip-by-flip timing of a routine, with dropped frames counted as they happen.
+
+`FrameTimer.record` is called with the timestamp returned by ``win.flip()``.
+It stores the time and frame index in preallocated arrays and checks the
+interval since the previous flip. An interval longer than ``threshold``
+refresh periods means the display showed the previous frame again, and each
+extra period counts as one dropped frame. At the end of a trial `end_trial`
+summarises the flips and moves them to a session-wide table, which `save`
+writes next to the experiment's trial CSV.
+"""
+import numpy as np
+
+from sipefield.recorder import ColumnarRecorder
+
+# Columns of the per-flip table saved as *_frames.csv
+FRAME_COLUMNS = (
+    ('trial', 'i4'),
+    ('frame', 'i4'),        # frameN of the routine when the flip happened
+    ('flip_time', 'f8'),    # flip time on the experiment's globalClock (s)
+    ('interval', 'f8'),     # time since the previous flip (s), NaN for the first
+    ('dropped', 'i4'),      # refreshes missed before this flip
+)
+
+
+class FrameTimer:
+    """
+    Per-trial flip time recorder.
+
+    Parameters
+    ==========
+    frame_rate : float
+        Measured refresh rate in Hz, e.g. ``expInfo['frameRate']``.
+    capacity : int
+        Flips per trial to preallocate; grows by doubling if exceeded.
+    threshold : float
+        Intervals longer than this many refresh periods count as dropped frames.
+    """
+
+    def __init__(self, frame_rate, capacity=4096, threshold=1.5):
+        self.period = 1.0 / frame_rate
+        self.limit = threshold * self.period
+        self.flip_times = np.empty(capacity)
+        self.frames = np.empty(capacity, dtype=np.int32)
+        self.trial = -1
+        self.clock_offset = 0.0
+        self.n = 0
+        self.dropped = 0         # dropped frames so far this trial
+        self.max_interval = 0.0  # longest interval so far this trial (s)
+        self._last_flip = None   # carried across trials, so the first flip of a trial is checked too
+        self._trial_start_flip = None  # last flip before this trial
+        self.log = ColumnarRecorder(FRAME_COLUMNS, capacity=capacity)
+        self.summaries = []
+
+    def start_trial(self, trial, clock_offset=0.0):
+        """
+        Begin recording a trial.
+
+        ``clock_offset`` is added to flip times for the saved table, to put
+        them on the globalClock; intervals and durations don't need it.
+        """
+        self.trial = trial
+        self.clock_offset = clock_offset
+        self._trial_start_flip = self._last_flip
+        self.n = 0
+        self.dropped = 0
+        self.max_interval = 0.0
+
+    def record(self, flip_time, frame):
+        """Store one flip; call with the return value of ``win.flip()``."""
+        n = self.n
+        if n == len(self.flip_times):
+            self.flip_times = np.concatenate((self.flip_times, np.empty(n)))
+            self.frames = np.concatenate((self.frames, np.empty(n, dtype=np.int32)))
+        self.flip_times[n] = flip_time
+        self.frames[n] = frame
+        self.n = n + 1
+        last = self._last_flip
+        self._last_flip = flip_time
+        if last is not None:
+            interval = flip_time - last
+            if interval > self.max_interval:
+                self.max_interval = interval
+            if interval > self.limit:
+                self.dropped += int(interval / self.period + 0.5) - 1
+
+    def duration(self, start_frame, stop_frame):
+        """
+        Time a stimulus was on screen this trial.
+
+        Measured from the flip of ``start_frame`` to the flip of ``stop_frame``,
+        the frame it was taken off. If that flip never happened (the routine
+        ended on that frame), one refresh period after the last recorded flip
+        stands in for it. Returns NaN if the stimulus never started.
+        """
+        if start_frame is None:
+            return np.nan
+        frames = self.frames[:self.n]
+        times = self.flip_times[:self.n]
+        start = np.searchsorted(frames, start_frame)
+        if start == self.n:
+            return np.nan
+        if stop_frame is not None:
+            stop = np.searchsorted(frames, stop_frame)
+            if stop < self.n and frames[stop] == stop_frame:
+                return float(times[stop] - times[start])
+        return float(times[-1] - times[start] + self.period)
+
+    def end_trial(self, **stimuli):
+        """
+        Summarise the trial and add its flips to the session table.
+
+        Parameters
+        ==========
+        **stimuli : (int or None, int or None)
+            ``name=(frameNStart, frameNStop)`` for each stimulus whose achieved
+            duration should be reported.
+
+        Returns
+        ==========
+        dict
+            ``frames``, ``dropped``, ``max_interval`` and ``<name>_duration``
+            for each stimulus, also kept in `summaries`.
+        """
+        n = self.n
+        times = self.flip_times[:n]
+        intervals = np.diff(times, prepend=np.nan)
+        if n and self._trial_start_flip is not None:
+            intervals[0] = times[0] - self._trial_start_flip
+        dropped = np.where(intervals > self.limit, np.rint(intervals / self.period) - 1, 0)
+        self.log.extend(np.full(n, self.trial), self.frames[:n], times + self.clock_offset,
+                        intervals, dropped)
+        summary = {'trial': self.trial, 'frames': n, 'dropped': self.dropped,
+                   'max_interval': self.max_interval}
+        for name, (start_frame, stop_frame) in stimuli.items():
+            summary[f'{name}_duration'] = self.duration(start_frame, stop_frame)
+        self.summaries.append(summary)
+        return summary
+
+    def save(self, prefix):
+        """Write ``<prefix>_frames.csv`` (every flip) and ``<prefix>_frame_summary.csv``."""
+        import pandas as pd
+
+        self.log.to_dataframe().to_csv(prefix + '_frames.csv', index=False)
+        pd.DataFrame(self.summaries).to_csv(prefix + '_frame_summary.csv', index=False)
@@ -0,0 +1,213 @@
+"""Keep Python's cyclic garbage collector off stimulus frames, and record every collection.
+
+Automatic collection runs whenever enough container objects have been
+allocated, wherever the program happens to be. A trial allocates steadily
+(data rows, f-strings, encoder chunks), so a collection can land on any frame
+of a trial. A full collection of a large heap can take longer than a frame.
+`GCControl` moves collections to where they are harmless:
+
+- ``'auto'``: leave the collector alone; collections are only recorded.
+- ``'disable'``: turn automatic collection off from the first trial and
+  collect explicitly, either while each trial's gray screen is up or right
+  after the trial. It stays off between trials, when the last trial's final
+  frame is still on screen and the garbage of the trial would trigger an
+  automatic collection there, and is turned back on by `GCControl.finish`.
+- ``'freeze'``: as ``'disable'``, and before the first trial also collect
+  everything and ``gc.freeze()`` the survivors. The stimuli, the window and
+  the imported modules then sit in a permanent generation that later
+  collections skip, which keeps the explicit collections short.
+
+A `GCMonitor` records every collection through ``gc.callbacks``: when it
+started, how long it took, the generation, the trial and frame, and the plan
+bits of the frame on screen while it ran. A collection holds that frame on
+screen for its duration, so the bits show whether any still hit a stimulus.
+Right after a trial the trial's last frame is still up: with ``collect =
+'between'`` and a trial that ends on the grating, the collection counts as on
+the stimulus.
+"""
+import gc
+import time
+
+import numpy as np
+
+GC_DTYPE = np.dtype([
+    ('time', 'f8'),        # clock time the collection started (s)
+    ('duration', 'f8'),    # s
+    ('generation', 'i1'),  # oldest generation collected
+    ('collected', 'i8'),   # unreachable objects found
+    ('trial', 'i4'),       # trial number, -1 between trials
+    ('frame', 'i4'),       # frameN being drawn within the trial, -1 between trials
+    ('visible', 'u1'),     # plan bits of the frame on screen (sipefield.schedule.STIM_*)
+])
+
+
+class GCMonitor:
+    """
+    Every garbage collection, tagged with the frame it landed on.
+
+    The frame loop keeps `trial`, `frame` and `visible` up to date. `trial`
+    and `frame` are -1 between trials; `visible` is what is on screen, which
+    between trials is the last trial's final frame until the next flip.
+
+    Parameters
+    ==========
+    clock : callable
+        Returns the time in seconds, e.g. ``psychopy.core.getTime``.
+    capacity : int
+        Collections to preallocate; grows by doubling if exceeded.
+    """
+
+    def __init__(self, clock=time.perf_counter, capacity=4096):
+        self.clock = clock
+        self._events = np.zeros(capacity, dtype=GC_DTYPE)
+        self.n = 0
+        self.trial = -1
+        self.frame = -1
+        self.visible = 0
+        self._start = 0.0
+
+    def start(self):
+        if self._callback not in gc.callbacks:
+            gc.callbacks.append(self._callback)
+
+    def stop(self):
+        if self._callback in gc.callbacks:
+            gc.callbacks.remove(self._callback)
+
+    def _callback(self, phase, info):
+        if phase == 'start':
+            self._start = self.clock()
+            return
+        duration = self.clock() - self._start
+        if self.n == len(self._events):
+            self._events = np.concatenate((self._events, np.zeros_like(self._events)))
+        self._events[self.n] = (self._start, duration, info['generation'], info['collected'],
+                                self.trial, self.frame, self.visible)
+        self.n += 1
+
+    @property
+    def events(self):
+        """The recorded collections, a `GC_DTYPE` array."""
+        return self._events[:self.n]
+
+    def trial_summary(self, trial, stimulus_bits):
+        """
+        Collections during one trial.
+
+        Parameters
+        ==========
+        trial : int
+            Trial number.
+        stimulus_bits : int
+            Plan bits that make a frame a stimulus frame, e.g. ``STIM_GRATING``.
+
+        Returns
+        ==========
+        dict
+            ``collections``, ``on_stimulus`` (how many landed on a stimulus frame)
+            and ``max_pause`` (longest collection, s).
+        """
+        events = self.events[self.events['trial'] == trial]
+        return {
+            'collections': len(events),
+            'on_stimulus': int(np.count_nonzero(events['visible'] & stimulus_bits)),
+            'max_pause': float(events['duration'].max()) if len(events) else 0.0,
+        }
+
+    def to_dataframe(self):
+        import pandas as pd
+
+        return pd.DataFrame(self.events)
+
+    def save(self, prefix):
+        """Write ``<prefix>_gc.csv``, one row per collection."""
+        self.to_dataframe().to_csv(prefix + '_gc.csv', index=False)
+
+
+class GCControl:
+    """
+    Where automatic garbage collection may run during trials.
+
+    Parameters
+    ==========
+    mode : str
+        ``'auto'``, ``'disable'`` or ``'freeze'``, see the module docstring.
+    collect : str
+        Where the explicit collection goes: ``'gray'`` (the first frame drawn
+        while a ``gray_bits`` frame is on screen and the one being drawn is
+        gray too) or ``'between'`` (after each trial, with its last frame
+        still on screen).
+    generation : int
+        Oldest generation the explicit collections cover (0-2). With
+        ``'freeze'``, 2 is usually still fast.
+    gray_bits : int
+        Plan bits of a gray-only frame, e.g. ``STIM_GRAY``.
+    monitor : GCMonitor or None
+        Told the trial and frame, if given.
+    """
+
+    def __init__(self, mode='disable', collect='between', generation=1, gray_bits=0, monitor=None):
+        if mode not in ('auto', 'disable', 'freeze'):
+            raise ValueError(f"unknown GC mode {mode!r}")
+        if collect not in ('gray', 'between'):
+            raise ValueError(f"unknown GC collection point {collect!r}")
+        self.mode = mode
+        self.collect = collect
+        self.generation = generation
+        self.gray_bits = gray_bits
+        self.monitor = monitor
+        self.plan_visible = None
+        self.drawing = 0    # plan bits of the frame being drawn
+        self.on_screen = 0  # plan bits of the frame drawn at the previous call, flipped since
+        self.collected = False  # explicit collection done this trial
+        self.frozen = False
+
+    def begin_trial(self, trial, plan=None):
+        """Call before the trial's routine starts."""
+        if self.mode == 'freeze' and not self.frozen:
+            # by the first trial everything long-lived exists
+            gc.collect()
+            gc.freeze()
+            self.frozen = True
+        self.plan_visible = plan.visible if plan is not None else None
+        self.collected = False
+        if self.monitor is not None:
+            self.monitor.trial = trial
+        if self.mode != 'auto':
+            gc.disable()
+
+    def each_frame(self, t, frameN, index):
+        """`sipefield.routines.Routine` 'Each Frame' hook; put it first so later code is tagged right."""
+        visible = 0
+        if self.plan_visible is not None and index is not None and index < len(self.plan_visible):
+            visible = self.plan_visible[index]
+        self.on_screen, self.drawing = self.drawing, visible
+        monitor = self.monitor
+        if monitor is not None:
+            monitor.frame = frameN
+            monitor.visible = self.on_screen
+        if (self.collect == 'gray' and not self.collected and self.mode != 'auto'
+                and self.on_screen == visible == self.gray_bits):
+            self.collected = True
+            gc.collect(self.generation)
+
+    def end_trial(self):
+        """Call after the trial's routine ends."""
+        # the last frame drawn was flipped and stays up until the next routine flips
+        self.on_screen = self.drawing
+        if self.monitor is not None:
+            self.monitor.frame = -1
+            self.monitor.visible = self.on_screen
+        if self.mode != 'auto' and (self.collect == 'between' or not self.collected):
+            gc.collect(self.generation)
+        if self.monitor is not None:
+            self.monitor.trial = -1
+
+    def finish(self):
+        """Turn automatic collection back on and release a freeze; call after the last trial."""
+        if self.monitor is not None:
+            self.monitor.visible = 0  # the trials' frames are gone by now
+        gc.enable()
+        if self.frozen:
+            gc.unfreeze()
+            self.frozen = False
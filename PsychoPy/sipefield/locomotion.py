@@ -0,0 +1,172 @@
+"""Vectorised locomotion metrics from wheel encoder clicks.
+
+Everything here works on whole arrays of samples. `compute_metrics` handles a
+finished recording; `LocomotionStream` produces the same metrics chunk by chunk
+as DisplayGratings drains the sample ring, one call per frame whatever the
+number of samples.
+
+Smoothing applies to speed. Offline it uses a centred window. Streaming can't
+see future samples, so it uses a trailing window: a trailing moving average,
+or a Savitzky-Golay fit evaluated at the newest point.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+DIRECTION_STATIONARY = 0
+DIRECTION_FORWARD = 1
+DIRECTION_BACKWARD = 2
+
+
+@dataclass
+class WheelConfig:
+    """Wheel geometry and speed smoothing settings."""
+
+    wheel_diameter: float = 0.2  # m
+    encoder_cpr: int = 1000      # encoder counts per revolution
+    smoothing: str = 'none'      # 'none', 'moving_average' or 'savgol'
+    window: int = 5              # smoothing window in samples (odd for savgol)
+    polyorder: int = 2           # Savitzky-Golay polynomial order
+
+    @property
+    def metres_per_click(self):
+        return np.pi * self.wheel_diameter / self.encoder_cpr
+
+
+@dataclass
+class Metrics:
+    """Per-sample metrics, one array entry per encoder sample."""
+
+    speed: np.ndarray         # m/s, smoothed if configured
+    distance: np.ndarray      # cumulative m
+    direction: np.ndarray     # DIRECTION_* codes
+    acceleration: np.ndarray  # m/s^2, from the (smoothed) speed
+
+
+def direction(clicks):
+    """Direction code per sample: 0 stationary, 1 forward, 2 backward."""
+    clicks = np.asarray(clicks)
+    out = np.zeros(clicks.shape, dtype=np.int8)
+    out[clicks > 0] = DIRECTION_FORWARD
+    out[clicks < 0] = DIRECTION_BACKWARD
+    return out
+
+
+def savgol_coefficients(window, polyorder, position=None):
+    """
+    Savitzky-Golay weights that estimate the value at ``position`` in a window.
+
+    ``position`` defaults to the centre; ``window - 1`` gives the trailing
+    (causal) filter used when streaming.
+    """
+    if polyorder >= window:
+        raise ValueError("polyorder must be less than window")
+    position = (window - 1) // 2 if position is None else position
+    x = np.arange(window) - position
+    vandermonde = np.vander(x, polyorder + 1, increasing=True)
+    # first row of the pseudo-inverse evaluates the fitted polynomial at x = 0
+    return np.linalg.pinv(vandermonde)[0]
+
+
+def smooth(values, config):
+    """Centred smoothing of a complete series; edges use a shrunken window."""
+    values = np.asarray(values, dtype=float)
+    window = min(config.window, len(values))
+    if config.smoothing == 'none' or window < 2:
+        return values
+    if config.smoothing == 'moving_average':
+        kernel = np.ones(window)
+        counts = np.convolve(np.ones(len(values)), kernel, mode='same')
+        return np.convolve(values, kernel, mode='same') / counts
+    if config.smoothing == 'savgol':
+        window -= 1 - window % 2  # odd
+        if window <= config.polyorder:
+            return values
+        half = window // 2
+        padded = np.pad(values, half, mode='edge')
+        return np.convolve(padded, savgol_coefficients(window, config.polyorder)[::-1], mode='valid')
+    raise ValueError(f"unknown smoothing {config.smoothing!r}")
+
+
+def compute_metrics(clicks, dt, config=None, start_distance=0.0):
+    """
+    Metrics for a complete series of samples.
+
+    Parameters
+    ==========
+    clicks : array of int
+        Encoder clicks per sample window.
+    dt : float or array
+        Duration of each sample window in seconds.
+    config : WheelConfig or None
+        Geometry and smoothing, defaults to `WheelConfig()`.
+    start_distance : float
+        Distance already covered before the first sample.
+
+    Returns
+    ==========
+    Metrics
+    """
+    config = config or WheelConfig()
+    step = np.asarray(clicks, dtype=float) * config.metres_per_click
+    speed = smooth(step / dt, config)
+    acceleration = np.gradient(speed) / dt if len(speed) > 1 else np.zeros_like(speed)
+    return Metrics(speed=speed,
+                   distance=start_distance + np.cumsum(step),
+                   direction=direction(clicks),
+                   acceleration=acceleration)
+
+
+class LocomotionStream:
+    """
+    Incremental `compute_metrics` for chunks drained from the sample ring.
+
+    Keeps the running distance, and the last few raw speeds for the trailing
+    smoothing window, between calls.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or WheelConfig()
+        self.distance = 0.0
+        self._last_speed = None
+        self._history = np.empty(0)
+        smoothing = self.config.smoothing
+        if smoothing == 'none':
+            self._kernel = None
+        elif smoothing == 'moving_average':
+            self._kernel = np.full(self.config.window, 1.0 / self.config.window)
+        elif smoothing == 'savgol':
+            window = self.config.window
+            self._kernel = savgol_coefficients(window, self.config.polyorder, position=window - 1)
+        else:
+            raise ValueError(f"unknown smoothing {smoothing!r}")
+
+    def update(self, clicks, dt):
+        """Metrics for the next chunk of samples; ``dt`` as in `compute_metrics`."""
+        clicks = np.asarray(clicks)
+        step = clicks * self.config.metres_per_click
+        raw_speed = step / dt
+        speed = self._smooth(raw_speed)
+        if len(speed):
+            previous = speed[0] if self._last_speed is None else self._last_speed
+            acceleration = np.diff(speed, prepend=previous) / dt
+            self._last_speed = speed[-1]
+        else:
+            acceleration = np.empty(0)
+        distance = self.distance + np.cumsum(step)
+        if len(distance):
+            self.distance = float(distance[-1])
+        return Metrics(speed=speed, distance=distance,
+                       direction=direction(clicks), acceleration=acceleration)
+
+    def _smooth(self, raw_speed):
+        if self._kernel is None or not len(raw_speed):
+            return raw_speed
+        window = len(self._kernel)
+        series = np.concatenate((self._history, raw_speed))
+        self._history = series[max(0, len(series) - (window - 1)):]
+        missing = len(raw_speed) + window - 1 - len(series)
+        if missing > 0:
+            # not enough history yet: repeat the oldest sample to fill the window
+            series = np.concatenate((np.full(missing, series[0]), series))
+        return np.convolve(series, self._kernel[::-1], mode='valid')
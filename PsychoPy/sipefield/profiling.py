@@ -0,0 +1,140 @@
+"""Per-frame time spent in each section of a routine's frame loop.
+
+A `FrameProfiler` is told where a frame starts (`FrameProfiler.frame`) and
+where each section of it begins (`FrameProfiler.section`). The time between
+two marks is charged to the section that was open. Each mark reads two
+clocks: ``time.thread_time`` for the CPU the frame loop used, and
+``time.perf_counter`` for wall time, which also counts waiting for the
+vertical blank in ``win.flip()``. Rows go into preallocated arrays, so a mark
+costs about a microsecond and doesn't allocate.
+
+On Windows ``time.thread_time`` only advances in scheduler ticks (about
+15.6 ms), so per-section CPU times there are coarse. Use the wall times
+instead, except for the flip.
+"""
+import time
+
+import numpy as np
+
+# Sections of a Builder frame loop, in the order they run
+FRAME_SECTIONS = (
+    'clock',     # routine timer and next-flip time queries
+    'stimulus',  # component start/stop checks and parameter updates
+    'encoder',   # draining and processing wheel samples
+    'keyboard',  # response and escape key polls
+    'other',     # pause handling and the all-finished check
+    'flip',      # win.flip() and whatever runs on it, up to the next frame
+)
+
+
+class FrameProfiler:
+    """
+    Section times for every frame, tagged with the routine it belongs to.
+
+    Parameters
+    ==========
+    sections : sequence of str
+        Section names; a frame starts in the first one.
+    capacity : int
+        Frames to preallocate; grows by doubling if exceeded.
+    """
+
+    def __init__(self, sections=FRAME_SECTIONS, capacity=1 << 16):
+        self.sections = tuple(sections)
+        self._index = {name: i for i, name in enumerate(self.sections)}
+        self.cpu = np.zeros((capacity, len(self.sections)))
+        self.wall = np.zeros((capacity, len(self.sections)))
+        self.routine = np.zeros(capacity, dtype=np.int16)
+        self.routines = []  # routine names, indexed by the 'routine' column
+        self.n = 0
+        self._row = None        # section index of the open frame's current section, None between frames
+        self._cpu_mark = 0.0
+        self._wall_mark = 0.0
+
+    def frame(self, routine):
+        """End the open frame, if any, and start a new one of ``routine``."""
+        if self._row is not None:
+            self.stop()
+        n = self.n
+        if n == len(self.routine):
+            self.cpu = np.concatenate((self.cpu, np.zeros_like(self.cpu)))
+            self.wall = np.concatenate((self.wall, np.zeros_like(self.wall)))
+            self.routine = np.concatenate((self.routine, np.zeros_like(self.routine)))
+        try:
+            self.routine[n] = self.routines.index(routine)
+        except ValueError:
+            self.routines.append(routine)
+            self.routine[n] = len(self.routines) - 1
+        self._row = 0
+        self._cpu_mark = time.thread_time()
+        self._wall_mark = time.perf_counter()
+
+    def section(self, name):
+        """Charge the time since the last mark to the open section and open ``name``."""
+        if self._row is None:
+            return
+        cpu = time.thread_time()
+        wall = time.perf_counter()
+        n = self.n
+        row = self._row
+        self.cpu[n, row] += cpu - self._cpu_mark
+        self.wall[n, row] += wall - self._wall_mark
+        self._row = self._index[name]
+        self._cpu_mark = cpu
+        self._wall_mark = wall
+
+    def stop(self):
+        """End the open frame, e.g. when its routine ends."""
+        if self._row is None:
+            return
+        cpu = time.thread_time()
+        wall = time.perf_counter()
+        self.cpu[self.n, self._row] += cpu - self._cpu_mark
+        self.wall[self.n, self._row] += wall - self._wall_mark
+        self._row = None
+        self.n += 1
+
+    def summary(self):
+        """
+        Statistics of the recorded frames, per routine.
+
+        Returns
+        ==========
+        dict
+            Routine name to ``{'frames': n, 'cpu_us': ..., 'wall_us': ...}``, where
+            each of the last two maps every section and ``'total'`` to the mean,
+            p50, p95, p99 and max in microseconds.
+        """
+        result = {}
+        for i, name in enumerate(self.routines):
+            rows = self.routine[:self.n] == i
+            if not rows.any():
+                continue
+            result[name] = {
+                'frames': int(np.count_nonzero(rows)),
+                'cpu_us': self._stats(self.cpu[:self.n][rows]),
+                'wall_us': self._stats(self.wall[:self.n][rows]),
+            }
+        return result
+
+    def _stats(self, times):
+        columns = dict(zip(self.sections, times.T))
+        columns['total'] = times.sum(axis=1)
+        return {name: {
+            'mean': float(1e6 * values.mean()),
+            'p50': float(1e6 * np.percentile(values, 50)),
+            'p95': float(1e6 * np.percentile(values, 95)),
+            'p99': float(1e6 * np.percentile(values, 99)),
+            'max': float(1e6 * values.max()),
+        } for name, values in columns.items()}
+
+    def to_dataframe(self):
+        """Every frame as a row: routine, then ``cpu_<section>`` and ``wall_<section>`` in seconds."""
+        import pandas as pd
+
+        frame = pd.DataFrame({'routine': np.array(self.routines, dtype=object)[self.routine[:self.n]]})
+        for i, name in enumerate(self.sections):
+            frame[f'cpu_{name}'] = self.cpu[:self.n, i]
+        for i, name in enumerate(self.sections):
+            frame[f'wall_{name}'] = self.wall[:self.n, i]
+        return frame
@@ -0,0 +1,172 @@
+"""Binary packet format spoken by the rotary encoder firmware.
+
+Every sample is one 14-byte little-endian packet::
+
+    offset  size  field
+    0       2     sync bytes 0xA5 0x5A
+    2       1     protocol version (PROTOCOL_VERSION)
+    3       4     sequence number, uint32, +1 per sample
+    7       4     device time from micros(), uint32, wraps every ~71.6 min
+    11      2     encoder clicks in this sample window, int16
+    13      1     CRC-8 (poly 0x07, init 0) over bytes 2-12
+
+`PacketDecoder` parses whole read buffers with NumPy instead of handling one
+sample at a time. The pure-Python encoder used as the reference for the
+firmware lives in `sipefield.emulator`.
+"""
+import numpy as np
+
+SYNC = b'\xa5\x5a'
+PROTOCOL_VERSION = 1
+CRC8_POLY = 0x07
+
+# On-the-wire packet layout (numpy packs structured dtypes without padding)
+PACKET_DTYPE = np.dtype([
+    ('sync', 'u1', 2),
+    ('version', 'u1'),
+    ('seq', '<u4'),
+    ('device_us', '<u4'),
+    ('delta', '<i2'),
+    ('crc', 'u1'),
+])
+PACKET_SIZE = PACKET_DTYPE.itemsize
+
+# Decoded samples handed to the rest of the pipeline
+DECODED_DTYPE = np.dtype([
+    ('seq', 'i8'),
+    ('device_us', 'i8'),  # unwrapped, so it keeps increasing past the uint32 limit
+    ('delta', 'i4'),
+])
+
+
+def _crc8_tables(poly=CRC8_POLY, length=PACKET_SIZE - 3):
+    # CRC-8 with zero init is linear over XOR, so the CRC of a message is the XOR
+    # of the CRCs of each byte at its position with zeros everywhere else
+    table = np.zeros(256, dtype=np.uint8)
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table[byte] = crc
+    positions = np.zeros((length, 256), dtype=np.uint8)
+    positions[length - 1] = table
+    for pos in range(length - 2, -1, -1):
+        # one more trailing zero byte shifts the CRC through the table once more
+        positions[pos] = table[positions[pos + 1]]
+    return positions
+
+
+CRC8_POSITION_TABLES = _crc8_tables()
+_CRC_POSITIONS = np.arange(PACKET_SIZE - 3)
+_HEADER = np.frombuffer(SYNC + bytes([PROTOCOL_VERSION]), dtype=np.uint8)
+
+
+def crc8_rows(block):
+    """CRC-8 of every row of a (n, 11) uint8 array of packet bodies."""
+    return np.bitwise_xor.reduce(CRC8_POSITION_TABLES[_CRC_POSITIONS, block], axis=1)
+
+
+class PacketDecoder:
+    """
+    Incremental decoder for a stream of binary encoder packets.
+
+    Bytes that do not belong to a valid packet (line noise, a reset in the middle
+    of a packet, a checksum failure) are skipped and counted. An incomplete
+    packet at the end of a buffer is kept and completed by the next `feed`.
+    """
+
+    def __init__(self):
+        self._tail = b''
+        self._last_us = None  # last raw device time, for unwrapping
+        self._wraps = 0
+        self.packets = 0
+        self.bad_packets = 0  # sync found but version or CRC wrong
+        self.skipped_bytes = 0
+
+    def feed(self, data):
+        """
+        Decode every complete packet in ``data`` plus any bytes left over.
+
+        Parameters
+        ==========
+        data : bytes
+            Raw bytes read from the serial port.
+
+        Returns
+        ==========
+        numpy.ndarray
+            Structured array with `DECODED_DTYPE`, possibly empty.
+        """
+        if self._tail:
+            data = self._tail + data
+        buf = np.frombuffer(data, dtype=np.uint8)
+        n = len(buf)
+        count = n // PACKET_SIZE
+        if count and data[:2] == SYNC:
+            # usual case: the buffer starts on a packet boundary and holds
+            # nothing but good packets, so it can be viewed in place
+            block = buf[:count * PACKET_SIZE].reshape(count, PACKET_SIZE)
+            if self._valid(block).all():
+                self._tail = bytes(data[count * PACKET_SIZE:])
+                self.packets += count
+                return self._decode(np.frombuffer(data, dtype=PACKET_DTYPE, count=count))
+        if n < PACKET_SIZE:
+            self._tail = bytes(data)
+            return np.empty(0, dtype=DECODED_DTYPE)
+
+        # candidate packet starts: sync pair with room for a full packet after it
+        starts = np.flatnonzero((buf[:n - PACKET_SIZE + 1] == SYNC[0])
+                                & (buf[1:n - PACKET_SIZE + 2] == SYNC[1]))
+        if len(starts):
+            valid = self._valid(buf[starts[:, None] + np.arange(PACKET_SIZE)])
+            self.bad_packets += int(np.count_nonzero(~valid))
+            starts = starts[valid]
+            if len(starts) > 1 and np.any(np.diff(starts) < PACKET_SIZE):
+                starts = self._drop_overlaps(starts)
+
+        # keep the last PACKET_SIZE - 1 bytes unless a packet already covers them;
+        # they may be the start of a packet that is still arriving
+        end = int(starts[-1]) + PACKET_SIZE if len(starts) else 0
+        consumed = max(end, n - PACKET_SIZE + 1)
+        self.skipped_bytes += consumed - len(starts) * PACKET_SIZE
+        self._tail = bytes(data[consumed:])
+        self.packets += len(starts)
+        block = buf[starts[:, None] + np.arange(PACKET_SIZE)]
+        return self._decode(np.frombuffer(block.tobytes(), dtype=PACKET_DTYPE))
+
+    @staticmethod
+    def _valid(block):
+        return ((block[:, :3] == _HEADER).all(axis=1)
+                & (crc8_rows(block[:, 2:PACKET_SIZE - 1]) == block[:, PACKET_SIZE - 1]))
+
+    def _decode(self, packets):
+        out = np.empty(len(packets), dtype=DECODED_DTYPE)
+        out['seq'] = packets['seq']
+        out['delta'] = packets['delta']
+        out['device_us'] = self._unwrap(packets['device_us'].astype(np.int64))
+        return out
+
+    @staticmethod
+    def _drop_overlaps(starts):
+        # a sync pair inside a valid packet's payload that also passed the CRC;
+        # rare enough that a Python loop is fine
+        kept = [int(starts[0])]
+        for start in starts[1:]:
+            if start >= kept[-1] + PACKET_SIZE:
+                kept.append(int(start))
+        return np.asarray(kept, dtype=starts.dtype)
+
+    def _unwrap(self, raw):
+        if not len(raw):
+            return raw
+        previous = raw[0] if self._last_us is None else self._last_us
+        self._last_us = int(raw[-1])
+        steps = np.empty(len(raw), dtype=np.int64)
+        steps[0] = raw[0] - previous
+        np.subtract(raw[1:], raw[:-1], out=steps[1:])
+        wrapped = steps < -(1 << 31)
+        if not wrapped.any():
+            return raw + (self._wraps << 32)
+        wraps = self._wraps + np.cumsum(wrapped)
+        self._wraps = int(wraps[-1])
+        return raw + (wraps << 32)
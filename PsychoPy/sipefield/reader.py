@@ -0,0 +1,150 @@
+"""Background thread that reads the encoder serial port in bulk.
+
+The reader drains everything waiting on the port in one ``read`` call, decodes
+every complete record in that chunk in one pass, and publishes them to a
+`SampleRing`. Incomplete records stay in the decoder until the next chunk
+arrives. The port is opened with a short timeout, so `EncoderReader.stop`
+returns within a few milliseconds.
+
+After each chunk the thread waits ``min_interval`` before reading again, so at
+high sample rates several samples are decoded per call rather than one. Host
+timestamps are taken per chunk and so are only as fine as ``min_interval``.
+"""
+import threading
+import time
+
+import numpy as np
+
+from sipefield.protocol import DECODED_DTYPE, PacketDecoder
+from sipefield.ring import SAMPLE_DTYPE
+
+# timeout to open the port with; bounds how long stop() waits for the reader
+POLL_TIMEOUT = 0.005
+# shortest time between two reads of the port
+MIN_READ_INTERVAL = 0.002
+
+
+class LineDecoder:
+    """
+    Incremental decoder for the legacy ASCII output, one integer per line.
+
+    Complete lines in a chunk are parsed together; the unterminated tail is kept
+    for the next `feed`. Lines that are not integers are skipped and counted.
+    Samples are numbered here because the ASCII format carries no sequence
+    number, and ``device_us`` is set to -1.
+    """
+
+    def __init__(self):
+        self._tail = b''
+        self.seq = 0
+        self.bad_lines = 0
+
+    def feed(self, data):
+        """Decode every complete line in ``data``; returns a `DECODED_DTYPE` array."""
+        data = self._tail + data
+        end = data.rfind(b'\n') + 1
+        self._tail = data[end:]
+        tokens = data[:end].split()
+        try:
+            deltas = np.array(tokens, dtype=np.bytes_).astype(np.int64)
+        except ValueError:
+            deltas = self._parse_slowly(tokens)
+        out = np.empty(len(deltas), dtype=DECODED_DTYPE)
+        out['seq'] = np.arange(self.seq, self.seq + len(deltas))
+        out['device_us'] = -1
+        out['delta'] = deltas
+        self.seq += len(deltas)
+        return out
+
+    def _parse_slowly(self, tokens):
+        # only reached when the chunk has a garbage line in it
+        deltas = []
+        for token in tokens:
+            try:
+                deltas.append(int(token))
+            except ValueError:
+                self.bad_lines += 1
+        return np.asarray(deltas, dtype=np.int64)
+
+
+def make_decoder(protocol):
+    """Return a fresh decoder for 'binary' or 'ascii' encoder output."""
+    if protocol == 'binary':
+        return PacketDecoder()
+    if protocol == 'ascii':
+        return LineDecoder()
+    raise ValueError(f"unknown encoder protocol {protocol!r}")
+
+
+class EncoderReader(threading.Thread):
+    """
+    Daemon thread moving decoded encoder samples from a serial port to a ring.
+
+    Parameters
+    ==========
+    port : serial.Serial
+        Open port; its ``timeout`` should be short (see `POLL_TIMEOUT`).
+    ring : sipefield.ring.SampleRing
+        Destination for `SAMPLE_DTYPE` records.
+    protocol : str
+        'binary' or 'ascii', see `make_decoder`.
+    clock : callable
+        Returns the host time stamped on each chunk, e.g. ``psychopy.core.getTime``.
+    min_interval : float
+        Seconds to wait after a chunk before reading again, see `MIN_READ_INTERVAL`.
+    stop_event : threading.Event or None
+        Event that ends the read loop; anything with ``is_set``, ``set`` and
+        ``wait`` will do. A new Event by default.
+    """
+
+    def __init__(self, port, ring, protocol='binary', clock=time.perf_counter,
+                 min_interval=MIN_READ_INTERVAL, stop_event=None):
+        super().__init__(name='EncoderReader', daemon=True)
+        self.port = port
+        self.ring = ring
+        self.decoder = make_decoder(protocol)
+        self.clock = clock
+        self.min_interval = min_interval
+        self._stop_event = threading.Event() if stop_event is None else stop_event
+        self.reads = 0
+        self.bytes_read = 0
+        self.samples = 0
+        self.cpu_time = 0.0  # CPU seconds used by this thread, set when it exits
+
+    def run(self):
+        cpu_start = time.thread_time()
+        port = self.port
+        stop_event = self._stop_event
+        try:
+            while not stop_event.is_set():
+                # returns at once with everything buffered, or waits up to
+                # port.timeout for the first byte when nothing is waiting
+                chunk = port.read(port.in_waiting or 1)
+                if not chunk:
+                    continue
+                host_time = self.clock()
+                self.reads += 1
+                self.bytes_read += len(chunk)
+                self.publish(self.decoder.feed(chunk), host_time)
+                # let the next samples pile up instead of waking for each one
+                stop_event.wait(self.min_interval)
+        finally:
+            self.cpu_time = time.thread_time() - cpu_start
+
+    def publish(self, decoded, host_time):
+        """Stamp decoded samples with the chunk's host time and push them to the ring."""
+        if not len(decoded):
+            return
+        samples = np.empty(len(decoded), dtype=SAMPLE_DTYPE)
+        samples['host_time'] = host_time
+        samples['device_time'] = np.where(decoded['device_us'] >= 0, decoded['device_us'] * 1e-6, np.nan)
+        samples['seq'] = decoded['seq']
+        samples['delta'] = decoded['delta']
+        self.ring.extend(samples)
+        self.samples += len(decoded)
+
+    def stop(self, timeout=1.0):
+        """Ask the thread to exit and wait for it."""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
@@ -0,0 +1,101 @@
+"""Append-only columnar storage for per-sample session data.
+
+Each column is a typed NumPy array that doubles in size when full, so an
+append costs O(1) amortised no matter how long the session runs. Converting to
+a pandas DataFrame (and importing pandas at all) is left to the end of the
+session.
+"""
+import numpy as np
+
+# Columns of the wheel data saved as *_wheeldf.csv
+WHEEL_COLUMNS = (
+    ('timestamp', 'f8'),
+    ('speed', 'f8'),
+    ('distance', 'f8'),
+    ('direction', 'i1'),
+    ('acceleration', 'f8'),
+    ('device_time', 'f8'),  # encoder firmware clock (s)
+    ('global_time', 'f8'),  # sample time on the experiment's globalClock (s)
+    ('seq', 'i8'),          # firmware sample number
+    ('interpolated', '?'),  # True for windows lost on the link and filled in
+)
+
+
+class ColumnarRecorder:
+    """
+    Growable set of typed columns with a shared row count.
+
+    Rows are written before the row count is raised, so another thread that
+    reads `len` first and the columns afterwards (see `sipefield.writer`)
+    only ever sees complete rows.
+
+    Parameters
+    ==========
+    columns : sequence of (str, dtype)
+        Column names and types, in row order.
+    capacity : int
+        Rows to preallocate before the first resize.
+    """
+
+    def __init__(self, columns=WHEEL_COLUMNS, capacity=4096):
+        self.names = tuple(name for name, _ in columns)
+        self._arrays = [np.empty(capacity, dtype=dtype) for _, dtype in columns]
+        self._capacity = capacity
+        self._n = 0
+
+    def __len__(self):
+        return self._n
+
+    def _grow(self, needed):
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        grown = []
+        for array in self._arrays:
+            new = np.empty(capacity, dtype=array.dtype)
+            new[:self._n] = array[:self._n]
+            grown.append(new)
+        # swap all columns at once so readers never mix old and new arrays
+        self._arrays = grown
+        self._capacity = capacity
+
+    def append(self, *values):
+        """Append one row given as one value per column."""
+        n = self._n
+        if n == self._capacity:
+            self._grow(n + 1)
+        for array, value in zip(self._arrays, values):
+            array[n] = value
+        self._n = n + 1
+
+    def extend(self, *columns):
+        """Append many rows given as one array (or sequence) per column."""
+        count = len(columns[0])
+        if count == 0:
+            return
+        n = self._n
+        if n + count > self._capacity:
+            self._grow(n + count)
+        for array, values in zip(self._arrays, columns):
+            array[n:n + count] = values
+        self._n = n + count
+
+    def column(self, name):
+        """View of the filled part of one column."""
+        return self._arrays[self.names.index(name)][:self._n]
+
+    def rows(self, start=0, stop=None):
+        """Copy rows ``start`` to ``stop`` into a structured array."""
+        stop = self._n if stop is None else stop
+        arrays = self._arrays
+        out = np.empty(stop - start, dtype=[(name, array.dtype)
+                                            for name, array in zip(self.names, arrays)])
+        for name, array in zip(self.names, arrays):
+            out[name] = array[start:stop]
+        return out
+
+    def to_dataframe(self):
+        """Copy the recorded rows into a pandas DataFrame."""
+        import pandas as pd
+        return pd.DataFrame({name: array[:self._n].copy()
+                             for name, array in zip(self.names, self._arrays)})
@@ -0,0 +1,160 @@
+"""Preallocated ring buffers shared between a producer thread and the frame loop.
+
+One thread writes records and advances the ring's ``head`` counter; every reader
+keeps its own :class:`RingCursor`. Neither side takes a lock. The producer fills
+the slot before it publishes the new head, so a reader never sees a half-written
+record. A reader that falls more than ``capacity`` records behind loses the
+oldest ones, and its cursor counts them in ``lost``.
+
+A ring can be placed in any writable buffer of `ring_nbytes` bytes, such as a
+``multiprocessing.shared_memory`` block (see `sipefield.acquisition`). The
+buffer starts with a small header of int64 slots, ``head`` being the first;
+the records follow.
+"""
+import numpy as np
+
+# Record layout for decoded encoder samples
+SAMPLE_DTYPE = np.dtype([
+    ('host_time', 'f8'),    # host clock time the sample was read (s)
+    ('device_time', 'f8'),  # firmware clock time of the sample (s), NaN if not sent
+    ('seq', 'i8'),          # sample sequence number
+    ('delta', 'i4'),        # encoder clicks in this sample window
+])
+
+# int64 slots before the records; slot 0 is the head, the rest are free for
+# whoever owns the buffer (e.g. control flags between processes)
+HEADER_SLOTS = 8
+HEADER_BYTES = HEADER_SLOTS * 8
+
+
+def ring_nbytes(capacity, dtype=SAMPLE_DTYPE):
+    """Size of the buffer needed for a ring of ``capacity`` records."""
+    return HEADER_BYTES + capacity * np.dtype(dtype).itemsize
+
+
+class SampleRing:
+    """
+    Fixed-capacity ring of structured records with a single writer.
+
+    Parameters
+    ==========
+    capacity : int
+        Number of records held; must be a power of two.
+    dtype : numpy.dtype
+        Record layout, `SAMPLE_DTYPE` by default.
+    buffer : writable buffer or None
+        At least `ring_nbytes` bytes to hold the ring, or None to allocate one.
+        An existing buffer is used as is, so a second process can attach to a
+        ring another process is writing.
+    """
+
+    def __init__(self, capacity=65536, dtype=SAMPLE_DTYPE, buffer=None):
+        if capacity <= 0 or capacity & (capacity - 1):
+            raise ValueError(f"capacity must be a power of two, got {capacity}")
+        self.capacity = capacity
+        self.dtype = np.dtype(dtype)
+        self._mask = capacity - 1
+        if buffer is None:
+            buffer = bytearray(ring_nbytes(capacity, self.dtype))
+        self.header = np.ndarray(HEADER_SLOTS, dtype=np.int64, buffer=buffer)
+        # total number of records ever written; readers only trust slots below it
+        self._head = self.header[:1]
+        self._data = np.ndarray(capacity, dtype=self.dtype, buffer=buffer, offset=HEADER_BYTES)
+
+    @property
+    def head(self):
+        """Total number of records written so far."""
+        return int(self._head[0])
+
+    def push(self, *fields):
+        """Append one record given as its field values, in dtype order."""
+        head = int(self._head[0])
+        self._data[head & self._mask] = fields
+        self._head[0] = head + 1
+
+    def extend(self, records):
+        """Append a structured array of records in one or two slice copies."""
+        n = len(records)
+        if n == 0:
+            return
+        head = int(self._head[0])
+        if n > self.capacity:
+            # only the newest `capacity` records can survive anyway
+            head += n - self.capacity
+            records = records[-self.capacity:]
+            n = self.capacity
+        start = head & self._mask
+        first = min(n, self.capacity - start)
+        self._data[start:start + first] = records[:first]
+        if first < n:
+            self._data[:n - first] = records[first:]
+        self._head[0] = head + n
+
+    def copy_range(self, start, stop):
+        """Return a copy of records ``start`` to ``stop`` (absolute indices)."""
+        n = stop - start
+        begin = start & self._mask
+        if begin + n <= self.capacity:
+            return self._data[begin:begin + n].copy()
+        return np.concatenate((self._data[begin:], self._data[:begin + n - self.capacity]))
+
+    def cursor(self, from_start=False):
+        """Make a reader positioned at the current head (or at the oldest record)."""
+        return RingCursor(self, from_start=from_start)
+
+
+class RingCursor:
+    """
+    Read position into a `SampleRing`.
+
+    Each call to `drain` returns every record written since the previous call as
+    one structured array, so each record is seen exactly once.
+    """
+
+    def __init__(self, ring, from_start=False):
+        self.ring = ring
+        self.position = max(0, ring.head - ring.capacity) if from_start else ring.head
+        self.lost = 0  # records overwritten before this cursor reached them
+
+    @property
+    def pending(self):
+        """Number of records written but not yet drained."""
+        return self.ring.head - self.position
+
+    def drain(self, max_records=None):
+        """
+        Return all new records (oldest first) and advance the cursor.
+
+        Parameters
+        ==========
+        max_records : int or None
+            Upper bound on the number of records returned, None for all.
+
+        Returns
+        ==========
+        numpy.ndarray
+            Structured array with the ring's dtype, possibly empty.
+        """
+        ring = self.ring
+        head = ring.head
+        oldest = head - ring.capacity
+        if self.position < oldest:
+            self.lost += oldest - self.position
+            self.position = oldest
+        stop = head if max_records is None else min(head, self.position + max_records)
+        records = ring.copy_range(self.position, stop)
+        # the writer may have lapped us while we copied; drop anything it overwrote
+        overwritten = ring.head - ring.capacity - self.position
+        if overwritten > 0:
+            overwritten = min(overwritten, len(records))
+            self.lost += overwritten
+            records = records[overwritten:]
+        self.position = stop
+        return records
+
+    def skip(self):
+        """Move to the ring's head without reading; returns how many records were passed over."""
+        head = self.ring.head
+        skipped = head - self.position
+        self.position = head
+        return skipped
@@ -0,0 +1,431 @@
+"""Builder-compatible routine runner with the per-frame bookkeeping cut down.
+
+A Builder export repeats the same loop for every routine. Each frame it reads
+the routine timer and makes two ``win.getFutureFlipTime`` calls. It checks
+every component's status with ``hasattr``, and it scans all components to
+see whether any is still running. `RoutineEngine` runs the same flow from a
+`Routine` declared once:
+
+- Components are split up front into lists: time-driven, plan-driven (a
+  `sipefield.schedule.TrialPlan` visibility bit) and keyboards to poll.
+- Component state lives in ``__slots__`` objects. It is copied onto the
+  PsychoPy objects (``status``, ``tStart``, ``frameNStart`` ...) only when a
+  component starts or stops.
+- Each frame makes one timing query, ``win.getFutureFlipTime()``. Routine
+  time is that flip time minus the routine timer's offset, which is only
+  worked out again at routine start and after a pause. Given an absolute
+  ``start``, routine time is counted from that time on the global clock.
+- A count of running components replaces the scan for unfinished ones.
+
+The data file gets the same columns as from the generated code:
+``<routine>.started``/``.stopped``, ``<component>.started``/``.stopped``
+stamped on the flip, and ``<keyboard>.keys``/``.rt``/``.duration``. One
+difference: ``tStart``/``tStop`` on a component are the routine time of the
+flip it starts on (``tThisFlip``), not the time the loop got there.
+"""
+# same values as psychopy.constants
+NOT_STARTED = 0
+STARTED = 1
+PAUSED = 2
+FINISHED = -1
+
+FRAME_TOLERANCE = 0.001  # how close to onset before 'same' frame, as in Builder scripts
+
+
+class VisualComponent:
+    """
+    A stimulus drawn with autoDraw between its start and stop.
+
+    Parameters
+    ==========
+    stim : psychopy.visual stimulus
+        The component's stimulus; its ``name`` names the data columns.
+    start : float
+        Routine time to start at (s).
+    stop : float or None
+        Routine time to stop at (s), None to run to the end of the routine.
+    bit : int
+        Non-zero to have the routine's plan start and stop the stimulus
+        instead: it is shown on frames whose plan row has this bit set.
+    draw : bool
+        False to keep the timing and data columns without drawing the
+        stimulus, e.g. when the window's clear colour already shows it.
+    """
+
+    __slots__ = ('stim', 'name', 'start', 'stop', 'bit', 'draw', 'status', 'started_key', 'stopped_key')
+
+    def __init__(self, stim, start=0.0, stop=None, bit=0, draw=True):
+        self.stim = stim
+        self.name = stim.name
+        self.start = start
+        self.stop = stop
+        self.bit = bit
+        self.draw = draw
+        self.status = NOT_STARTED
+        self.started_key = f'{self.name}.started'
+        self.stopped_key = f'{self.name}.stopped'
+
+    def reset(self):
+        stim = self.stim
+        stim.tStart = stim.tStop = stim.tStartRefresh = stim.tStopRefresh = None
+        stim.frameNStart = stim.frameNStop = None
+        stim.status = self.status = NOT_STARTED
+
+    def begin(self, win, thisExp, frameN, t, flip_time):
+        stim = self.stim
+        # keep track of start time/frame for later
+        stim.frameNStart = frameN
+        stim.tStart = t
+        stim.tStartRefresh = flip_time
+        win.timeOnFlip(stim, 'tStartRefresh')
+        thisExp.timestampOnFlip(win, self.started_key)
+        stim.status = self.status = STARTED
+        if self.draw:
+            stim.setAutoDraw(True)
+
+    def end(self, win, thisExp, frameN, t, flip_time):
+        stim = self.stim
+        stim.tStop = t
+        stim.tStopRefresh = flip_time
+        stim.frameNStop = frameN
+        thisExp.timestampOnFlip(win, self.stopped_key)
+        stim.status = self.status = FINISHED
+        stim.setAutoDraw(False)
+
+    def finish(self, thisExp):
+        self.stim.setAutoDraw(False)
+
+
+class KeyboardComponent:
+    """
+    A ``psychopy.hardware.keyboard.Keyboard`` polled while the routine runs.
+
+    Stores the last key pressed, as Builder's 'last key' setting does.
+
+    Parameters
+    ==========
+    device : psychopy.hardware.keyboard.Keyboard
+        The keyboard.
+    name : str
+        Component name, for the data columns.
+    key_list : sequence of str or None
+        Keys to accept, None for any.
+    force_end : bool
+        End the routine on the first accepted key.
+    start, stop : float, float or None
+        As for `VisualComponent`.
+    """
+
+    __slots__ = ('device', 'name', 'start', 'stop', 'bit', 'status', 'key_list', 'force_end',
+                 'started_key', 'stopped_key')
+
+    def __init__(self, device, name, key_list=None, force_end=True, start=0.0, stop=None):
+        self.device = device
+        self.name = name
+        self.start = start
+        self.stop = stop
+        self.bit = 0
+        self.status = NOT_STARTED
+        self.key_list = list(key_list) if key_list is not None else None
+        self.force_end = force_end
+        self.started_key = f'{self.name}.started'
+        self.stopped_key = f'{self.name}.stopped'
+
+    def reset(self):
+        device = self.device
+        device.tStart = device.tStop = device.tStartRefresh = device.tStopRefresh = None
+        device.keys = []
+        device.rt = []
+        device.status = self.status = NOT_STARTED
+
+    def begin(self, win, thisExp, frameN, t, flip_time):
+        device = self.device
+        device.frameNStart = frameN
+        device.tStart = t
+        device.tStartRefresh = flip_time
+        win.timeOnFlip(device, 'tStartRefresh')
+        thisExp.timestampOnFlip(win, self.started_key)
+        device.status = self.status = STARTED
+        # keyboard checking starts on the next frame, after the clock reset on this flip
+        win.callOnFlip(device.clock.reset)
+        win.callOnFlip(device.clearEvents, eventType='keyboard')
+
+    def end(self, win, thisExp, frameN, t, flip_time):
+        device = self.device
+        device.tStop = t
+        device.tStopRefresh = flip_time
+        device.frameNStop = frameN
+        thisExp.timestampOnFlip(win, self.stopped_key)
+        device.status = self.status = FINISHED
+
+    def poll(self):
+        """Check for keys; returns True if the routine should end."""
+        keys = self.device.getKeys(keyList=self.key_list, ignoreKeys=['escape'], waitRelease=False)
+        if not keys:
+            return False
+        last = keys[-1]
+        device = self.device
+        device.keys = last.name
+        device.rt = last.rt
+        device.duration = last.duration
+        return self.force_end
+
+    def finish(self, thisExp):
+        device = self.device
+        if device.keys in ['', [], None]:  # no response was made
+            device.keys = None
+        thisExp.addData(f'{self.name}.keys', device.keys)
+        if device.keys is not None:
+            thisExp.addData(f'{self.name}.rt', device.rt)
+            thisExp.addData(f'{self.name}.duration', device.duration)
+
+
+class Routine:
+    """
+    A routine declared once and run any number of times by a `RoutineEngine`.
+
+    Parameters
+    ==========
+    name : str
+        Routine name, for the ``<name>.started``/``.stopped`` columns.
+    components : sequence
+        `VisualComponent` and `KeyboardComponent` objects. A routine with
+        none ends straight away, without a flip, as in Builder.
+    plan : sipefield.schedule.TrialPlan or None
+        Per-frame plan starting and stopping the components that have a
+        ``bit``. The routine ends when the plan does.
+    duration : float or None
+        Fixed length (s), for non-slip timing. Defaults to the plan's duration.
+    each_frame : sequence of (str, callable)
+        'Each Frame' code, run after the components are updated. Each entry is
+        a profiler section name and a function called as
+        ``func(t, frameN, index)``. ``index`` is the plan row, or None without
+        a plan or before its first row is due. A function that returns True
+        ends the routine.
+    on_flip : callable or None
+        Called with the return value of ``win.flip()`` and ``frameN`` after
+        every flip, e.g. `sipefield.frametiming.FrameTimer.record`.
+    """
+
+    __slots__ = ('name', 'components', 'timed', 'planned', 'polled', 'plan', 'duration',
+                 'each_frame', 'on_flip', 'tStart', 'tStop', 'tStartRefresh', 'tStopRefresh',
+                 'forceEnded', 'started_key', 'stopped_key')
+
+    def __init__(self, name, components=(), plan=None, duration=None, each_frame=(), on_flip=None):
+        self.name = name
+        self.components = tuple(components)
+        self.polled = tuple(c for c in self.components if isinstance(c, KeyboardComponent))
+        self.planned = tuple(c for c in self.components if c.bit)
+        self.timed = tuple(c for c in self.components if not c.bit and c not in self.polled)
+        self.plan = plan
+        self.duration = duration if duration is not None or plan is None else plan.duration
+        self.each_frame = tuple(each_frame)
+        self.on_flip = on_flip
+        self.tStart = self.tStop = self.tStartRefresh = self.tStopRefresh = None
+        self.forceEnded = False
+        self.started_key = f'{name}.started'
+        self.stopped_key = f'{name}.stopped'
+
+
+class RoutineEngine:
+    """
+    Runs `Routine` objects the way Builder's generated loops do.
+
+    Parameters
+    ==========
+    win : psychopy.visual.Window
+        Window to flip.
+    thisExp : psychopy.data.ExperimentHandler
+        Handler receiving the data columns.
+    globalClock : psychopy.core.Clock
+        The experiment's global clock.
+    routineTimer : psychopy.core.Clock
+        Non-slip routine timer, advanced or reset at the end of each routine.
+    keyboard : psychopy.hardware.keyboard.Keyboard
+        Default keyboard, checked for escape every frame unless ``escape`` is given.
+    default_clock : psychopy.core.Clock
+        The clock ``win.getFutureFlipTime`` reports on, ``logging.defaultClock``.
+    pause : callable or None
+        Called while ``thisExp.status`` is PAUSED, e.g. the script's ``pauseExperiment``.
+    profiler : sipefield.profiling.FrameProfiler or None
+        Given each frame's sections when set.
+    escape : callable or None
+        Called once per frame instead of asking ``keyboard``; returns True
+        once escape has been pressed, e.g. a `sipefield.escape.EscapeWatcher`.
+    """
+
+    def __init__(self, win, thisExp, globalClock, routineTimer, keyboard, default_clock,
+                 pause=None, profiler=None, tolerance=FRAME_TOLERANCE, escape=None):
+        self.win = win
+        self.thisExp = thisExp
+        self.globalClock = globalClock
+        self.routineTimer = routineTimer
+        self.keyboard = keyboard
+        self.default_clock = default_clock
+        self.pause = pause
+        self.profiler = profiler
+        self.tolerance = tolerance
+        self.paused = 0.0  # s spent in pause() so far
+        self.escape = escape if escape is not None else self._escape_pressed
+
+    def _escape_pressed(self):
+        return bool(self.keyboard.getKeys(keyList=['escape']))
+
+    def _offset(self, start=None):
+        """Routine time minus default clock time."""
+        if start is None:
+            return self.default_clock.getLastResetTime() - self.routineTimer.getLastResetTime()
+        # routine time counted from ``start`` on the global clock
+        return self.default_clock.getLastResetTime() - self.globalClock.getLastResetTime() - start
+
+    def run(self, routine, start=None):
+        """
+        Run ``routine`` from its first frame to its end.
+
+        Parameters
+        ==========
+        routine : Routine
+            The routine to run.
+        start : float or None
+            Absolute start of the routine on the global clock, e.g. from a
+            `sipefield.timeline.TrialTimeline`. The plan's rows are then
+            timed from it, frames before it show nothing new, and the routine
+            timer isn't advanced. None times the routine from the routine
+            timer (non-slip, as Builder does).
+
+        Returns
+        ==========
+        bool
+            False if the experiment was stopped (escape) during the routine;
+            the caller then ends the experiment.
+        """
+        win = self.win
+        thisExp = self.thisExp
+        escape = self.escape
+        profiler = self.profiler
+        tolerance = self.tolerance
+        for component in routine.components:
+            component.reset()
+        routine.tStartRefresh = win.getFutureFlipTime(clock=self.globalClock)
+        routine.tStart = self.globalClock.getTime(format='float')
+        routine.forceEnded = False
+        thisExp.addData(routine.started_key, routine.tStart)
+
+        timed = routine.timed
+        planned = routine.planned
+        polled = routine.polled
+        each_frame = routine.each_frame
+        on_flip = routine.on_flip
+        plan = routine.plan
+        if plan is not None:
+            # TrialPlan.index inlined: the row of the flip at t, n_frames once the plan is over
+            plan_rate = plan.frame_rate
+            plan_visible = plan.visible
+            plan_frames = plan.n_frames
+        duration = routine.duration
+        active = len(routine.components)  # components not yet finished
+        shown = 0  # plan bits currently on screen
+        index = None
+        offset = self._offset(start)
+        frameN = -1
+        flip_time = None
+        forced = False
+        while True:
+            if profiler is not None:
+                profiler.frame(routine.name)
+            # the one timing query: when the coming flip will happen, on the default clock
+            flip_time = win.getFutureFlipTime()
+            t = flip_time + offset
+            frameN += 1
+            if profiler is not None:
+                profiler.section('stimulus')
+            if plan is not None:
+                index = int(t * plan_rate + 0.5)
+                if index >= plan_frames:
+                    index = plan_frames
+                    visible = 0
+                elif t * plan_rate < -0.5:
+                    index = None  # first row not due yet (absolute start)
+                    visible = 0
+                else:
+                    visible = plan_visible[index]
+                if visible != shown:
+                    for component in planned:
+                        if visible & component.bit:
+                            if component.status == NOT_STARTED:
+                                component.begin(win, thisExp, frameN, t, flip_time)
+                        elif component.status == STARTED:
+                            component.end(win, thisExp, frameN, t, flip_time)
+                            active -= 1
+                    shown = visible
+                if index == plan_frames:
+                    break  # plan over; don't flip or the next routine starts on a blank frame
+            elif duration is not None and t >= duration - tolerance:
+                break
+            for component in timed:
+                if component.status == NOT_STARTED:
+                    if t >= component.start - tolerance:
+                        component.begin(win, thisExp, frameN, t, flip_time)
+                elif component.status == STARTED and component.stop is not None \
+                        and t >= component.stop - tolerance:
+                    component.end(win, thisExp, frameN, t, flip_time)
+                    active -= 1
+            for section, func in each_frame:
+                if profiler is not None:
+                    profiler.section(section)
+                if func(t, frameN, index):
+                    forced = True
+            if profiler is not None:
+                profiler.section('keyboard')
+            for component in polled:
+                if component.status == NOT_STARTED:
+                    if t >= component.start - tolerance:
+                        component.begin(win, thisExp, frameN, t, flip_time)
+                elif component.status == STARTED:
+                    if component.stop is not None and t >= component.stop - tolerance:
+                        component.end(win, thisExp, frameN, t, flip_time)
+                        active -= 1
+                    elif component.poll():
+                        forced = True
+            # check for quit (typically the Esc key)
+            if escape():
+                thisExp.status = FINISHED
+            if profiler is not None:
+                profiler.section('other')
+            if thisExp.status == FINISHED:
+                if profiler is not None:
+                    profiler.stop()
+                return False
+            if thisExp.status == PAUSED:
+                paused = self.default_clock.getTime()
+                self.pause()
+                paused = self.default_clock.getTime() - paused
+                self.paused += paused
+                if start is not None:
+                    start += paused  # the rest of the routine moves back by the pause
+                offset = self._offset(start)
+                continue  # skip the frame we paused on
+            if forced or active <= 0:
+                break
+            if profiler is not None:
+                profiler.section('flip')
+            if on_flip is None:
+                win.flip()
+            else:
+                on_flip(win.flip(), frameN)
+        if profiler is not None:
+            profiler.stop()
+
+        for component in routine.components:
+            component.finish(thisExp)
+        routine.forceEnded = forced
+        routine.tStop = self.globalClock.getTime(format='float')
+        routine.tStopRefresh = flip_time
+        thisExp.addData(routine.stopped_key, routine.tStop)
+        # non-slip timing: subtract the routine's length unless it ended early, has none
+        #   or is timed from an absolute start
+        if duration is not None and not forced and start is None:
+            self.routineTimer.addTime(-duration)
+        else:
+            self.routineTimer.reset()
+        return True
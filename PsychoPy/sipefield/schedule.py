@@ -0,0 +1,120 @@
+"""Per-frame stimulus plans compiled from epoch durations and the refresh rate.
+
+A trial is a sequence of epochs, each lasting some seconds and showing some
+set of stimuli. `GratingSchedule` turns that into one structured array per
+grating orientation, with one row per frame: which stimuli are visible, the
+grating's orientation and its phase. The arrays are built once per session,
+using the measured ``expInfo['frameRate']``, so a trial keeps its length on
+any monitor.
+
+The frame loop looks its row up from the flip time, see `TrialPlan.index`,
+rather than counting frames. After a dropped frame it still shows what
+belongs at that moment, and the trial still ends on time.
+
+The grating's phase is computed from the frame index alone. It starts at 0
+on the grating's onset flip and advances by ``temporal_frequency /
+frame_rate`` cycles per refresh, wrapped to [0, 1), so the drift is exactly
+periodic whatever the loop's timing.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+# visibility bits in the plan's 'visible' field
+STIM_GRAY = 1
+STIM_GRATING = 2
+
+PLAN_DTYPE = np.dtype([
+    ('visible', 'u1'),  # STIM_* bits of the stimuli drawn on this frame
+    ('ori', 'f4'),      # grating orientation (deg)
+    ('phase', 'f8'),    # grating phase (cycles, 0 at the grating's onset, wrapped to [0, 1))
+])
+
+
+@dataclass(frozen=True)
+class Epoch:
+    """Part of a trial: how long it lasts and which stimuli it shows."""
+
+    name: str
+    duration: float  # s
+    visible: int     # STIM_* bits
+
+
+class TrialPlan:
+    """
+    Frame-by-frame plan of one trial.
+
+    Attributes
+    ==========
+    frames : numpy.ndarray
+        `PLAN_DTYPE` row per frame.
+    frame_rate : float
+        Refresh rate the plan was compiled for (Hz).
+    n_frames : int
+        Number of frames in the trial.
+    duration : float
+        Trial length in seconds, ``n_frames / frame_rate``.
+    orientation : float
+        Grating orientation for the whole trial (deg).
+    epochs : dict
+        Epoch name to its (first frame, frame after the last).
+    visible, phases : list
+        The 'visible' and 'phase' columns as Python lists; indexing these is
+        cheaper per frame than reading fields from ``frames``.
+    """
+
+    def __init__(self, frames, frame_rate, orientation, epochs):
+        self.frames = frames
+        self.visible = frames['visible'].tolist()
+        self.phases = frames['phase'].tolist()
+        self.frame_rate = frame_rate
+        self.n_frames = len(frames)
+        self.duration = self.n_frames / frame_rate
+        self.orientation = orientation
+        self.epochs = epochs
+
+    def index(self, t):
+        """Row for the flip at ``t`` seconds into the trial; ``n_frames`` once it is over."""
+        return min(int(t * self.frame_rate + 0.5), self.n_frames)
+
+
+class GratingSchedule:
+    """
+    Trial plans for every grating orientation, compiled once per session.
+
+    Parameters
+    ==========
+    epochs : sequence of Epoch
+        The trial's epochs, in order.
+    frame_rate : float
+        Measured refresh rate (Hz).
+    orientations : sequence of float
+        Grating orientations; trial ``n`` uses ``orientations[n % len]``.
+    temporal_frequency : float
+        Grating drift in cycles per second; 0 for a static grating.
+    """
+
+    def __init__(self, epochs, frame_rate, orientations, temporal_frequency=1.0):
+        self.epochs = tuple(epochs)
+        self.frame_rate = float(frame_rate)
+        # epoch boundaries rounded from cumulative time, so rounding never adds up
+        ends = np.rint(np.cumsum([epoch.duration for epoch in self.epochs]) * self.frame_rate).astype(int)
+        starts = np.concatenate(([0], ends[:-1]))
+        base = np.zeros(ends[-1], dtype=PLAN_DTYPE)
+        for epoch, start, end in zip(self.epochs, starts, ends):
+            base['visible'][start:end] = epoch.visible
+        shown = np.nonzero(base['visible'] & STIM_GRATING)[0]
+        onset = shown[0] if len(shown) else 0
+        frames_since_onset = np.maximum(np.arange(len(base)) - onset, 0)
+        base['phase'] = np.mod(frames_since_onset * (temporal_frequency / self.frame_rate), 1.0)
+        epoch_frames = {epoch.name: (int(start), int(end))
+                        for epoch, start, end in zip(self.epochs, starts, ends)}
+        self.plans = []
+        for orientation in orientations:
+            frames = base.copy()
+            frames['ori'] = orientation
+            self.plans.append(TrialPlan(frames, self.frame_rate, orientation, epoch_frames))
+
+    def trial(self, n):
+        """Plan for trial ``n``."""
+        return self.plans[n % len(self.plans)]
@@ -0,0 +1,175 @@
+"""Missing and repeated encoder samples, found by sequence number.
+
+The firmware numbers every sample window, so a jump in ``seq`` between two
+received samples means windows were lost on the way (dropped bytes, a packet
+failing its CRC). A sample with the ``seq`` and device time of one passed on
+recently is a repeat. `SequenceChecker` removes repeats and fills each gap with interpolated
+samples, so the recording keeps one row per sample window. The filled rows are
+flagged. Their clicks are interpolated from the neighbouring windows, so the
+distance covered during a gap is an estimate.
+
+When the Arduino resets, ``seq`` starts again from 0, usually after a
+pause of a second or so while it boots. A sample that goes back after more
+than ``restart_gap`` seconds of silence is taken as a restart at once, and
+the count continues from it. Any other jump longer than ``max_fill`` windows
+forwards, or back to a ``seq`` that isn't a repeat, is held back until the
+next sample shows whether it was real. If the next sample follows on from it
+(and not from the samples before it), the jump is accepted: a long dropout,
+or a restart if the sequence went back. Otherwise the held sample is
+discarded as corrupt, e.g. line noise that happened to pass the CRC.
+
+Samples from the ASCII protocol are numbered on the host and never show gaps.
+"""
+import numpy as np
+
+
+class SequenceChecker:
+    """
+    Running check of sample sequence numbers across drained chunks.
+
+    Parameters
+    ==========
+    interpolate : bool
+        Insert interpolated samples for missing windows.
+    max_fill : int
+        Longest gap, in windows, that is filled; longer gaps (e.g. the encoder
+        was unplugged) are only reported. Also how many samples back a repeat
+        is looked for.
+    restart_gap : float
+        Seconds without samples after which a ``seq`` that goes back is taken
+        as a firmware restart without waiting for the next sample.
+    """
+
+    def __init__(self, interpolate=True, max_fill=200, restart_gap=0.25):
+        self.interpolate = interpolate
+        self.max_fill = max_fill
+        self.restart_gap = restart_gap
+        self.missing = 0     # windows never received
+        self.filled = 0      # windows filled by interpolation
+        self.duplicates = 0  # samples dropped as repeats
+        self.corrupt = 0     # samples dropped for an implausible jump
+        self.restarts = 0    # confirmed jumps back, e.g. the Arduino was reset
+        self.gaps = []       # (first missing seq, windows missing, host time it was noticed)
+        self._last = None    # last sample passed on, for the next chunk's first gap
+        self._held = None    # sample after an implausible jump, awaiting its successor
+        self._recent = None  # the last max_fill + 1 samples passed on since the last restart
+
+    def check(self, samples):
+        """
+        Drop repeats from a chunk of samples and fill its gaps.
+
+        Parameters
+        ==========
+        samples : numpy.ndarray
+            Structured array with ``seq``, ``host_time``, ``device_time`` and
+            ``delta`` fields, e.g. from `RingCursor.drain`.
+
+        Returns
+        ==========
+        (numpy.ndarray, numpy.ndarray)
+            The checked samples and a boolean array marking the filled ones.
+        """
+        if len(samples):
+            samples = self._screen(samples)
+        if not len(samples):
+            return samples, np.zeros(0, dtype=bool)
+        seq = samples['seq']
+
+        before = samples[:1] if self._last is None else self._last[np.newaxis]
+        # each sample paired with the one passed on just before it
+        neighbours = np.concatenate((before, samples[:-1]))
+        missing = np.maximum(seq - neighbours['seq'] - 1, 0)
+        self._last = samples[-1].copy()
+        gap_at = np.nonzero(missing > 0)[0]
+        if not len(gap_at):
+            return samples, np.zeros(len(samples), dtype=bool)
+
+        self.missing += int(missing[gap_at].sum())
+        self.gaps.extend(zip((neighbours['seq'][gap_at] + 1).tolist(), missing[gap_at].tolist(),
+                             samples['host_time'][gap_at].tolist()))
+        fill = np.where(missing <= self.max_fill, missing, 0) if self.interpolate else np.zeros_like(missing)
+        total = int(fill.sum())
+        if total == 0:
+            return samples, np.zeros(len(samples), dtype=bool)
+        self.filled += total
+
+        out = np.empty(len(samples) + total, dtype=samples.dtype)
+        filled = np.ones(len(out), dtype=bool)
+        real_at = np.arange(len(samples)) + np.cumsum(fill)
+        out[real_at] = samples
+        filled[real_at] = False
+        # k-th filled window of its gap, counted from 1
+        gap = np.repeat(np.arange(len(samples)), fill)
+        k = np.arange(total) - np.repeat(np.cumsum(fill) - fill, fill) + 1
+        fraction = k / (missing[gap] + 1)
+        start = neighbours[gap]
+        end = samples[gap]
+        fill_rows = out[filled]
+        fill_rows['seq'] = start['seq'] + k
+        for name in ('host_time', 'device_time'):
+            fill_rows[name] = start[name] + fraction * (end[name] - start[name])
+        fill_rows['delta'] = np.rint(start['delta'] + fraction * (end['delta'] - start['delta']))
+        out[filled] = fill_rows
+        return out, filled
+
+    def _screen(self, samples):
+        # drop repeats and unconfirmed jumps; vectorised unless something is off
+        seq = samples['seq']
+        step = np.diff(seq, prepend=seq[0] - 1 if self._last is None else self._last['seq'])
+        if self._held is None and ((step > 0) & (step <= self.max_fill + 1)).all():
+            self._remember(self._recent, samples)
+            return samples
+        keep = []
+        recent = self._recent  # None once the firmware restarted in this chunk
+        epoch = 0              # first sample kept after that restart
+        # seq -> device time of the samples a repeat could copy
+        seen = {} if recent is None else dict(zip(recent['seq'].tolist(), map(_stamp, recent['device_time'])))
+        last = None if self._last is None else int(self._last['seq'])
+        last_time = None if self._last is None else float(self._last['host_time'])
+        span = self.max_fill + 1
+        for record in samples:
+            s = int(record['seq'])
+            if self._held is not None:
+                held = int(self._held['seq'])
+                follows_last = last is not None and 0 < s - last <= span
+                if 0 < s - held <= span and not follows_last:
+                    # the jump was real
+                    if last is not None and held < last:
+                        self.restarts += 1
+                        recent, seen, epoch = None, {}, len(keep)
+                    keep.append(self._held)
+                    seen[held] = _stamp(self._held['device_time'])
+                    last, last_time = held, float(self._held['host_time'])
+                else:
+                    self.corrupt += 1
+                self._held = None
+            if last is None or 0 < s - last <= span:
+                keep.append(record)
+            elif s < last and float(record['host_time']) - last_time > self.restart_gap:
+                # silence, then the count starts again: the firmware restarted
+                self.restarts += 1
+                recent, seen, epoch = None, {}, len(keep)
+                keep.append(record)
+            elif s in seen and seen[s] == _stamp(record['device_time']):
+                self.duplicates += 1
+                continue
+            else:
+                self._held = record.copy()
+                continue
+            seen[s] = _stamp(record['device_time'])
+            last, last_time = s, float(record['host_time'])
+        kept = np.array(keep, dtype=samples.dtype)
+        self._remember(recent, kept[epoch:])
+        return kept
+
+    def _remember(self, recent, samples):
+        # keep the last max_fill + 1 samples passed on, for spotting repeats in later chunks
+        if recent is not None:
+            samples = np.concatenate((recent, samples))
+        self._recent = samples[-(self.max_fill + 1):].copy()
+
+
+def _stamp(device_time):
+    # device time to compare repeats by; None when the protocol sends none (NaN)
+    device_time = float(device_time)
+    return None if np.isnan(device_time) else device_time
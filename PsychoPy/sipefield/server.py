@@ -0,0 +1,200 @@
+"""Run many sessions in one warm experiment process, requested over a local connection.
+
+Launching the experiment script once per session pays every time for
+importing PsychoPy, opening the window, measuring the frame rate, starting
+ioHub and opening the encoder's serial port. ``python
+Gratings_vis_sipefield-v0.7.py --serve`` does all of that once. It then waits for
+session requests on a ``multiprocessing.connection`` listener (a localhost
+socket, or a named pipe on Windows) and runs them one after another.
+
+A request is a dict with the fields of the positional command line
+(`SESSION_FIELDS`). The reply says how the session ended and where its files
+are. From the parent process::
+
+    from sipefield.server import request_session
+    reply = request_session('P1', 'M12', '3', save_dir=None, n_trials=40)
+    reply['files']['data']  # data file stem; add .csv, _frames.csv ...
+
+or from a shell, with the script's positional arguments: ``python -m
+sipefield.server P1 M12 3 C:/data 40``.
+
+Sessions run on the server's main thread, where the window lives. A thread
+only accepts connections and reads requests. While the server is idle it
+calls ``idle`` (e.g. a window flip) every ``idle_interval`` seconds, so the
+window keeps handling events.
+"""
+import argparse
+import queue
+import sys
+import threading
+import time
+import traceback
+from multiprocessing.connection import Client, Listener
+
+DEFAULT_ADDRESS = ('localhost', 6010)
+DEFAULT_AUTHKEY = b'sipefield'
+
+# request fields, in the order of the script's positional arguments
+SESSION_FIELDS = ('protocol', 'subject', 'session', 'save_dir', 'n_trials')
+
+
+class SessionAborted(Exception):
+    """Raised by ``run_session`` when escape ended the session; ``files`` lists what was saved."""
+
+    def __init__(self, files):
+        super().__init__('session aborted')
+        self.files = files
+
+
+class ExperimentServer:
+    """
+    Accept session requests and run them one at a time on the calling thread.
+
+    Parameters
+    ==========
+    run_session : callable
+        Called with each request dict; returns a dict of output files, or
+        raises `SessionAborted` with them if the session was ended early.
+    address : tuple or str
+        Listener address, see ``multiprocessing.connection.Listener``.
+    authkey : bytes
+        Shared secret clients must present.
+    idle : callable or None
+        Called every ``idle_interval`` seconds while no session is running.
+    idle_interval : float
+        Seconds between ``idle`` calls.
+    """
+
+    def __init__(self, run_session, address=DEFAULT_ADDRESS, authkey=DEFAULT_AUTHKEY,
+                 idle=None, idle_interval=0.1):
+        self.run_session = run_session
+        self.address = address
+        self.authkey = authkey
+        self.idle = idle
+        self.idle_interval = idle_interval
+        self.sessions = 0
+        self._requests = queue.Queue()
+        self._listener = None
+
+    def serve_forever(self):
+        """Run sessions until a client sends ``{'command': 'shutdown'}``."""
+        self._listener = Listener(self.address, authkey=self.authkey)
+        threading.Thread(target=self._accept, name='ExperimentServerAccept', daemon=True).start()
+        try:
+            while True:
+                try:
+                    request, connection = self._requests.get(timeout=self.idle_interval)
+                except queue.Empty:
+                    if self.idle is not None:
+                        self.idle()
+                    continue
+                command = request.get('command', 'session')
+                if command == 'shutdown':
+                    self._reply(connection, {'status': 'shutdown', 'sessions': self.sessions})
+                    return
+                if command == 'ping':
+                    self._reply(connection, {'status': 'ready', 'sessions': self.sessions})
+                elif command == 'session':
+                    self._reply(connection, self._run(request))
+                else:
+                    self._reply(connection, {'status': 'error', 'error': f"unknown command {command!r}"})
+        finally:
+            self._listener.close()
+
+    def _run(self, request):
+        missing = [name for name in SESSION_FIELDS if request.get(name) is None and name != 'save_dir']
+        if missing:
+            return {'status': 'error', 'error': f"missing fields: {', '.join(missing)}"}
+        start = time.perf_counter()
+        try:
+            files = self.run_session(request)
+        except SessionAborted as aborted:
+            self.sessions += 1
+            return {'status': 'aborted', 'files': aborted.files, 'duration': time.perf_counter() - start}
+        except Exception as error:
+            return {'status': 'error', 'error': repr(error), 'traceback': traceback.format_exc(),
+                    'duration': time.perf_counter() - start}
+        self.sessions += 1
+        return {'status': 'completed', 'files': files, 'duration': time.perf_counter() - start}
+
+    def _accept(self):
+        while True:
+            try:
+                connection = self._listener.accept()
+            except OSError:
+                return  # listener closed
+            except Exception:
+                continue  # e.g. a client with the wrong authkey
+            threading.Thread(target=self._read, args=(connection,), daemon=True).start()
+
+    def _read(self, connection):
+        # one request per connection; the reply is sent by the main thread
+        try:
+            request = connection.recv()
+        except (EOFError, OSError):
+            connection.close()
+            return
+        self._requests.put((request, connection))
+
+    @staticmethod
+    def _reply(connection, reply):
+        try:
+            connection.send(reply)
+        except OSError:
+            pass  # client gave up waiting
+        finally:
+            connection.close()
+
+
+def send_request(request, address=DEFAULT_ADDRESS, authkey=DEFAULT_AUTHKEY):
+    """Send one request to a running server and wait for its reply."""
+    with Client(address, authkey=authkey) as connection:
+        connection.send(request)
+        return connection.recv()
+
+
+def request_session(protocol, subject, session, save_dir, n_trials,
+                    address=DEFAULT_ADDRESS, authkey=DEFAULT_AUTHKEY):
+    """
+    Run one session on the server and wait for it to finish.
+
+    Returns
+    ==========
+    dict
+        ``status`` ('completed', 'aborted' if escape ended it, or 'error'),
+        ``duration`` (s) and ``files`` (output paths), or ``error`` and ``traceback``.
+    """
+    return send_request({'command': 'session', 'protocol': protocol, 'subject': subject,
+                         'session': session, 'save_dir': save_dir, 'n_trials': n_trials},
+                        address, authkey)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Request a session from a running experiment server.')
+    parser.add_argument('fields', nargs='*', metavar='FIELD',
+                        help='protocol subject session save_dir n_trials, as for the script')
+    parser.add_argument('--host', default=DEFAULT_ADDRESS[0])
+    parser.add_argument('--port', type=int, default=DEFAULT_ADDRESS[1])
+    parser.add_argument('--ping', action='store_true', help='check the server is up')
+    parser.add_argument('--shutdown', action='store_true', help='stop the server')
+    args = parser.parse_args(argv)
+
+    address = (args.host, args.port)
+    if args.ping or args.shutdown:
+        reply = send_request({'command': 'shutdown' if args.shutdown else 'ping'}, address)
+    elif len(args.fields) == len(SESSION_FIELDS):
+        protocol, subject, session, save_dir, n_trials = args.fields
+        reply = request_session(protocol, subject, session, save_dir, int(n_trials), address)
+    else:
+        parser.error('give protocol, subject, session, save_dir and n_trials, or --ping/--shutdown')
+    for key, value in reply.items():
+        if isinstance(value, dict):
+            for name, path in value.items():
+                print(f"{key}.{name}: {path}")
+        else:
+            print(f"{key}: {value}")
+    return 0 if reply.get('status') != 'error' else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
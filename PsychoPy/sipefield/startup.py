@@ -0,0 +1,177 @@
+"""Where the experiment script's startup goes: every import, every setup phase, the first frame.
+
+With ``--profile-startup`` the script creates a `StartupProfiler` before its
+first import. `StartupProfiler.start` wraps ``builtins.__import__`` and times
+every import statement on the main thread that loads a module not yet in
+``sys.modules``. Statements that only bind names of loaded modules are not
+recorded. An import run inside another is recorded with its depth, so each
+has a cumulative time and a self time (cumulative minus nested imports), as
+with ``python -X importtime``. The script also times its setup phases
+(`StartupProfiler.phase`). It stops the profiler on the first flip of the
+experiment, which marks the time to the first frame.
+
+Times are from the profiler's creation, so the interpreter's own startup
+before the script runs is not included.
+"""
+import builtins
+import contextlib
+import importlib.util
+import sys
+import threading
+import time
+
+# Kinds of record
+IMPORT = 'import'
+PHASE = 'phase'
+MARK = 'mark'
+
+STARTUP_COLUMNS = ('kind', 'name', 'depth', 'start', 'duration', 'self', 'modules')
+
+
+class StartupProfiler:
+    """
+    Imports, phases and marks from the start of the script.
+
+    Parameters
+    ==========
+    enabled : bool
+        If False, every method does nothing, so the script can call them unconditionally.
+    clock : callable
+        Returns the time in seconds.
+    """
+
+    def __init__(self, enabled=True, clock=time.perf_counter):
+        self.enabled = enabled
+        self.clock = clock
+        self.t0 = clock()
+        self.records = []  # dicts with STARTUP_COLUMNS; start is relative to t0 (s)
+        self.stopped = False
+        self.saved = False
+        self._import = None
+        self._thread = threading.get_ident()
+        self._depth = 0
+        self._nested = [0.0]  # time in nested imports, per open import
+
+    def start(self):
+        """Start timing imports."""
+        if not self.enabled or self._import is not None:
+            return
+        self._import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def stop(self, mark=None):
+        """Stop timing imports, first recording ``mark`` if given; use as ``win.callOnFlip(startup.stop, 'first_frame')``."""
+        if not self.enabled or self.stopped:
+            return
+        if mark is not None:
+            self.mark(mark)
+        if builtins.__import__ == self._timed_import:
+            builtins.__import__ = self._import
+        self.stopped = True
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if threading.get_ident() != self._thread or self.stopped:
+            return self._import(name, globals, locals, fromlist, level)
+        n_modules = len(sys.modules)
+        self._depth += 1
+        self._nested.append(0.0)
+        start = self.clock()
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            duration = self.clock() - start
+            nested = self._nested.pop()
+            self._depth -= 1
+            self._nested[-1] += duration
+            modules = len(sys.modules) - n_modules
+            if modules > 0:
+                self.records.append({
+                    'kind': IMPORT, 'name': _statement(name, globals, fromlist, level), 'depth': self._depth,
+                    'start': start - self.t0, 'duration': duration, 'self': duration - nested,
+                    'modules': modules,
+                })
+
+    def phase(self, name):
+        """Context manager timing one setup phase, e.g. ``with startup.phase('setupWindow'):``."""
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._phase(name)
+
+    @contextlib.contextmanager
+    def _phase(self, name):
+        n_modules = len(sys.modules)
+        start = self.clock()
+        try:
+            yield
+        finally:
+            duration = self.clock() - start
+            self.records.append({
+                'kind': PHASE, 'name': name, 'depth': 0, 'start': start - self.t0,
+                'duration': duration, 'self': duration, 'modules': len(sys.modules) - n_modules,
+            })
+
+    def mark(self, name):
+        """Record that ``name`` happened now."""
+        if not self.enabled:
+            return
+        self.records.append({
+            'kind': MARK, 'name': name, 'depth': 0, 'start': self.clock() - self.t0,
+            'duration': 0.0, 'self': 0.0, 'modules': 0,
+        })
+
+    def report(self, top=15):
+        """
+        The profile as text for the console.
+
+        Parameters
+        ==========
+        top : int
+            How many of the slowest import statements to list.
+
+        Returns
+        ==========
+        str
+            Marks, import totals, phases, the slowest statements of the script
+            itself (cumulative) and the slowest imports anywhere (self time).
+        """
+        imports = [r for r in self.records if r['kind'] == IMPORT]
+        script = [r for r in imports if r['depth'] == 0]
+        lines = ['startup profile (s from the first import):']
+        for r in self.records:
+            if r['kind'] == MARK:
+                lines.append(f"  {r['name']:<24s} at {r['start']:8.3f} s")
+        lines.append(f"  imports: {sum(r['duration'] for r in script):.3f} s, "
+                     f"{len(script)} statements in the script, {sum(r['modules'] for r in script)} modules")
+        for r in self.records:
+            if r['kind'] == PHASE:
+                lines.append(f"  {r['name']:<24s} {r['duration']:8.3f} s  ({r['modules']} modules imported)")
+        lines.append('  slowest import statements in the script (cumulative):')
+        for r in sorted(script, key=lambda r: -r['duration'])[:top]:
+            lines.append(f"    {r['duration']:7.3f} s  {r['name']}")
+        lines.append('  slowest imports anywhere (self time):')
+        for r in sorted(imports, key=lambda r: -r['self'])[:top]:
+            lines.append(f"    {r['self']:7.3f} s  {r['name']}  (depth {r['depth']}, {r['modules']} modules)")
+        return '\n'.join(lines)
+
+    def to_dataframe(self):
+        import pandas as pd
+
+        return pd.DataFrame(self.records, columns=list(STARTUP_COLUMNS))
+
+    def save(self, prefix):
+        """Write ``<prefix>_startup.csv``, one row per record."""
+        self.to_dataframe().to_csv(prefix + '_startup.csv', index=False)
+        self.saved = True
+
+
+def _statement(name, globals, fromlist, level):
+    module = '.' * level + name
+    if level and globals:
+        # relative import: name the module, not '.'
+        try:
+            module = importlib.util.resolve_name(module, globals.get('__package__') or globals.get('__name__'))
+        except (ImportError, ValueError):
+            pass
+    if fromlist:
+        return f"from {module} import {', '.join(fromlist)}"
+    return f"import {module}"
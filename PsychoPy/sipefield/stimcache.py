@@ -0,0 +1,46 @@
+"""Ready-made stimuli, one per parameter value, built and drawn before the first trial.
+
+A stimulus' first draw uploads its textures and sets up its shader, which can
+make the first frame that shows it a long one. `StimulusCache` builds one
+stimulus per value up front, and `StimulusCache.warm_up` draws each one into
+the back buffer and clears it without flipping, so that work is done during
+setup and nothing reaches the screen.
+
+Picking a prebuilt stimulus instead of changing a parameter saves little by
+itself. Setting a grating's ``ori`` only recomputes its rotation and flags
+its four vertices and texture coordinates for recalculation on the next draw,
+and a drifting grating's per-frame ``phase`` sets the same flag anyway.
+"""
+
+
+class StimulusCache:
+    """
+    One stimulus per parameter value, e.g. a grating for each orientation.
+
+    Parameters
+    ==========
+    factory : callable
+        Called with each value; returns a ready-to-draw stimulus.
+    values : iterable
+        The values to build stimuli for.
+    """
+
+    def __init__(self, factory, values):
+        self.stimuli = {value: factory(value) for value in values}
+
+    def __getitem__(self, value):
+        return self.stimuli[value]
+
+    def __len__(self):
+        return len(self.stimuli)
+
+    def warm_up(self, win):
+        """Draw every cached stimulus offscreen once, then clear the back buffer."""
+        for stim in self.stimuli.values():
+            stim.draw()
+        try:
+            from pyglet import gl
+            gl.glFinish()  # wait until the driver has really done the uploads
+        except ImportError:
+            pass
+        win.clearBuffer()
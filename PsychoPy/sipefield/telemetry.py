@@ -0,0 +1,191 @@
+"""Status messages from the frame loop, formatted and written off the render thread.
+
+Printing from the frame loop is a blocking write, and on a Windows console it
+can take milliseconds. Instead, the loop calls `Telemetry.push` with a few
+numbers. That stores one fixed-size record in a `SampleRing`: no string is
+built and no I/O happens. A `TelemetryConsumer` thread drains the ring every
+``interval`` seconds, formats the records and passes them to its sinks:
+
+- `ConsoleSink` prints only the newest record of each kind per pass, so a
+  slow console never falls behind.
+- `FileSink` appends every record to a text log.
+- `SocketSink` sends every record as a UDP datagram to a local port, e.g. for
+  ``python -m sipefield.telemetry 9999`` running in another terminal.
+
+The ring has a single writer, so push from one thread only. If the consumer
+falls more than ``capacity`` records behind, the oldest are dropped and
+counted in `TelemetryConsumer.lost`.
+"""
+import atexit
+import socket
+import sys
+import threading
+
+import numpy as np
+
+from sipefield.ring import SampleRing
+
+# record kinds
+TELEMETRY_WHEEL = 1  # a: speed (m/s), b: total distance (m), index: direction
+TELEMETRY_TRIAL = 2  # a: grating angle (deg), b: trial number, index: angle index
+
+TELEMETRY_DTYPE = np.dtype([
+    ('time', 'f8'),   # host time of the event (s)
+    ('kind', 'u1'),   # TELEMETRY_* kind, selects the format below
+    ('index', 'i4'),
+    ('a', 'f8'),
+    ('b', 'f8'),
+])
+
+FORMATS = {
+    TELEMETRY_WHEEL: "Time: {time:.2f}s, Speed: {a:.2f} m/s, Total Distance: {b:.2f} m, Direction: {index}",
+    TELEMETRY_TRIAL: "Trial {b:.0f}: displaying angle {a:g} with index {index}",
+}
+
+
+def format_record(record):
+    """One record as a line of text, without the newline."""
+    time, kind, index, a, b = record.tolist()
+    template = FORMATS.get(kind)
+    if template is None:
+        return f"{time:.3f} kind {kind}: {index} {a:g} {b:g}"
+    return template.format(time=time, index=index, a=a, b=b)
+
+
+class Telemetry:
+    """
+    Producer side: a ring of `TELEMETRY_DTYPE` records.
+
+    Parameters
+    ==========
+    capacity : int
+        Records held until the consumer drains them; a power of two.
+    """
+
+    def __init__(self, capacity=4096):
+        self.ring = SampleRing(capacity, TELEMETRY_DTYPE)
+
+    def push(self, kind, time, index=0, a=0.0, b=0.0):
+        """Store one record; no formatting, no I/O."""
+        self.ring.push(time, kind, index, a, b)
+
+
+class ConsoleSink:
+    """Print the newest record of each kind, at most once per consumer pass."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def write(self, records):
+        kinds = records['kind']
+        # last occurrence of each kind, in the order they happened
+        last = len(kinds) - 1 - np.unique(kinds[::-1], return_index=True)[1]
+        lines = [format_record(records[i]) for i in np.sort(last)]
+        self.stream.write('\n'.join(lines) + '\n')
+        self.stream.flush()
+
+    def close(self):
+        pass
+
+
+class FileSink:
+    """Append every record to a text file, one line each."""
+
+    def __init__(self, path):
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def write(self, records):
+        self.file.write(''.join(format_record(record) + '\n' for record in records))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class SocketSink:
+    """Send every record as one UDP datagram of text to ``(host, port)``."""
+
+    def __init__(self, port, host='127.0.0.1'):
+        self.address = (host, port)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def write(self, records):
+        for record in records:
+            try:
+                self.socket.sendto(format_record(record).encode('utf-8'), self.address)
+            except OSError:
+                pass  # nobody listening; telemetry is best effort
+
+    def close(self):
+        self.socket.close()
+
+
+class TelemetryConsumer(threading.Thread):
+    """
+    Daemon thread draining a `Telemetry` ring into sinks.
+
+    Parameters
+    ==========
+    telemetry : Telemetry
+        Ring to drain.
+    sinks : sequence
+        Objects with ``write(records)`` and ``close()``, e.g. `ConsoleSink`.
+    interval : float
+        Seconds between passes; also the console's update rate.
+    """
+
+    def __init__(self, telemetry, sinks, interval=0.25):
+        super().__init__(name='TelemetryConsumer', daemon=True)
+        self.cursor = telemetry.ring.cursor()
+        self.sinks = list(sinks)
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    @property
+    def lost(self):
+        """Records overwritten before this thread drained them."""
+        return self.cursor.lost
+
+    def start(self):
+        atexit.register(self.stop)
+        super().start()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        """Pass every record pushed since the last pass to the sinks."""
+        records = self.cursor.drain()
+        if len(records):
+            for sink in self.sinks:
+                sink.write(records)
+
+    def stop(self, timeout=2.0):
+        """Stop the thread, hand the remaining records to the sinks and close them."""
+        if self._stop_event.is_set():
+            return
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+        self.flush()
+        for sink in self.sinks:
+            sink.close()
+        atexit.unregister(self.stop)
+
+
+def listen(port, host='127.0.0.1'):
+    """Print telemetry datagrams sent by a `SocketSink` until interrupted."""
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind((host, port))
+    try:
+        while True:
+            print(receiver.recv(4096).decode('utf-8'))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        receiver.close()
+
+
+if __name__ == '__main__':
+    listen(int(sys.argv[1]) if len(sys.argv) > 1 else 9999)
@@ -0,0 +1,117 @@
+"""Trial onsets fixed in advance on the session clock, and how close the flips came.
+
+With non-slip timing each trial is timed from where the routine timer was
+left by the one before. Anything that resets the timer (a skipped trial, a
+routine ended early) moves every later trial, and nothing records how far
+the trials have wandered from the session clock. A `TrialTimeline` instead
+fixes trial ``k``'s onset as::
+
+    anchor + (frames in trials 0..k-1) / frame_rate + time spent paused
+
+on the global clock. ``anchor`` is taken once, one frame after the next flip
+when the first trial starts. The routine engine runs each trial from that
+onset (`sipefield.routines.RoutineEngine.run` with ``start``) and shows on
+each flip the plan row nearest to it. An onset therefore lands on the flip
+nearest its deadline, however long the session. A late frame costs that
+trial a row, not every later trial.
+
+For every trial the timeline keeps each epoch's planned onset, the actual
+onset flip, and the difference.
+"""
+
+
+class TrialTimeline:
+    """
+    Absolute onset deadlines for consecutive trials.
+
+    Parameters
+    ==========
+    frame_rate : float
+        Refresh rate the plans were compiled for (Hz).
+    lead_frames : int
+        Frames between the first flip after `start_trial` is first called and
+        the anchor, so the first trial's first row is never already late.
+    """
+
+    def __init__(self, frame_rate, lead_frames=1):
+        self.frame_rate = float(frame_rate)
+        self.lead_frames = lead_frames
+        self.anchor = None
+        self.frames = 0  # frames planned before the current trial
+        self.records = []
+        self._trial = None
+
+    def start_trial(self, trial, plan, next_flip, paused=0.0):
+        """
+        Onset deadline of the next trial.
+
+        Parameters
+        ==========
+        trial : int
+            Trial number, for the records.
+        plan : sipefield.schedule.TrialPlan
+            The trial's plan.
+        next_flip : float
+            Time of the coming flip on the global clock; only the first call uses it.
+        paused : float
+            Total time the experiment has been paused (s), e.g. `RoutineEngine.paused`.
+
+        Returns
+        ==========
+        float
+            The trial's onset on the global clock; pass it to ``RoutineEngine.run``.
+        """
+        if self.anchor is None:
+            self.anchor = next_flip + self.lead_frames / self.frame_rate
+        onset = self.anchor + self.frames / self.frame_rate + paused
+        self.frames += plan.n_frames
+        self._trial = (trial, onset, plan)
+        return onset
+
+    def end_trial(self, actual):
+        """
+        Compare the trial's epoch onsets with the flips they happened on.
+
+        Parameters
+        ==========
+        actual : dict
+            Epoch name to the time of the flip it started on (global clock),
+            or None if it never showed.
+
+        Returns
+        ==========
+        dict
+            ``<epoch>_planned``, ``<epoch>_actual`` and ``<epoch>_error`` (s) for
+            each epoch in ``actual``, plus ``trial`` and ``onset``.
+        """
+        trial, onset, plan = self._trial
+        record = {'trial': trial, 'onset': onset}
+        for name, time in actual.items():
+            planned = onset + plan.epochs[name][0] / self.frame_rate
+            record[f'{name}_planned'] = planned
+            record[f'{name}_actual'] = time
+            record[f'{name}_error'] = None if time is None else time - planned
+        self.records.append(record)
+        return record
+
+    def max_error(self):
+        """Largest absolute onset error so far (s), over all epochs."""
+        errors = [abs(value) for record in self.records for key, value in record.items()
+                  if key.endswith('_error') and value is not None]
+        return max(errors, default=0.0)
+
+    def to_dataframe(self):
+        import pandas as pd
+
+        return pd.DataFrame(self.records)
+
+    def save(self, prefix):
+        """Write ``<prefix>_timeline.csv``, one row per trial."""
+        self.to_dataframe().to_csv(prefix + '_timeline.csv', index=False)
+
+
+def flip_on_clock(flip_time, default_clock, clock):
+    """``flip_time`` on ``default_clock`` (as ``win.flip()`` reports it) converted to ``clock``."""
+    if flip_time is None:
+        return None
+    return flip_time + default_clock.getLastResetTime() - clock.getLastResetTime()
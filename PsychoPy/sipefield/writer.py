@@ -0,0 +1,133 @@
+"""Crash-safe append log for wheel data, written while the session runs.
+
+A `StreamingWriter` thread wakes every ``interval`` seconds, copies the rows
+added to a `ColumnarRecorder` since its last pass and appends them to a binary
+log with ``flush`` + ``fsync``. It pulls from the recorder, so the frame loop
+never waits on it and there is no queue that could grow; a pass writes at most
+``max_rows`` rows at a time.
+
+The log is a one-line text header followed by fixed-size records. After a crash
+or power cut only the last partial record can be damaged, and `read_log` drops
+it. To rebuild a CSV from a log::
+
+    python -m sipefield.writer path/to/sub-XX_ses-YY_..._wheel.bin
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+MAGIC = b'SIPEFIELD-LOG'
+LOG_VERSION = 1
+
+
+def _header(dtype):
+    descr = json.dumps(np.lib.format.dtype_to_descr(dtype))
+    return b'%s %d %s\n' % (MAGIC, LOG_VERSION, descr.encode('ascii'))
+
+
+def read_log(path):
+    """
+    Load every complete record from a wheel log.
+
+    Returns
+    ==========
+    numpy.ndarray
+        Structured array with the columns of the recorder that wrote the log.
+    """
+    with open(path, 'rb') as f:
+        header = f.readline()
+        payload = f.read()
+    magic, version, descr = header.rstrip(b'\n').split(b' ', 2)
+    if magic != MAGIC or int(version) != LOG_VERSION:
+        raise ValueError(f"{path} is not a version {LOG_VERSION} wheel log")
+    descr = json.loads(descr)
+    dtype = np.lib.format.descr_to_dtype([tuple(field) for field in descr])
+    whole = len(payload) - len(payload) % dtype.itemsize
+    return np.frombuffer(payload[:whole], dtype=dtype)
+
+
+def log_to_csv(path, csv_path=None):
+    """Write the records of a wheel log to a CSV next to it; returns the CSV path."""
+    import pandas as pd
+    if csv_path is None:
+        csv_path = os.path.splitext(path)[0] + 'df.csv'
+    records = read_log(path)
+    pd.DataFrame({name: records[name] for name in records.dtype.names}).to_csv(csv_path, index=False)
+    return csv_path
+
+
+class StreamingWriter(threading.Thread):
+    """
+    Daemon thread appending new recorder rows to a log file.
+
+    Parameters
+    ==========
+    recorder : sipefield.recorder.ColumnarRecorder
+        Source of rows; only read, never modified.
+    path : str
+        Log file to create (an existing log is appended to).
+    interval : float
+        Seconds between passes; at most this much data is lost on a crash.
+    max_rows : int
+        Largest number of rows copied in one write.
+    """
+
+    def __init__(self, recorder, path, interval=0.5, max_rows=16384):
+        super().__init__(name='StreamingWriter', daemon=True)
+        self.recorder = recorder
+        self.path = path
+        self.interval = interval
+        self.max_rows = max_rows
+        self.rows_written = 0
+        self._stop_event = threading.Event()
+        self._file = None
+
+    def start(self):
+        dtype = self.recorder.rows(0, 0).dtype
+        new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, 'ab')
+        if new:
+            self._file.write(_header(dtype))
+            self._sync()
+        # flush what is left if the interpreter exits without calling stop()
+        atexit.register(self.stop)
+        super().start()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        """Append every row the recorder has gained since the last pass."""
+        available = len(self.recorder)
+        if available == self.rows_written:
+            return
+        while self.rows_written < available:
+            stop = min(available, self.rows_written + self.max_rows)
+            self._file.write(self.recorder.rows(self.rows_written, stop).tobytes())
+            self.rows_written = stop
+        self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def stop(self, timeout=2.0):
+        """Stop the thread, write the remaining rows and close the log."""
+        if self._file is None or self._file.closed:
+            return
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+        self.flush()
+        self._file.close()
+        atexit.unregister(self.stop)
+
+
+if __name__ == '__main__':
+    for log_path in sys.argv[1:]:
+        print(log_to_csv(log_path))
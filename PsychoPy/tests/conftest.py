@@ -0,0 +1,5 @@
+import os
+import sys
+
+# sipefield, from the repository checkout
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
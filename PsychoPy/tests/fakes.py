@@ -0,0 +1,105 @@
+"""Stand-ins for PsychoPy's window, clocks, stimuli, keyboard and ExperimentHandler.
+
+Time is simulated: it moves on by one refresh per flip, so a frame loop can
+run as fast as Python allows and still see the frames it would on a real
+window. Every clock read also reads ``time.perf_counter``, to cost what a
+real one does. Used by the tests and the benchmarks.
+"""
+import time
+
+from sipefield.routines import NOT_STARTED, STARTED
+
+FRAME_RATE = 60.0
+ANGLES = [0, 45, 90, 135, 180, 225, 270, 315]
+
+
+class SimTime:
+    """Simulated time, advanced by the window's flips."""
+
+    def __init__(self):
+        self.now = 0.0
+
+
+class SimClock:
+    """Clock on simulated time; each read also reads the hardware timer, as a real one does."""
+
+    def __init__(self, sim):
+        self.sim = sim
+        self._timeAtLastReset = sim.now
+
+    def getTime(self, format=None):
+        time.perf_counter()
+        return self.sim.now - self._timeAtLastReset
+
+    def getLastResetTime(self):
+        return self._timeAtLastReset
+
+    def reset(self):
+        self._timeAtLastReset = self.sim.now
+
+    def addTime(self, t):
+        self._timeAtLastReset -= t
+
+
+class SimWindow:
+    def __init__(self, sim, default_clock):
+        self.sim = sim
+        self.default_clock = default_clock
+        self.period = 1.0 / FRAME_RATE
+        self.last_flip = sim.now
+        self._to_call = []
+        self.flips = 0
+
+    def getFutureFlipTime(self, targetTime=0, clock=None):
+        base = self.default_clock
+        base.getTime()  # as psychopy's, which compares the next flip with now
+        this_t = self.last_flip - base.getLastResetTime() + self.period
+        if clock is None:
+            return this_t
+        if clock == 'now':
+            return this_t - base.getTime()
+        return this_t + base.getLastResetTime() - clock.getLastResetTime()
+
+    def timeOnFlip(self, obj, attrib):
+        self._to_call.append((setattr, (obj, attrib, None), {}))
+
+    def callOnFlip(self, func, *args, **kwargs):
+        self._to_call.append((func, args, kwargs))
+
+    def flip(self):
+        self.sim.now = self.last_flip = self.last_flip + self.period
+        self.flips += 1
+        if self._to_call:
+            for func, args, kwargs in self._to_call:
+                func(*args, **kwargs)
+            self._to_call = []
+        return self.sim.now
+
+
+class SimStim:
+    def __init__(self, name):
+        self.name = name
+        self.autoDraw = False
+        self.phase = 0.0
+        self.status = NOT_STARTED
+
+    def setAutoDraw(self, value):
+        self.autoDraw = value
+
+
+class SimKeyboard:
+    def getKeys(self, keyList=None, ignoreKeys=None, waitRelease=True):
+        return []
+
+
+class SimExperiment:
+    def __init__(self, win):
+        self.win = win
+        self.status = STARTED
+        self.rows = []
+
+    def addData(self, name, value):
+        self.rows.append((name, self.win.flips))
+
+    def timestampOnFlip(self, win, name, format=float):
+        self.rows.append((name, self.win.flips + 1))
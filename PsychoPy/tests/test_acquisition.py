@@ -0,0 +1,49 @@
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip('serial')
+pytest.importorskip('tty')  # the emulator needs a pseudo-terminal
+
+from sipefield.acquisition import EXITED, STATE_SLOT, EncoderProcess  # noqa: E402
+from sipefield.emulator import PtyEncoder  # noqa: E402
+
+
+def test_child_process_against_the_emulator():
+    encoder = PtyEncoder(sample_window=0.005, protocol='binary', seed=5)
+    offset = 1000.0
+    reader = EncoderProcess(encoder.port, encoder.baudrate, capacity=1 << 12, clock_offset=offset)
+    try:
+        reader.start()
+        assert reader.is_alive()
+        cursor = reader.ring.cursor()
+        encoder.start()
+        time.sleep(0.3)
+        encoder.stop()
+        deadline = time.monotonic() + 2.0
+        while reader.ring.head < encoder.samples and time.monotonic() < deadline:
+            time.sleep(0.01)
+        first = cursor.drain(max_records=5)
+        reader.stop()
+        assert not reader.is_alive()
+        assert reader.ring.header[STATE_SLOT] == EXITED
+        rest = cursor.drain()  # still readable from the private copy stop() keeps
+    finally:
+        reader.stop()
+        encoder.close()
+
+    samples = np.concatenate((first, rest))
+    assert encoder.samples > 20
+    assert samples['seq'].tolist() == list(range(encoder.samples))
+    assert np.array_equal(samples['delta'], encoder.sent_clicks())
+    # host times come back on the parent's clock
+    assert abs(samples['host_time'][-1] - (time.perf_counter() + offset)) < 2.0
+
+
+def test_stopped_process_cannot_restart():
+    reader = EncoderProcess('/dev/null', 250000, capacity=16)
+    reader.stop()
+    reader.stop()  # idempotent
+    with pytest.raises(RuntimeError, match="can't be restarted"):
+        reader.start()
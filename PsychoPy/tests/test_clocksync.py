@@ -0,0 +1,36 @@
+import numpy as np
+
+from sipefield.clocksync import ClockSync
+
+
+def test_recovers_drift_and_offset_despite_outliers():
+    rng = np.random.default_rng(7)
+    device = np.arange(0, 20, 0.01) + 3.0            # firmware clock, 100 Hz (s)
+    slope, offset = 1 + 80e-6, 1234.5                  # host clock runs 80 ppm fast
+    measured = offset + slope * device                 # host time each sample was measured
+    latency = 0.0005 + rng.exponential(0.002, len(device))
+    latency[rng.random(len(device)) < 0.03] += rng.uniform(0.05, 0.3)  # stalled reads
+    host = measured + latency
+
+    sync = ClockSync(window=2048, refit_every=256)
+    assert np.isnan(sync.to_host(device[:1])).all()
+    for start in range(0, len(device), 7):           # arriving in chunks, as the frame loop drains them
+        sync.add(device[start:start + 7], host[start:start + 7])
+    sync.fit()
+
+    assert sync.ready
+    assert sync.rejected > 0
+    # 2 ms of latency jitter over a 20 s window leaves a few ppm of slope error; the drift is 80
+    assert abs(sync.slope - slope) < 20e-6
+    error = sync.to_host(device) - measured
+    # the intercept sits at the least-delayed arrivals: the 0.5 ms floor plus a fraction of the jitter
+    assert 0.0004 < np.median(error) < 0.0008
+    assert np.abs(error).max() < 0.0012
+
+
+def test_nan_device_times_are_ignored():
+    sync = ClockSync(min_pairs=4)
+    sync.add(np.array([np.nan, 0.0, 0.1, 0.2, 0.3]), np.array([9.0, 1.0, 1.1, 1.2, 1.3]))
+    assert sync.ready
+    assert abs(sync.slope - 1.0) < 1e-9
+    assert abs(sync.to_host(np.array([0.5]))[0] - 1.5) < 1e-9
@@ -0,0 +1,87 @@
+import sys
+import types
+
+import pandas as pd
+import pytest
+
+from sipefield.drawcalls import DRAWS, GL_DRAWS, GL_STATE, WINDOW, DrawProfiler
+
+
+@pytest.fixture
+def gl(monkeypatch):
+    """A pyglet.gl stand-in whose functions only count their calls."""
+    gl = types.ModuleType('pyglet.gl')
+    gl.calls = []
+    for name in ('glDrawArrays', 'glClear', 'glBindTexture', 'glUseProgram', 'glBlitFramebuffer'):
+        setattr(gl, name, lambda *args, name=name: gl.calls.append(name))
+    pyglet = types.ModuleType('pyglet')
+    pyglet.gl = gl
+    monkeypatch.setitem(sys.modules, 'pyglet', pyglet)
+    monkeypatch.setitem(sys.modules, 'pyglet.gl', gl)
+    return gl
+
+
+class Stim:
+    def __init__(self, gl, name, autoDraw=False):
+        self.gl = gl
+        self.name = name
+        self.autoDraw = autoDraw
+
+    def draw(self):
+        self.gl.glUseProgram(1)
+        self.gl.glBindTexture(0, 1)
+        self.gl.glDrawArrays(0, 0, 4)
+
+
+class Window:
+    def __init__(self, gl, stimuli):
+        self.gl = gl
+        self.stimuli = stimuli
+        self.frames = 0
+
+    def flip(self):
+        for stim in self.stimuli:
+            if stim.autoDraw:
+                stim.draw()  # through the instance attribute, as PsychoPy's flip does
+        self.gl.glBlitFramebuffer()
+        self.gl.glClear(0)
+        self.frames += 1
+        return self.frames / 60
+
+
+def test_counts_per_stimulus_and_frame(gl, tmp_path):
+    gratings = [Stim(gl, 'grating', autoDraw=i == 0) for i in range(3)]
+    gray = Stim(gl, 'gray')
+    win = Window(gl, gratings + [gray])
+    profiler = DrawProfiler(win, gratings + [gray], capacity=2)  # grows during the run
+    profiler.start()
+    profiler.start()  # a second start does not wrap twice
+    for frame in range(5):
+        if frame < 2:
+            gray.draw()
+        assert win.flip() == (frame + 1) / 60
+    profiler.stop()
+    assert type(win).flip is Window.flip and 'flip' not in vars(win)
+    assert 'draw' not in vars(gray)
+    counted = profiler.counts.sum()
+    win.flip()  # nothing is counted any more
+    assert profiler.n == 5 and profiler.counts.sum() == counted
+    assert len(gl.calls) == 6 * 5 + 2 * 3  # the wrappers still called the originals
+
+    assert profiler.targets == [WINDOW, 'grating', 'gray']
+    assert profiler.counts[:5, 1].tolist() == [[1, 1, 2]] * 5
+    assert profiler.counts[:5, 2, DRAWS].tolist() == [1, 1, 0, 0, 0]
+    assert profiler.counts[:5, 0, GL_DRAWS].tolist() == [2] * 5  # the blit and the clear
+    assert profiler.counts[:5, 0, GL_STATE].sum() == 0
+
+    summary = profiler.summary()
+    assert summary['gray']['frames'] == 2
+    assert summary['grating']['gl_state'] == 2.0
+    assert summary[WINDOW]['time_us'] is None
+    assert summary['grating']['time_us']['max'] >= summary['grating']['time_us']['p50'] > 0
+
+    profiler.save(str(tmp_path / 'session'))
+    draws = pd.read_csv(tmp_path / 'session_draws.csv')
+    assert len(draws) == 5 + 5 + 2
+    assert draws[draws['target'] == 'gray']['frame'].tolist() == [0, 1]
+    assert pd.read_csv(tmp_path / 'session_draw_summary.csv')['target'].tolist() == [WINDOW, 'grating', 'gray']
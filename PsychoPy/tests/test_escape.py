@@ -0,0 +1,123 @@
+import sys
+import types
+
+import pytest
+
+from sipefield.escape import EscapeWatcher
+
+ESCAPE = 65307  # pyglet.window.key.ESCAPE
+
+
+class Keyboard:
+    """Reports escape once ``now[0]`` reaches ``press_at``; counts the calls."""
+
+    def __init__(self, now, press_at=None):
+        self.now = now
+        self.press_at = press_at
+        self.calls = 0
+
+    def getKeys(self, keyList=None):
+        self.calls += 1
+        if self.press_at is not None and self.now[0] >= self.press_at:
+            return ['escape']
+        return []
+
+
+class Handle:
+    """The bits of a pyglet window the 'window' policy uses."""
+
+    def __init__(self):
+        self.handlers = []
+
+    def push_handlers(self, on_key_press):
+        self.handlers.append(on_key_press)
+
+    def remove_handlers(self, on_key_press):
+        self.handlers.remove(on_key_press)
+
+    def dispatch(self, symbol):
+        for handler in self.handlers:
+            handler(symbol, 0)
+
+
+@pytest.fixture
+def pyglet_key(monkeypatch):
+    key = types.ModuleType('pyglet.window.key')
+    key.ESCAPE = ESCAPE
+    window = types.ModuleType('pyglet.window')
+    window.key = key
+    pyglet = types.ModuleType('pyglet')
+    pyglet.window = window
+    monkeypatch.setitem(sys.modules, 'pyglet', pyglet)
+    monkeypatch.setitem(sys.modules, 'pyglet.window', window)
+    monkeypatch.setitem(sys.modules, 'pyglet.window.key', key)
+
+
+def run(watcher, now, frames, period=1 / 60):
+    """Frames until the watcher reports escape, or None."""
+    for frame in range(frames):
+        now[0] = frame * period
+        if watcher():
+            return frame
+    return None
+
+
+def test_frame_policy_checks_every_frame():
+    now = [0.0]
+    keyboard = Keyboard(now, press_at=0.5)
+    watcher = EscapeWatcher(keyboard, policy='frame', clock=lambda: now[0])
+    assert run(watcher, now, 120) == 30
+    assert keyboard.calls == 1 + 31  # on creation, then frames 0 to 30
+    summary = watcher.summary()
+    assert summary['checks'] == keyboard.calls
+    assert summary['saved_per_frame'] == 0.0
+
+
+def test_throttled_policy_checks_at_the_interval():
+    now = [0.0]
+    keyboard = Keyboard(now)
+    watcher = EscapeWatcher(keyboard, policy='throttled', interval=0.1, clock=lambda: now[0])
+    assert run(watcher, now, 120) is None
+    # once on creation, then once every 0.1 s of 2 s of frames
+    assert 19 <= keyboard.calls <= 21
+    assert watcher.summary()['frames'] == 120
+
+    now = [0.0]
+    keyboard = Keyboard(now, press_at=0.5)
+    watcher = EscapeWatcher(keyboard, policy='throttled', interval=0.1, clock=lambda: now[0])
+    stopped = run(watcher, now, 120)
+    assert 30 <= stopped <= 30 + 6  # late by at most the interval
+    assert watcher()  # stays pressed without asking again
+    assert keyboard.calls == watcher.checks
+
+
+def test_escape_during_setup_is_seen_by_every_policy(pyglet_key):
+    for policy in ('frame', 'throttled', 'window'):
+        now = [0.0]
+        watcher = EscapeWatcher(Keyboard(now, press_at=0.0), policy=policy,
+                                win=types.SimpleNamespace(winHandle=Handle()), clock=lambda: now[0])
+        assert watcher.pressed
+        assert watcher()
+
+
+def test_window_policy_uses_the_key_handler(pyglet_key):
+    now = [0.0]
+    keyboard = Keyboard(now, press_at=0.2)  # ignored after the first check
+    handle = Handle()
+    watcher = EscapeWatcher(keyboard, policy='window', win=types.SimpleNamespace(winHandle=handle))
+    assert run(watcher, now, 60) is None
+    handle.dispatch(ord('a'))
+    assert not watcher()
+    handle.dispatch(ESCAPE)
+    assert watcher()
+    assert keyboard.calls == 1
+    watcher.close()
+    assert handle.handlers == []
+    watcher.close()
+
+
+def test_window_policy_needs_a_pyglet_window():
+    with pytest.raises(ValueError, match='pyglet'):
+        EscapeWatcher(Keyboard([0.0]), policy='window', win=object())
+    with pytest.raises(ValueError, match='unknown escape policy'):
+        EscapeWatcher(Keyboard([0.0]), policy='never')
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sipefield.frametiming import FrameTimer
+
+RATE = 60.0
+PERIOD = 1.0 / RATE
+
+
+def flips(n, start=0.0, missed=()):
+    """Flip times of ``n`` frames at RATE; ``missed`` maps frame to refreshes lost before it."""
+    times, t = [], start
+    for frame in range(n):
+        t += PERIOD * (1 + dict(missed).get(frame, 0))
+        times.append(t + np.random.default_rng(frame).uniform(-2e-4, 2e-4))  # vsync jitter
+    return times
+
+
+def run_trial(timer, trial, times, clock_offset=0.0):
+    timer.start_trial(trial, clock_offset)
+    for frame, t in enumerate(times):
+        timer.record(t, frame)
+
+
+def test_dropped_frames_counted_per_trial():
+    timer = FrameTimer(RATE, capacity=8)  # grows during the first trial
+    run_trial(timer, 0, flips(30, missed={10: 1, 20: 3}))
+    assert timer.dropped == 4
+    assert timer.max_interval == pytest.approx(4 * PERIOD, abs=1e-3)
+    first = timer.end_trial()
+    assert first['frames'] == 30 and first['dropped'] == 4
+
+    # a stall between trials lands on the next trial's first flip
+    run_trial(timer, 1, flips(20, start=timer.flip_times[timer.n - 1] + PERIOD), clock_offset=5.0)
+    second = timer.end_trial()
+    assert second['dropped'] == 1
+
+    log = timer.log.to_dataframe()
+    assert len(log) == 50
+    assert np.isnan(log['interval'][0])
+    assert log.groupby('trial')['dropped'].sum().tolist() == [4, 1]
+    assert log['dropped'][log['dropped'] > 0].tolist() == [1, 3, 1]
+    assert log['frame'][log['dropped'] > 0].tolist() == [10, 20, 0]
+    assert log['flip_time'][30] == pytest.approx(timer.flip_times[0] + 5.0)
+
+
+def test_jitter_alone_is_not_a_dropped_frame():
+    timer = FrameTimer(RATE)
+    run_trial(timer, 0, flips(120))
+    assert timer.end_trial()['dropped'] == 0
+
+
+def test_stimulus_duration_from_flips(tmp_path):
+    timer = FrameTimer(RATE)
+    times = flips(40, missed={15: 2})
+    run_trial(timer, 0, times)
+    summary = timer.end_trial(grating=(10, 30), gray=(30, None), never=(None, None))
+    assert summary['grating_duration'] == pytest.approx(times[30] - times[10])
+    assert summary['gray_duration'] == pytest.approx(times[39] - times[30] + PERIOD)
+    assert np.isnan(summary['never_duration'])
+
+    timer.save(str(tmp_path / 'session'))
+    assert len(pd.read_csv(tmp_path / 'session_frames.csv')) == 40
+    assert pd.read_csv(tmp_path / 'session_frame_summary.csv')['dropped'].tolist() == [2]
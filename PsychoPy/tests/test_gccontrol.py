@@ -0,0 +1,61 @@
+from sipefield.gccontrol import GCControl, GCMonitor
+from sipefield.schedule import STIM_GRATING, STIM_GRAY, Epoch, GratingSchedule
+
+FRAME_RATE = 60.0
+
+
+def run_trial(collect):
+    plan = GratingSchedule([Epoch('gray', 0.1, STIM_GRAY), Epoch('grating', 0.1, STIM_GRAY | STIM_GRATING)],
+                           FRAME_RATE, [0]).plans[0]
+    monitor = GCMonitor()
+    control = GCControl('disable', collect=collect, generation=0, gray_bits=STIM_GRAY, monitor=monitor)
+    monitor.start()
+    try:
+        control.begin_trial(0, plan)
+        for frameN in range(plan.n_frames):
+            control.each_frame(frameN / FRAME_RATE, frameN, frameN)
+        control.end_trial()
+    finally:
+        monitor.stop()
+        control.finish()
+    return monitor.events
+
+
+def test_between_collection_is_tagged_with_the_last_grating_frame():
+    events = run_trial('between')
+    explicit = events[events['frame'] == -1]
+    assert len(explicit) == 1
+    assert explicit['visible'][0] & STIM_GRATING
+
+
+def test_gray_collection_runs_with_gray_on_screen():
+    events = run_trial('gray')
+    explicit = events[events['frame'] >= 0]
+    assert len(explicit) == 1
+    assert explicit['frame'][0] == 1  # frame 0's gray has been flipped by then
+    assert explicit['visible'][0] == STIM_GRAY
+
+
+def test_gray_mode_keeps_every_collection_off_the_grating():
+    plan = GratingSchedule([Epoch('gray', 0.1, STIM_GRAY), Epoch('grating', 0.1, STIM_GRAY | STIM_GRATING)],
+                           FRAME_RATE, [0]).plans[0]
+    monitor = GCMonitor()
+    control = GCControl('disable', collect='gray', generation=2, gray_bits=STIM_GRAY, monitor=monitor)
+    garbage = []
+    monitor.start()
+    try:
+        for trial in range(4):
+            control.begin_trial(trial, plan)
+            for frameN in range(plan.n_frames):
+                control.each_frame(frameN / FRAME_RATE, frameN, frameN)
+                garbage.extend([frameN] for _ in range(500))  # enough containers to trigger gen 0
+                garbage.clear()
+            control.end_trial()
+            garbage.extend({'row': trial} for _ in range(5000))  # the data saved between trials
+            garbage = []
+    finally:
+        monitor.stop()
+        control.finish()
+    events = monitor.events
+    assert len(events) >= 4
+    assert not (events['visible'] & STIM_GRATING).any()
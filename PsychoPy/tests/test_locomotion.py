@@ -0,0 +1,68 @@
+import math
+
+import numpy as np
+import pytest
+
+from sipefield.locomotion import LocomotionStream, WheelConfig, compute_metrics
+
+DT = 0.01
+# accelerate forward, coast, stop, then roll backward, with some jitter
+CLICKS = np.concatenate((np.arange(0, 30), np.full(20, 30), np.zeros(10, int),
+                         -np.arange(0, 15), np.random.default_rng(3).integers(-5, 6, 25)))
+
+
+def reference(clicks, dt, config):
+    """One sample at a time, the way the script used to do it, plus trailing smoothing."""
+    metres_per_click = math.pi * config.wheel_diameter / config.encoder_cpr
+    raw, speed, distance, direction, acceleration = [], [], [], [], []
+    total = 0.0
+    for i, c in enumerate(clicks):
+        step = c * metres_per_click
+        total += step
+        raw.append(step / dt)
+        window = [raw[max(0, j)] for j in range(i - config.window + 1, i + 1)]
+        if config.smoothing == 'none':
+            value = raw[-1]
+        elif config.smoothing == 'moving_average':
+            value = sum(window) / len(window)
+        else:
+            x = np.arange(len(window)) - (len(window) - 1)
+            value = np.polyval(np.polyfit(x, window, config.polyorder), 0.0)
+        acceleration.append((value - (speed[-1] if speed else value)) / dt)
+        speed.append(value)
+        distance.append(total)
+        direction.append(1 if c > 0 else 2 if c < 0 else 0)
+    return speed, distance, direction, acceleration
+
+
+@pytest.mark.parametrize('smoothing', ['none', 'moving_average', 'savgol'])
+def test_stream_matches_per_sample_loop(smoothing):
+    config = WheelConfig(smoothing=smoothing, window=5, polyorder=2)
+    stream = LocomotionStream(config)
+    chunks = []
+    for start, stop in zip([0, 1, 4, 4, 17, 60], [1, 4, 4, 17, 60, len(CLICKS)]):  # ragged, one empty
+        chunks.append(stream.update(CLICKS[start:stop], DT))
+    speed, distance, direction, acceleration = reference(CLICKS, DT, config)
+    assert np.allclose(np.concatenate([m.speed for m in chunks]), speed)
+    assert np.allclose(np.concatenate([m.distance for m in chunks]), distance)
+    assert np.concatenate([m.direction for m in chunks]).tolist() == direction
+    assert np.allclose(np.concatenate([m.acceleration for m in chunks]), acceleration)
+    assert stream.distance == pytest.approx(distance[-1])
+
+
+def test_offline_metrics_match_per_sample_loop():
+    config = WheelConfig()
+    metrics = compute_metrics(CLICKS, DT, config, start_distance=2.0)
+    speed, distance, direction, _ = reference(CLICKS, DT, config)
+    assert np.allclose(metrics.speed, speed)
+    assert np.allclose(metrics.distance, np.add(distance, 2.0))
+    assert metrics.direction.tolist() == direction
+    assert np.allclose(metrics.acceleration, np.gradient(speed) / DT)
+
+
+def test_centred_smoothing_keeps_a_constant_speed():
+    clicks = np.full(40, 12)
+    flat = compute_metrics(clicks, DT).speed
+    for smoothing in ('moving_average', 'savgol'):
+        smoothed = compute_metrics(clicks, DT, WheelConfig(smoothing=smoothing)).speed
+        assert np.allclose(smoothed, flat)
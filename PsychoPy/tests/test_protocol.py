@@ -0,0 +1,52 @@
+import numpy as np
+
+from sipefield.emulator import crc8, encode_packet
+from sipefield.protocol import PACKET_SIZE, PacketDecoder, crc8_rows
+
+
+def stream(n, start=0):
+    return b''.join(encode_packet(seq, 1000 * seq, (-1) ** seq * seq) for seq in range(start, start + n))
+
+
+def test_crc8_check_value():
+    # CRC-8/SMBUS (poly 0x07, init 0): the CRC of b'123456789' is 0xF4; leading zeros don't change it
+    body = np.frombuffer(b'\x00\x00123456789', dtype=np.uint8)[np.newaxis]
+    assert crc8_rows(body)[0] == 0xF4
+    assert crc8(b'123456789') == 0xF4
+
+
+def test_decodes_a_clean_stream():
+    decoder = PacketDecoder()
+    out = decoder.feed(stream(5))
+    assert out['seq'].tolist() == [0, 1, 2, 3, 4]
+    assert out['device_us'].tolist() == [0, 1000, 2000, 3000, 4000]
+    assert out['delta'].tolist() == [0, -1, 2, -3, 4]
+    assert decoder.packets == 5 and decoder.bad_packets == decoder.skipped_bytes == 0
+
+
+def test_packet_split_across_two_reads():
+    data = stream(3)
+    decoder = PacketDecoder()
+    cut = PACKET_SIZE + 5
+    first = decoder.feed(data[:cut])
+    second = decoder.feed(data[cut:])
+    assert first['seq'].tolist() == [0]
+    assert second['seq'].tolist() == [1, 2]
+
+
+def test_resync_after_a_stray_byte():
+    data = stream(2) + b'\x17' + stream(2, start=2)
+    decoder = PacketDecoder()
+    out = decoder.feed(data)
+    assert out['seq'].tolist() == [0, 1, 2, 3]
+    assert decoder.skipped_bytes == 1
+
+
+def test_bad_crc_packet_is_dropped():
+    packets = bytearray(stream(3))
+    packets[PACKET_SIZE + 8] ^= 0x40  # flip a bit in the second packet's device time
+    decoder = PacketDecoder()
+    out = decoder.feed(bytes(packets))
+    assert out['seq'].tolist() == [0, 2]
+    assert decoder.bad_packets == 1
+    assert decoder.skipped_bytes == PACKET_SIZE
@@ -0,0 +1,44 @@
+import time
+
+import numpy as np
+import pytest
+
+serial = pytest.importorskip('serial')
+pytest.importorskip('tty')  # the emulator needs a pseudo-terminal
+
+from sipefield.emulator import PtyEncoder  # noqa: E402
+from sipefield.reader import POLL_TIMEOUT, EncoderReader  # noqa: E402
+from sipefield.ring import SampleRing  # noqa: E402
+
+
+@pytest.mark.parametrize('protocol', ['binary', 'ascii'])
+def test_reader_against_the_emulator(protocol):
+    encoder = PtyEncoder(sample_window=0.005, protocol=protocol, seed=3)
+    port = serial.Serial(encoder.port, baudrate=encoder.baudrate, timeout=POLL_TIMEOUT)
+    ring = SampleRing(capacity=1 << 12)
+    reader = EncoderReader(port, ring, protocol=protocol)
+    try:
+        reader.start()
+        encoder.start()
+        time.sleep(0.3)
+        encoder.stop()
+        deadline = time.monotonic() + 2.0
+        while reader.samples < encoder.samples and time.monotonic() < deadline:
+            time.sleep(0.01)
+        start = time.perf_counter()
+        reader.stop()
+        assert time.perf_counter() - start < 0.5
+        assert not reader.is_alive()
+    finally:
+        reader.stop()
+        port.close()
+        encoder.close()
+
+    samples = ring.copy_range(0, ring.head)
+    assert encoder.samples > 20
+    assert len(samples) == encoder.samples
+    assert samples['seq'].tolist() == list(range(encoder.samples))
+    assert np.array_equal(samples['delta'], encoder.sent_clicks())
+    assert np.all(np.diff(samples['host_time']) >= 0)
+    if protocol == 'binary':
+        assert np.all(np.diff(samples['device_time']) > 0)
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from sipefield.recorder import WHEEL_COLUMNS, ColumnarRecorder
+
+NAMES = [name for name, _ in WHEEL_COLUMNS]
+
+
+def row(i):
+    return (i * 0.05, i * 1.5, i * 0.1, i % 3, -i * 0.5, i * 0.05, i * 0.05 + 2.0, i, i % 7 == 0)
+
+
+def test_grows_past_capacity_without_losing_rows():
+    recorder = ColumnarRecorder(capacity=4)
+    for i in range(5):  # append crosses the first boundary
+        recorder.append(*row(i))
+    seq = np.arange(5, 40)  # one extend has to double more than once
+    recorder.extend(*zip(*(row(i) for i in seq)))
+    recorder.extend(*([] for _ in NAMES))
+    assert len(recorder) == 40
+    assert recorder._capacity == 64
+    assert recorder.column('seq').tolist() == list(range(40))
+    assert np.array_equal(recorder.rows(10, 12)['speed'], [15.0, 16.5])
+    assert recorder.rows()['interpolated'].sum() == 6
+
+
+def test_dataframe_and_csv_keep_column_order_and_types(tmp_path):
+    recorder = ColumnarRecorder(capacity=2)
+    for i in range(10):
+        recorder.append(*row(i))
+    df = recorder.to_dataframe()
+    assert list(df.columns) == NAMES
+    assert [str(t) for t in df.dtypes] == ['float64', 'float64', 'float64', 'int8', 'float64',
+                                           'float64', 'float64', 'int64', 'bool']
+    recorder.column('speed')[0] = 99.0
+    assert df['speed'][0] == 0.0  # a copy, not a view of the live columns
+
+    path = tmp_path / 'wheel.csv'
+    df.to_csv(path, index=False)
+    csv = pd.read_csv(path)
+    assert list(csv.columns) == NAMES
+    assert csv['seq'].tolist() == list(range(10))
+    assert csv['direction'].tolist() == [i % 3 for i in range(10)]
+    assert csv['interpolated'].dtype == bool
+    assert np.allclose(csv['global_time'], np.arange(10) * 0.05 + 2.0)
+
+
+def test_empty_recorder():
+    recorder = ColumnarRecorder()
+    assert len(recorder) == 0
+    assert len(recorder.rows()) == 0
+    assert list(recorder.to_dataframe().columns) == NAMES
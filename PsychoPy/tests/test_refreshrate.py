@@ -0,0 +1,106 @@
+import json
+
+import numpy as np
+import pytest
+
+from sipefield.refreshrate import RefreshRateCache, burst_rate, cached_frame_rate
+
+
+class Display:
+    """Flips at ``rate`` Hz with timestamp jitter; counts flips and full measurements."""
+
+    def __init__(self, rate, jitter=1e-4, drops=(), seed=0):
+        self.rate = rate
+        self.jitter = jitter
+        self.drops = set(drops)  # flip numbers that miss one refresh
+        self.rng = np.random.default_rng(seed)
+        self.t = 0.0
+        self.flips = 0
+        self.measures = 0
+
+    def flip(self):
+        self.flips += 1
+        self.t += (2 if self.flips in self.drops else 1) / self.rate
+        return self.t + self.rng.normal(0.0, self.jitter)
+
+    def measure(self):
+        self.measures += 1
+        for _ in range(20):  # what getActualFrameRate needs at the least
+            self.flip()
+        return self.rate
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return RefreshRateCache(str(tmp_path / 'cache' / 'refresh_rate_cache.json'))
+
+
+KEY = RefreshRateCache.key('testMonitor', 1, (1920.0, 1080.0))
+
+
+def test_first_launch_measures_and_stores(cache):
+    display = Display(60.0)
+    rate, info = cached_frame_rate(cache, KEY, display.flip, display.measure)
+    assert rate == 60.0
+    assert info == {'source': 'measured', 'cached': None, 'burst': None, 'error': None}
+    assert display.measures == 1
+    assert KEY == 'testMonitor|screen1|1920x1080'
+    assert cache.get(KEY) == 60.0
+
+
+def test_cache_hit_only_flips_the_burst(cache):
+    cache.put(KEY, 60.0)
+    display = Display(60.0)
+    rate, info = cached_frame_rate(cache, KEY, display.flip, display.measure)
+    assert rate == 60.0
+    assert info['source'] == 'cache'
+    assert abs(info['error']) < 0.01
+    assert display.measures == 0
+
+
+def test_cache_miss_remeasures_and_updates(cache):
+    cache.put(KEY, 60.0)
+    display = Display(144.0)  # the monitor was switched to 144 Hz
+    rate, info = cached_frame_rate(cache, KEY, display.flip, display.measure)
+    assert rate == 144.0
+    assert info['source'] == 'remeasured'
+    assert info['cached'] == 60.0
+    assert info['burst'] == pytest.approx(144.0, rel=0.01)
+    assert display.measures == 1
+    assert cache.get(KEY) == 144.0
+
+
+def test_failed_measurement_falls_back_to_the_burst(cache):
+    display = Display(75.0)
+    assert cached_frame_rate(cache, KEY, display.flip, lambda: None) == (
+        None, {'source': 'measured', 'cached': None, 'burst': None, 'error': None})
+    cache.put(KEY, 60.0)
+    rate, info = cached_frame_rate(cache, KEY, display.flip, lambda: None)
+    assert info['source'] == 'burst'
+    assert rate == pytest.approx(75.0, rel=0.01)
+    assert cache.get(KEY) == 60.0
+
+
+def test_unreadable_cache_is_empty(cache, tmp_path):
+    assert cache.load() == {}
+    cache.put(KEY, 60.0)
+    with open(cache.path, 'w') as f:
+        f.write('{not json')
+    assert cache.get(KEY) is None
+    cache.put(KEY, 59.94)
+    with open(cache.path) as f:
+        assert json.load(f)[KEY]['rate'] == 59.94
+
+
+def test_burst_rate_ignores_dropped_frames():
+    display = Display(60.0, drops={8, 12})
+    assert burst_rate(display.flip) == pytest.approx(60.0, rel=0.01)
+
+
+def test_short_burst_is_within_tolerance_despite_jitter():
+    errors = []
+    for seed in range(50):
+        display = Display(144.0, jitter=2e-4, drops={5}, seed=seed)
+        errors.append(burst_rate(display.flip) / 144.0 - 1)
+        assert display.flips == 13  # fewer than getActualFrameRate's 20 at best
+    assert max(np.abs(errors)) < 0.01
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from sipefield.ring import SAMPLE_DTYPE, SampleRing
+
+
+def records(start, stop):
+    out = np.zeros(stop - start, dtype=SAMPLE_DTYPE)
+    out['seq'] = np.arange(start, stop)
+    return out
+
+
+def test_capacity_must_be_a_power_of_two():
+    with pytest.raises(ValueError):
+        SampleRing(capacity=100)
+
+
+def test_wraparound():
+    ring = SampleRing(capacity=8)
+    cursor = ring.cursor()
+    ring.extend(records(0, 6))
+    assert cursor.drain()['seq'].tolist() == list(range(6))
+    ring.extend(records(6, 12))  # slots 6, 7, then 0-3
+    assert cursor.drain()['seq'].tolist() == list(range(6, 12))
+    ring.push(0.0, 0.0, 12, 0)
+    assert cursor.drain()['seq'].tolist() == [12]
+    assert cursor.lost == 0
+
+
+def test_overrun_cursor_skips_what_was_overwritten():
+    ring = SampleRing(capacity=8)
+    cursor = ring.cursor()
+    ring.extend(records(0, 3))
+    ring.extend(records(3, 13))  # 13 written, only the newest 8 are left
+    out = cursor.drain()
+    assert out['seq'].tolist() == list(range(5, 13))
+    assert cursor.lost == 5
+    ring.extend(records(13, 30))  # more than the capacity in one go
+    assert cursor.drain()['seq'].tolist() == list(range(22, 30))
+    assert cursor.lost == 14
+
+
+def test_drain_max_records():
+    ring = SampleRing(capacity=16)
+    cursor = ring.cursor()
+    ring.extend(records(0, 10))
+    assert cursor.drain(max_records=4)['seq'].tolist() == [0, 1, 2, 3]
+    assert cursor.pending == 6
+    assert cursor.drain(max_records=100)['seq'].tolist() == list(range(4, 10))
+    assert len(cursor.drain(max_records=4)) == 0
+
+
+def test_from_start():
+    ring = SampleRing(capacity=8)
+    ring.extend(records(0, 5))
+    assert len(ring.cursor().drain()) == 0  # a new cursor starts at the head
+    assert ring.cursor(from_start=True).drain()['seq'].tolist() == list(range(5))
+    ring.extend(records(5, 12))
+    # only what the ring still holds
+    assert ring.cursor(from_start=True).drain()['seq'].tolist() == list(range(4, 12))
+
+
+def test_skip():
+    ring = SampleRing(capacity=8)
+    cursor = ring.cursor()
+    ring.extend(records(0, 5))
+    assert cursor.skip() == 5
+    ring.extend(records(5, 7))
+    assert cursor.drain()['seq'].tolist() == [5, 6]
@@ -0,0 +1,43 @@
+from fakes import ANGLES, FRAME_RATE, SimClock, SimExperiment, SimKeyboard, SimStim, SimTime, SimWindow
+from sipefield.routines import Routine, RoutineEngine, VisualComponent
+from sipefield.schedule import STIM_GRATING, STIM_GRAY, Epoch, GratingSchedule
+
+
+def make_engine():
+    sim = SimTime()
+    default_clock = SimClock(sim)
+    globalClock = SimClock(sim)
+    win = SimWindow(sim, default_clock)
+    engine = RoutineEngine(win, SimExperiment(win), globalClock, SimClock(sim), SimKeyboard(), default_clock)
+    return engine, win, globalClock
+
+
+def test_absolute_start_in_the_future():
+    engine, win, globalClock = make_engine()
+    plan = GratingSchedule([Epoch('gray', 0.1, STIM_GRAY), Epoch('grating', 0.1, STIM_GRAY | STIM_GRATING)],
+                           FRAME_RATE, ANGLES).plans[0]
+    gray = SimStim('stim_grayScreen')
+    grating = SimStim('stim_grating')
+    indices = []
+    phases = []
+
+    def update_grating_phase(t, frameN, index):
+        # as the script's hook
+        indices.append(index)
+        if index is None:
+            return
+        if plan.visible[index] & STIM_GRATING:
+            phases.append(plan.phases[index])
+
+    routine = Routine('DisplayGratings',
+                      [VisualComponent(gray, bit=STIM_GRAY), VisualComponent(grating, bit=STIM_GRATING)],
+                      plan=plan, each_frame=(('stimulus', update_grating_phase),))
+    # three frames after the coming flip, as a TrialTimeline anchor can be
+    start = win.getFutureFlipTime(clock=globalClock) + 3 / FRAME_RATE
+    assert engine.run(routine, start=start)
+
+    assert indices[:3] == [None, None, None]
+    assert indices[3:] == list(range(plan.n_frames))
+    assert len(phases) == plan.epochs['grating'][1] - plan.epochs['grating'][0]
+    # nothing was shown before the first row
+    assert gray.frameNStart == 3
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from sipefield.schedule import STIM_GRATING, STIM_GRAY, Epoch, GratingSchedule
+
+EPOCHS = [Epoch('gray', 1.0, STIM_GRAY), Epoch('grating', 2.0, STIM_GRAY | STIM_GRATING)]
+
+
+@pytest.mark.parametrize('frame_rate', [60.0, 59.94, 144.0])
+def test_plan_frames_and_visibility(frame_rate):
+    schedule = GratingSchedule(EPOCHS, frame_rate, orientations=[0.0, 45.0, 90.0])
+    plan = schedule.trial(4)
+    assert plan.orientation == 45.0
+    assert np.all(plan.frames['ori'] == 45.0)
+    assert plan.n_frames == round(3.0 * frame_rate)
+    assert plan.duration == pytest.approx(3.0, abs=0.5 / frame_rate)
+    gray_end = round(1.0 * frame_rate)
+    assert plan.epochs == {'gray': (0, gray_end), 'grating': (gray_end, plan.n_frames)}
+    assert set(plan.visible[:gray_end]) == {STIM_GRAY}
+    assert set(plan.visible[gray_end:]) == {STIM_GRAY | STIM_GRATING}
+
+
+def test_epoch_rounding_does_not_accumulate():
+    # ten 0.26 s epochs at 60 Hz are 15.6 frames each: rounding each alone would give 160
+    epochs = [Epoch(f'e{i}', 0.26, STIM_GRAY if i % 2 else STIM_GRATING) for i in range(10)]
+    plan = GratingSchedule(epochs, 60.0, [0.0]).trial(0)
+    assert plan.n_frames == 156
+    assert [end - start for start, end in plan.epochs.values()] == [16, 15, 16, 15, 16, 16, 15, 16, 15, 16]
+
+
+def test_index_from_flip_time():
+    plan = GratingSchedule(EPOCHS, 60.0, [0.0]).trial(0)
+    assert plan.index(0.0) == 0
+    assert plan.index(10.4 / 60) == 10
+    assert plan.index(10.6 / 60) == 11  # a late flip still shows the frame due now
+    assert plan.index(5.0) == plan.n_frames
+
+
+def test_phase_table():
+    plan = GratingSchedule(EPOCHS, 60.0, [0.0], temporal_frequency=2.5).trial(0)
+    phases = np.array(plan.phases)
+    assert np.all(phases[:61] == 0.0)  # held at 0 through the gray epoch and the onset flip
+    expected = np.mod(np.arange(plan.n_frames - 60) * 2.5 / 60.0, 1.0)
+    assert np.allclose(phases[60:], expected)
+    assert np.all((phases >= 0.0) & (phases < 1.0))
+    # one cycle every 24 frames, identical on every cycle
+    assert np.allclose(phases[60:84], phases[84:108])
+
+
+def test_static_grating_and_no_grating_epoch():
+    assert set(GratingSchedule(EPOCHS, 60.0, [0.0], temporal_frequency=0.0).trial(0).phases) == {0.0}
+    plan = GratingSchedule([Epoch('gray', 1.0, STIM_GRAY)], 60.0, [0.0]).trial(0)
+    assert plan.n_frames == 60
+    assert plan.phases[1] == pytest.approx(1.0 / 60)  # no onset: phase counts from the first frame
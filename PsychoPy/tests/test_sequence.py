@@ -0,0 +1,47 @@
+import numpy as np
+
+from sipefield.ring import SAMPLE_DTYPE
+from sipefield.sequence import SequenceChecker
+
+WINDOW = 0.05  # s, the firmware's 20 Hz
+
+
+def chunk(seq, host_time, device_time=None):
+    samples = np.zeros(len(seq), dtype=SAMPLE_DTYPE)
+    samples['seq'] = seq
+    samples['host_time'] = host_time
+    samples['device_time'] = np.asarray(seq) * WINDOW if device_time is None else device_time
+    return samples
+
+
+def test_reset_after_a_pause_keeps_the_new_samples():
+    checker = SequenceChecker()
+    checker.check(chunk(range(8), np.arange(8) * WINDOW))
+    # the Arduino reboots for a second and counts from 0 again, same device times as before
+    out, filled = checker.check(chunk([0, 1, 2], 7 * WINDOW + 1.0 + np.arange(3) * WINDOW))
+    assert out['seq'].tolist() == [0, 1, 2]
+    assert not filled.any()
+    assert checker.restarts == 1
+    assert checker.duplicates == checker.corrupt == checker.missing == 0
+    # and goes on from there; its old samples 3..7 are not repeats now
+    out, _ = checker.check(chunk([3, 4], 7 * WINDOW + 1.0 + np.arange(3, 5) * WINDOW))
+    assert out['seq'].tolist() == [3, 4]
+    assert checker.duplicates == 0
+
+
+def test_reset_without_a_pause_is_confirmed_by_the_next_sample():
+    checker = SequenceChecker()
+    checker.check(chunk(range(8), np.arange(8) * WINDOW))
+    out, _ = checker.check(chunk([0, 1, 2], 8 * WINDOW + np.arange(3) * WINDOW, device_time=[0.001, 0.051, 0.101]))
+    assert out['seq'].tolist() == [0, 1, 2]
+    assert checker.restarts == 1
+    assert checker.duplicates == 0
+
+
+def test_exact_repeats_are_dropped():
+    checker = SequenceChecker()
+    checker.check(chunk(range(8), np.arange(8) * WINDOW))
+    out, _ = checker.check(chunk([6, 7, 8], 8 * WINDOW + np.zeros(3)))
+    assert out['seq'].tolist() == [8]
+    assert checker.duplicates == 2
+    assert checker.restarts == 0
@@ -0,0 +1,36 @@
+import socket
+import threading
+import time
+
+from sipefield.server import ExperimentServer, SessionAborted, request_session, send_request
+
+
+def free_address():
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+        return 'localhost', s.getsockname()[1]
+
+
+def test_escape_is_reported_as_aborted():
+    files = {'data': 'data/P1_M12_3', 'wheel': None, 'wheel_log': 'data/P1_M12_3_wheel.bin'}
+
+    def run_session(request):
+        raise SessionAborted(files)
+
+    address = free_address()
+    server = ExperimentServer(run_session, address=address)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        for _ in range(50):  # until the listener is up
+            try:
+                send_request({'command': 'ping'}, address)
+                break
+            except ConnectionRefusedError:
+                time.sleep(0.05)
+        reply = request_session('P1', 'M12', '3', None, 40, address)
+    finally:
+        send_request({'command': 'shutdown'}, address)
+        thread.join(5)
+    assert reply['status'] == 'aborted'
+    assert reply['files'] == files
@@ -0,0 +1,68 @@
+import builtins
+import sys
+
+import pandas as pd
+import pytest
+
+from sipefield.startup import IMPORT, MARK, PHASE, STARTUP_COLUMNS, StartupProfiler
+
+
+@pytest.fixture
+def slow_package(tmp_path, monkeypatch):
+    """``slowpkg`` imports ``slowpkg.inner``; each takes 20 ms of its own to load."""
+    package = tmp_path / 'slowpkg'
+    package.mkdir()
+    (package / '__init__.py').write_text("import time\ntime.sleep(0.02)\nfrom . import inner\n")
+    (package / 'inner.py').write_text("import time\ntime.sleep(0.02)\nVALUE = 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield
+    for name in ('slowpkg', 'slowpkg.inner'):
+        sys.modules.pop(name, None)
+
+
+def test_imports_phases_and_marks(slow_package, tmp_path):
+    original = builtins.__import__
+    startup = StartupProfiler()
+    startup.start()
+    try:
+        with startup.phase('setup'):
+            import slowpkg  # noqa: F401
+            import slowpkg  # noqa: F401,F811 -- already loaded, not recorded
+        startup.stop('first_frame')
+    finally:
+        startup.stop()
+    assert builtins.__import__ is original
+
+    imports = [r for r in startup.records if r['kind'] == IMPORT]
+    assert [(r['name'], r['depth']) for r in imports] == [
+        ('from slowpkg import inner', 1), ('import slowpkg', 0)]
+    inner, outer = imports
+    assert outer['duration'] >= 0.04
+    # self time leaves out every nested statement, recorded or not (e.g. `import time`)
+    assert outer['self'] == pytest.approx(outer['duration'] - inner['duration'], abs=1e-3)
+    assert 0.02 <= outer['self'] < outer['duration']
+    assert outer['modules'] == 2
+
+    phase, = [r for r in startup.records if r['kind'] == PHASE]
+    assert phase['name'] == 'setup' and phase['duration'] >= outer['duration'] and phase['modules'] == 2
+    mark, = [r for r in startup.records if r['kind'] == MARK]
+    assert mark['name'] == 'first_frame' and mark['start'] >= phase['start'] + phase['duration']
+
+    report = startup.report()
+    assert 'first_frame' in report and 'import slowpkg' in report
+    startup.save(str(tmp_path / 'session'))
+    saved = pd.read_csv(tmp_path / 'session_startup.csv')
+    assert list(saved.columns) == list(STARTUP_COLUMNS) and len(saved) == 4
+    assert startup.saved
+
+
+def test_disabled_profiler_does_nothing():
+    original = builtins.__import__
+    startup = StartupProfiler(enabled=False)
+    startup.start()
+    assert builtins.__import__ is original
+    with startup.phase('setup'):
+        pass
+    startup.mark('first_frame')
+    startup.stop('first_frame')
+    assert startup.records == [] and not startup.stopped
@@ -0,0 +1,64 @@
+import io
+import socket
+
+from sipefield.telemetry import (TELEMETRY_TRIAL, TELEMETRY_WHEEL, ConsoleSink, FileSink, SocketSink,
+                                 Telemetry, TelemetryConsumer, format_record)
+
+
+def test_records_are_formatted_like_the_old_prints():
+    telemetry = Telemetry(capacity=8)
+    telemetry.push(TELEMETRY_WHEEL, 12.345, index=1, a=0.25, b=3.5)
+    telemetry.push(TELEMETRY_TRIAL, 13.0, index=2, a=90, b=4)
+    telemetry.push(9, 14.0, index=5, a=1.5, b=2)
+    wheel, trial, other = telemetry.ring.cursor(from_start=True).drain()
+    assert format_record(wheel) == "Time: 12.35s, Speed: 0.25 m/s, Total Distance: 3.50 m, Direction: 1"
+    assert format_record(trial) == "Trial 4: displaying angle 90 with index 2"
+    assert format_record(other) == "14.000 kind 9: 5 1.5 2"
+
+
+def test_consumer_feeds_every_sink(tmp_path):
+    telemetry = Telemetry(capacity=64)
+    console = io.StringIO()
+    path = tmp_path / 'telemetry.log'
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(('127.0.0.1', 0))
+    receiver.settimeout(1.0)
+    consumer = TelemetryConsumer(telemetry, [ConsoleSink(console), FileSink(str(path)),
+                                             SocketSink(receiver.getsockname()[1])], interval=60)
+    consumer.start()  # the long interval leaves the draining to stop()
+    for i in range(5):
+        telemetry.push(TELEMETRY_WHEEL, float(i), index=1, a=0.1 * i, b=float(i))
+    telemetry.push(TELEMETRY_TRIAL, 5.0, index=0, a=45, b=1)
+    consumer.stop()
+    assert not consumer.is_alive()
+    consumer.stop()  # a second stop does nothing
+
+    # the console only gets the newest record of each kind
+    assert console.getvalue().splitlines() == [
+        "Time: 4.00s, Speed: 0.40 m/s, Total Distance: 4.00 m, Direction: 1",
+        "Trial 1: displaying angle 45 with index 0",
+    ]
+    assert len(path.read_text().splitlines()) == 6
+    datagrams = [receiver.recv(4096).decode() for _ in range(6)]
+    receiver.close()
+    assert datagrams[0] == "Time: 0.00s, Speed: 0.00 m/s, Total Distance: 0.00 m, Direction: 1"
+    assert consumer.lost == 0
+
+
+def test_slow_consumer_loses_the_oldest_records():
+    telemetry = Telemetry(capacity=4)
+    console = io.StringIO()
+    consumer = TelemetryConsumer(telemetry, [ConsoleSink(console)])
+    for i in range(10):
+        telemetry.push(TELEMETRY_TRIAL, float(i), a=0, b=i)
+    consumer.flush()
+    assert consumer.lost == 6
+    assert console.getvalue() == "Trial 9: displaying angle 0 with index 0\n"
+
+
+def test_socket_sink_without_a_listener():
+    telemetry = Telemetry(capacity=4)
+    telemetry.push(TELEMETRY_TRIAL, 0.0)
+    sink = SocketSink(9)  # discard port, nothing listening
+    sink.write(telemetry.ring.cursor(from_start=True).drain())
+    sink.close()
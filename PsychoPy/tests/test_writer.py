@@ -0,0 +1,72 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from sipefield.recorder import WHEEL_COLUMNS, ColumnarRecorder
+from sipefield.writer import StreamingWriter, log_to_csv, read_log
+
+
+def fill(recorder, start, count):
+    seq = np.arange(start, start + count)
+    recorder.extend(seq * 0.05, seq * 1.5, seq * 0.1, np.ones(count), np.zeros(count),
+                    seq * 0.05, seq * 0.05 + 2.0, seq, seq % 7 == 0)
+
+
+def test_round_trip(tmp_path):
+    recorder = ColumnarRecorder(capacity=16)
+    fill(recorder, 0, 40)
+    path = str(tmp_path / 'wheel.bin')
+    writer = StreamingWriter(recorder, path, interval=60, max_rows=16)  # only stop() writes
+    writer.start()
+    fill(recorder, 40, 25)
+    writer.stop()
+    records = read_log(path)
+    assert records.dtype.names == tuple(name for name, _ in WHEEL_COLUMNS)
+    assert np.array_equal(records, recorder.rows())
+    assert writer.rows_written == 65
+    csv = pd.read_csv(log_to_csv(path))
+    assert csv['seq'].tolist() == list(range(65))
+
+
+def test_rows_reach_the_log_every_interval(tmp_path):
+    recorder = ColumnarRecorder()
+    path = str(tmp_path / 'wheel.bin')
+    writer = StreamingWriter(recorder, path, interval=0.01)
+    writer.start()
+    try:
+        fill(recorder, 0, 10)
+        deadline = time.monotonic() + 2.0
+        while len(read_log(path)) < 10 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # on disk while the writer is still running
+        assert read_log(path)['seq'].tolist() == list(range(10))
+    finally:
+        writer.stop()
+
+
+def test_log_cut_off_mid_record_keeps_the_complete_prefix(tmp_path):
+    recorder = ColumnarRecorder()
+    fill(recorder, 0, 20)
+    path = str(tmp_path / 'wheel.bin')
+    writer = StreamingWriter(recorder, path, interval=60)
+    writer.start()
+    writer.stop()
+    size = os.path.getsize(path)
+    itemsize = recorder.rows(0, 0).dtype.itemsize
+    with open(path, 'r+b') as f:
+        f.truncate(size - itemsize // 2)  # power cut halfway through the last record
+    records = read_log(path)
+    assert np.array_equal(records, recorder.rows(0, 19))
+
+
+def test_empty_log(tmp_path):
+    recorder = ColumnarRecorder()
+    path = str(tmp_path / 'wheel.bin')
+    writer = StreamingWriter(recorder, path)
+    writer.start()
+    writer.stop()
+    records = read_log(path)
+    assert len(records) == 0
+    assert records.dtype == recorder.rows(0, 0).dtype